@@ -9,37 +9,36 @@
 # 3. **Engagement**: The agent will respond to comments and messages, fostering community interaction.
 # 4. **Performance Analysis**: It will analyze post performance and adjust strategies accordingly.
 # 5. **Learning and Adaptation**: The agent will learn from user interactions and adapt its strategies over time.
+#
+# Each account is an Agent instance with its own credentials, history store, schedule and content
+# pools. agent_runtime.py hosts many agents in one process; the module-level functions below drive
+# the default account for the interactive menu. Set METRICS_PORT to serve Prometheus metrics while
+# the automation runs (see metrics.py), and LOG_FORMAT=json for structured log lines (see
+# log_pipeline.py).
+#
+# Importing the module has no side effects: tweepy, the event stream and the scheduler are imported
+# when first used, and the default account is built on first use. Running it as a script loads .env,
+# sets up logging and opens the menu, or runs one command:
+#   python AI_Driven_Agent.py [run --days 30 [--stream] | verify | test-post | post TEXT | analytics]
 
 # Import necessary libraries
-import tweepy
-import schedule
+import argparse
+import threading
 import time
-import random
 from datetime import datetime, timedelta
 import logging
-import json
 import os
-from dotenv import load_dotenv  # This imports my environment variables
-
-# Load environment variables
-load_dotenv()
-
-# X.com API credentials (secure method)
-API_KEY = os.getenv("TWITTER_API_KEY")
-api_secret = os.getenv("TWITTER_API_SECRET")
-ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
-access_token_secret = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
-
-# Authenticate to the X.com API
-auth = tweepy.OAuth1UserHandler(API_KEY, api_secret, ACCESS_TOKEN, access_token_secret)
-api = tweepy.API(auth)
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("twitter_agent.log"), logging.StreamHandler()],
-)
+from analytics_aggregator import AnalyticsAggregator
+from api_gateway import ApiGateway
+from content_engine import ContentEngine, TemplateList
+from engagement_index import EngagementIndex, adapt_pool_weights
+import metrics
+from history_store import HistoryStore
+from mention_processor import MentionProcessor
+from metrics_fetcher import LOOKUP_BATCH_SIZE, BulkMetricsFetcher
+from post_quota import PostQuota
+from similarity_index import SimilarityIndex
+
 logger = logging.getLogger(__name__)
 
 # Predefine list of daily message posts
@@ -62,323 +61,540 @@ tech_content = [
     "🤖 Building the future, one line of code at a time! #Coding #Innovation",
 ]
 
-# Initialize data storage
-post_history = []
-analytics_data = []
+# Simple engagement responses
+responses = [
+    "Thank you for the mention! 🙏",
+    "Appreciate your engagement! 💪",
+    "Thanks for connecting! 🤝",
+    "Great to hear from you! 😊",
+]
+
+day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 # Configuration
+HISTORY_DB = "agent_history.db"  # History store of the default account
 MAX_POSTS_PER_DAY = 5
 POSTING_TIMES = ["09:00", "12:00", "15:00", "18:00", "21:00"]
+METRICS_REFRESH_POSTS = 1000  # Recent posts whose metrics are refreshed nightly
+ENGAGE_INTERVAL = 2 * 60 * 60  # Seconds between batch passes over the mentions timeline
+
+# Rolling rate windows as (seconds, max posts). X API v2 allows 17 posts per 24h
+# per user on the free tier; the 15-minute cap keeps retries from bursting.
+RATE_WINDOWS = [(24 * 60 * 60, 17), (15 * 60, 2)]
+
+# Content pool selection weights, adapted weekly by adapt_strategy()
+CONTENT_WEIGHTS_KEY = "content_weights"
+DEFAULT_CONTENT_WEIGHTS = {"tech": 0.3, "daily": 0.7}
+
+# Candidates this close to a post from the last DUPLICATE_WINDOW_DAYS are never sent
+DUPLICATE_WINDOW_DAYS = 7
+DUPLICATE_RETRIES = 5
+
+
+_env_loaded = False
+
+
+def load_env():
+    """Load environment variables from .env, once"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv  # This imports my environment variables
+
+        load_dotenv()
+        _env_loaded = True
+
+
+def credentials_from_env(prefix="TWITTER"):
+    """Read X.com API credentials (secure method) from environment variables"""
+    load_env()
+    return {
+        "api_key": os.getenv(f"{prefix}_API_KEY"),
+        "api_secret": os.getenv(f"{prefix}_API_SECRET"),
+        "access_token": os.getenv(f"{prefix}_ACCESS_TOKEN"),
+        "access_token_secret": os.getenv(f"{prefix}_ACCESS_TOKEN_SECRET"),
+    }
+
+
+def build_api(credentials, session=None):
+    """Authenticate to the X.com API, optionally sharing a pooled HTTP session"""
+    import tweepy
+
+    auth = tweepy.OAuth1UserHandler(
+        credentials["api_key"],
+        credentials["api_secret"],
+        credentials["access_token"],
+        credentials["access_token_secret"],
+    )
+    api = tweepy.API(auth)
+    if session is not None:
+        # tweepy signs every request itself, so one session can serve many accounts
+        api.session = session
+    return api
+
+
+class AccountLogger(logging.LoggerAdapter):
+    """Prefix log lines with the account name so many agents can share one log"""
+
+    def process(self, msg, kwargs):
+        kwargs.setdefault("extra", {}).update(self.extra)
+        return f"[{self.extra['account']}] {msg}", kwargs
+
+
+class Agent:
+    def __init__(
+        self,
+        account="default",
+        api=None,
+        credentials=None,
+        store=None,
+        data_dir=".",
+        messages=messages,
+        tech_content=tech_content,
+        posting_times=POSTING_TIMES,
+        max_posts_per_day=MAX_POSTS_PER_DAY,
+        rate_windows=RATE_WINDOWS,
+        session=None,
+        clock=time.time,
+        content_engine=None,
+    ):
+        self.account = account
+        self.clock = clock
+        self.logger = AccountLogger(logger, {"account": account})
+        api = api if api is not None else build_api(credentials or credentials_from_env(), session)
+        # Every call goes through per-endpoint rate windows, retries and read coalescing
+        self.api = api if isinstance(api, ApiGateway) else ApiGateway(api, clock=clock)
+
+        # Initialize data storage (append-only, indexed; see history_store.py)
+        if store is None:
+            filename = HISTORY_DB if account == "default" else f"agent_history_{account}.db"
+            store = HistoryStore(os.path.join(data_dir, filename))
+        self.store = store
+
+        # Content pools
+        self.messages = list(messages)
+        self.tech_content = list(tech_content)
+        self._tech_set = set(self.tech_content)
+        self.content_weights = dict(DEFAULT_CONTENT_WEIGHTS)
+        # Pools are named like content_weights; pass an engine with TemplateCorpus pools for large libraries
+        self.content = content_engine or ContentEngine(
+            {"daily": TemplateList(self.messages, by_day=True), "tech": TemplateList(self.tech_content)}
+        )
+
+        self.posting_times = list(posting_times)
+        self.quota = PostQuota(self.store, max_posts_per_day, rate_windows, account, clock)
+        self.metrics_fetcher = BulkMetricsFetcher(api=self.api)
+        self.aggregator = AnalyticsAggregator(classify=self.content_type, clock=clock)
+        self.engagement_index = EngagementIndex(classify=self.content_type)
+        self.mentions = MentionProcessor(self.api, self.store, responses, clock=clock, log=self.logger)
+        self.similarity = SimilarityIndex(ttl_seconds=DUPLICATE_WINDOW_DAYS * 24 * 60 * 60, clock=clock)
+        self.loaded = False
+
+    def now(self):
+        return datetime.fromtimestamp(self.clock())
+
+    def content_type(self, content):
+        """Return which content pool a post came from"""
+        return self.content.pool_of(content) or ("tech" if content in self._tech_set else "daily")
+
+    # Step 1: Content Creation Function
+    def generate_content(self):
+        """Generate content based on current day and add variety"""
+        now = self.now()
+
+        # Log  day we posting 4
+        self.logger.info(f"Generating content for {day_names[now.weekday()]}")
+
+        # Pick a pool by weight (tech starts at 30%, adapted to performance weekly), then a
+        # template from it; today's daily message is used unless it was posted very recently
+        content, pool = self.content.generate(self.content_weights, now)
+
+        self.logger.info(f"Using {pool} content: {content[:30]}...")
+        return content
+
+    # Step 2: Post Scheduling Function
+    def create_post(self):
+        """Create and post a tweet"""
+        try:
+            # Check if we've reached the daily limit or a rolling rate window
+            now = self.now()
+            today = now.date()
+
+            allowed, reason, _ = self.quota.check(now.timestamp())
+            if not allowed:
+                self.logger.warning(reason)
+                return
+
+            # Generate content, regenerating anything too close to a recent post
+            content = self.generate_content()
+            attempts = 1
+            while self.similarity.is_duplicate(content, now.timestamp()):
+                if attempts >= DUPLICATE_RETRIES:
+                    self.logger.warning("Every candidate was too close to a recent post, skipping this slot")
+                    return
+                content = self.generate_content()
+                attempts += 1
+
+            # Post the tweet
+            sent = time.perf_counter()
+            tweet = self.api.update_status(content)
+            latency = time.perf_counter() - sent
+
+            # Save to history
+            post_data = {
+                "id": str(tweet.id),
+                "content": content,
+                "date": str(today),
+                "time": now.strftime("%H:%M:%S"),
+                "timestamp": now.timestamp(),
+                "content_type": self.content_type(content),
+                "likes": 0,
+                "retweets": 0,
+                "replies": 0,
+            }
 
+            self.store.append_post(post_data)
+            self.quota.record(post_data)
+            self.aggregator.add_post(post_data)
+            self.engagement_index.update(post_data)
+            self.similarity.add(content, post_data["timestamp"], key=post_data["id"])
+            metrics.POSTS.labels("x").inc()
 
-# Step 1: Content Creation Function
-def generate_content():
-    """Generate content based on current day and add variety"""
-    current_day = datetime.now().weekday()  # 0=Monday, 6=Sunday
-
-    # Map weekday numbers to message indices
-    day_names = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
-
-    # Log  day we posting 4
-    logger.info(f"Generating content for {day_names[current_day]}")
-
-    # Choose content based on day
-    if current_day < len(messages):
-        base_content = messages[current_day]
-    else:
-        base_content = random.choice(messages)
-
-    # Add tech content occasionally
-    if random.random() < 0.3:  # 30% chance for tech content
-        tech_post = random.choice(tech_content)
-        logger.info(f"Using tech content instead of {day_names[current_day]} content")
-        return tech_post
-
-    logger.info(f"Using {day_names[current_day]} content: {base_content[:30]}...")
-    return base_content
-
-
-# Step 2: Post Scheduling Function
-def create_post():
-    """Create and post a tweet"""
-    try:
-        # Check if we've reached daily limit
-        today = datetime.now().date()
-        today_posts = [p for p in post_history if p["date"] == str(today)]
-
-        if len(today_posts) >= MAX_POSTS_PER_DAY:
-            logger.warning("Daily posting limit reached")
-            return
-
-        # Generate content
-        content = generate_content()
-
-        # Post the tweet
-        tweet = api.update_status(content)
-
-        # Save to history
-        post_data = {
-            "id": str(tweet.id),
-            "content": content,
-            "date": str(today),
-            "time": datetime.now().strftime("%H:%M:%S"),
-            "likes": 0,
-            "retweets": 0,
-            "replies": 0,
-        }
-
-        post_history.append(post_data)
-        save_data()
+            self.logger.info(f"Tweet posted: {content[:50]}...", extra={"latency": round(latency, 4)})
 
-        logger.info(f"Tweet posted: {content[:50]}...")
+        except Exception as e:
+            self.logger.error(f"Error posting tweet: {str(e)}")
 
-    except Exception as e:
-        logger.error(f"Error posting tweet: {str(e)}")
+    # Step 3: Engagement Function
+    def engage_with_followers(self):
+        """Engage with mentions and followers"""
+        try:
+            if not self.api.calls_available("mentions_timeline"):
+                wait = self.api.time_until("mentions_timeline")
+                self.logger.warning(f"Mentions budget exhausted for {wait:.0f}s, skipping this cycle")
+                return
+
+            # Reply once to every mention since the last cycle (see mention_processor.py)
+            stats = self.mentions.process()
+            self.logger.info(
+                f"Mentions: {stats['fetched']} new, {stats['replied']} replied, "
+                f"{stats['failed']} failed, {stats['skipped']} already answered"
+            )
 
+        except Exception as e:
+            self.logger.error(f"Error engaging with followers: {str(e)}")
+
+    def handle_event(self, event):
+        """Reply to a mention delivered by the event stream (see event_stream.py)"""
+        if event.get("platform") == "x" and event.get("type") == "mention":
+            self.mentions.reply_to_event(event)
+
+    def event_stream(self, bearer_token=None, base_url=None, workers=4):
+        """Build an EventStream feeding this account's mentions to handle_event()"""
+        from event_stream import X_API_URL, EventStream, XFilteredStream
+
+        load_env()
+        screen_name = self.api.verify_credentials().screen_name
+        source = XFilteredStream(
+            bearer_token or os.getenv("TWITTER_BEARER_TOKEN"),
+            rules=[f"@{screen_name}"],
+            base_url=base_url or X_API_URL,
+            tag=f"agent:{screen_name}",
+        )
+        source.set_rules()
+        stream = EventStream(self.handle_event, workers=workers)
+        stream.add_source(source)
+        return stream
+
+    # Step 4: Performance Analysis Function
+    def analyze_performance(self):
+        """Analyze post performance and gather metrics"""
+        try:
+            # Update metrics for recent posts in batched lookups, applying only the deltas
+            def on_metrics_change(post, previous):
+                self.aggregator.update_post(post, previous)
+                self.engagement_index.update(post)
+
+            # Refresh only as many posts as the lookup budget covers now; the rest wait for tomorrow
+            lookups = self.api.calls_available("lookup_statuses")
+            refresh_posts = min(METRICS_REFRESH_POSTS, lookups * LOOKUP_BATCH_SIZE)
+            if refresh_posts < METRICS_REFRESH_POSTS:
+                self.logger.warning(f"Lookup budget covers {refresh_posts} posts, refreshing only those")
+            self.metrics_fetcher.refresh(self.store.recent(refresh_posts), self.store, on_change=on_metrics_change)
+            self.aggregator.save(self.store)
+            self.engagement_index.save(self.store)
+
+            # Generate analytics report from the running totals
+            analytics_report = self.aggregator.report()
+            if analytics_report["total_posts"]:
+                self.store.append_analytics(analytics_report)
+
+                self.logger.info(
+                    f"Analytics: {analytics_report['total_posts']} posts, "
+                    f"{analytics_report['average_engagement']:.2f} avg engagement"
+                )
 
-# Step 3: Engagement Function
-def engage_with_followers():
-    """Engage with mentions and followers"""
-    try:
-        # Get mentions
-        mentions = api.mentions_timeline(count=5)
-
-        for mention in mentions:
-            # Simple engagement responses
-            responses = [
-                "Thank you for the mention! 🙏",
-                "Appreciate your engagement! 💪",
-                "Thanks for connecting! 🤝",
-                "Great to hear from you! 😊",
-            ]
-
-            # Reply to mention
-            response = random.choice(responses)
-            api.update_status(
-                f"@{mention.user.screen_name} {response}",
-                in_reply_to_status_id=mention.id,
-            )
+        except Exception as e:
+            self.logger.error(f"Error analyzing performance: {str(e)}")
 
-            logger.info(f"Replied to @{mention.user.screen_name}")
+    # Step 5: Learning and Adaptation Function
+    def adapt_strategy(self):
+        """Adapt posting strategy based on performance"""
+        try:
+            if len(self.engagement_index) < 5:
+                return
+
+            # Find best performing posts
+            best_posts = self.engagement_index.top(3)
+
+            # Log insights
+            self.logger.info("Top performing content types:")
+            for i, (post_id, engagement) in enumerate(best_posts, 1):
+                post = self.store.get_post(post_id) or {"content": post_id}
+                self.logger.info(f"{i}. {post['content'][:30]}... (Engagement: {engagement})")
+
+            for partition in self.engagement_index.partitions("hashtag:"):
+                top = self.engagement_index.top(1, partition)
+                if top:
+                    self.logger.info(
+                        f"Best {partition[len('hashtag:'):]} post: {top[0][1]} engagement"
+                    )
+
+            # Adapt content selection weights to each pool's recent engagement rate
+            rates = {
+                pool: self.aggregator.bucket("content_type", pool)["decayed_engagement_rate"]
+                for pool in self.content_weights
+            }
+            adapted = adapt_pool_weights(self.content_weights, rates)
+            if adapted != self.content_weights:
+                self.logger.info(
+                    f"Adapting: tech content weight {self.content_weights['tech']:.2f} "
+                    f"-> {adapted['tech']:.2f}"
+                )
+                self.content_weights = adapted
+                self.store.set_state(CONTENT_WEIGHTS_KEY, self.content_weights)
 
-    except Exception as e:
-        logger.error(f"Error engaging with followers: {str(e)}")
+        except Exception as e:
+            self.logger.error(f"Error adapting strategy: {str(e)}")
 
+    # Data Management Functions
+    def save_data(self):
+        """Snapshot the aggregator and engagement index and compact the history store (records are already durable once appended)"""
+        try:
+            self.aggregator.save(self.store)
+            self.engagement_index.save(self.store)
+            self.store.compact()
 
-# Step 4: Performance Analysis Function
-def analyze_performance():
-    """Analyze post performance and gather metrics"""
-    try:
-        # Update metrics for recent posts
-        for post in post_history[-10:]:  # Last 10 posts
-            try:
-                tweet = api.get_status(post["id"])
-                post["likes"] = tweet.favorite_count
-                post["retweets"] = tweet.retweet_count
+        except Exception as e:
+            self.logger.error(f"Error saving data: {str(e)}")
 
-                # Calculate engagement
-                engagement = post["likes"] + post["retweets"]
-                post["engagement"] = engagement
+    def load_data(self):
+        """Load existing data, migrating the old JSON history files on first run"""
+        try:
+            if self.account == "default":
+                self.store.migrate_legacy("post_history.json", "analytics_data.json")
+            self.aggregator.load(self.store)
+            self.engagement_index.load(self.store)
+            self.similarity.load(self.store)
+            self.content_weights.update(self.store.get_state(CONTENT_WEIGHTS_KEY, {}))
+            self.loaded = True
 
-            except Exception as e:
-                logger.error(f"Error analyzing tweet {post['id']}: {str(e)}")
-                continue
-
-        # Generate analytics report
-        if post_history:
-            total_posts = len(post_history)
-            total_likes = sum(p.get("likes", 0) for p in post_history)
-            total_retweets = sum(p.get("retweets", 0) for p in post_history)
-            avg_engagement = (
-                (total_likes + total_retweets) / total_posts if total_posts > 0 else 0
-            )
+        except Exception as e:
+            self.logger.error(f"Error loading data: {str(e)}")
 
-            analytics_report = {
-                "date": str(datetime.now().date()),
-                "total_posts": total_posts,
-                "total_likes": total_likes,
-                "total_retweets": total_retweets,
-                "average_engagement": avg_engagement,
-            }
+    # Scheduling Functions
+    def schedule(self, scheduler):
+        """Schedule posts at optimal times"""
+        name = f"{self.account}."
+        for time_slot in self.posting_times:
+            scheduler.daily(time_slot, self.create_post, name=name + "create_post", timeout=5 * 60)
 
-            analytics_data.append(analytics_report)
-            save_data()
+        # Schedule engagement activities
+        scheduler.every(
+            ENGAGE_INTERVAL, self.engage_with_followers, name=name + "engage", timeout=30 * 60
+        )
 
-            logger.info(
-                f"Analytics: {total_posts} posts, {avg_engagement:.2f} avg engagement"
-            )
+        # Schedule daily analytics
+        scheduler.daily("23:00", self.analyze_performance, name=name + "analyze", timeout=60 * 60)
 
-    except Exception as e:
-        logger.error(f"Error analyzing performance: {str(e)}")
+        # Schedule weekly strategy adaptation
+        scheduler.weekly("monday", "08:00", self.adapt_strategy, name=name + "adapt", timeout=10 * 60)
 
+        # Schedule daily compaction of the history store
+        scheduler.daily("23:30", self.save_data, name=name + "compact", timeout=10 * 60)
 
-# Step 5: Learning and Adaptation Function
-def adapt_strategy():
-    """Adapt posting strategy based on performance"""
-    try:
-        if len(post_history) < 5:
-            return
-
-        # Find best performing posts
-        best_posts = sorted(
-            post_history, key=lambda x: x.get("engagement", 0), reverse=True
-        )[:3]
-
-        # Log insights
-        logger.info("Top performing content types:")
-        for i, post in enumerate(best_posts[:3], 1):
-            logger.info(
-                f"{i}. {post['content'][:30]}... (Engagement: {post.get('engagement', 0)})"
-            )
+    def verify_credentials(self):
+        """Verify the API connection; return True on success"""
+        try:
+            self.api.verify_credentials()
+            self.logger.info("API authentication successful!")
+            return True
+        except Exception as e:
+            self.logger.error(f"API authentication failed: {str(e)}")
+            return False
 
-        # Adapt content based on performance
-        if best_posts:
-            best_content = best_posts[0]["content"]
-            if "#AI" in best_content or "#Technology" in best_content:
-                # Increase tech content probability
-                logger.info("Adapting: Increasing tech content based on performance")
+    # Testing and Manual Functions
+    def test_post(self):
+        """Test posting functionality"""
+        try:
+            content = "🤖 Testing my AI Twitter Agent! This is automated content creation in action. #AI #Automation #Test"
+            tweet = self.api.update_status(content)
+            self.logger.info(f"Test tweet posted successfully: {tweet.id}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Test post failed: {str(e)}")
+            return False
 
-    except Exception as e:
-        logger.error(f"Error adapting strategy: {str(e)}")
+    def manual_post(self, content):
+        """Manually post custom content"""
+        try:
+            self.api.update_status(content)
+            metrics.POSTS.labels("x").inc()
+            self.logger.info(f"Manual tweet posted: {content[:50]}...")
+            return True
+        except Exception as e:
+            self.logger.error(f"Manual post failed: {str(e)}")
+            return False
 
+    def get_analytics_summary(self):
+        """Get current analytics summary"""
+        latest = self.store.latest_analytics()
+        if not latest:
+            return "No analytics data available yet."
 
-# Data Management Functions
-def save_data():
-    """Save post history and analytics data"""
-    try:
-        with open("post_history.json", "w") as f:
-            json.dump(post_history, f, indent=2)
+        return f"""
+    📊 Latest Analytics Summary:
+    📅 Date: {latest['date']}
+    📝 Total Posts: {latest['total_posts']}
+    ❤️ Total Likes: {latest['total_likes']}
+    🔄 Total Retweets: {latest['total_retweets']}
+    📈 Average Engagement: {latest['average_engagement']:.2f}
+    """
 
-        with open("analytics_data.json", "w") as f:
-            json.dump(analytics_data, f, indent=2)
 
-    except Exception as e:
-        logger.error(f"Error saving data: {str(e)}")
+_default_agent = None
+_default_lock = threading.Lock()
 
 
-def load_data():
-    """Load existing data"""
-    global post_history, analytics_data
+def default_agent():
+    """Return the default account used by the interactive menu, creating it on first use"""
+    global _default_agent
+    with _default_lock:
+        if _default_agent is None:
+            _default_agent = Agent()
+        return _default_agent
+
+
+def __getattr__(name):
+    # The module-level agent, api and store of earlier versions, now built on first access
+    if name == "agent":
+        return default_agent()
+    if name in ("api", "store"):
+        return getattr(default_agent(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    try:
-        if os.path.exists("post_history.json"):
-            with open("post_history.json", "r") as f:
-                post_history = json.load(f)
 
-        if os.path.exists("analytics_data.json"):
-            with open("analytics_data.json", "r") as f:
-                analytics_data = json.load(f)
+def generate_content():
+    """Generate content for the default account"""
+    return default_agent().generate_content()
 
-    except Exception as e:
-        logger.error(f"Error loading data: {str(e)}")
 
+def create_post():
+    """Create and post a tweet from the default account"""
+    default_agent().create_post()
 
-# Scheduling Functions
-def schedule_posts():
-    """Schedule posts at optimal times"""
-    for time_slot in POSTING_TIMES:
-        schedule.every().day.at(time_slot).do(create_post)
 
-    # Schedule engagement activities
-    schedule.every(2).hours.do(engage_with_followers)
+def engage_with_followers():
+    """Engage with mentions of the default account"""
+    default_agent().engage_with_followers()
 
-    # Schedule daily analytics
-    schedule.every().day.at("23:00").do(analyze_performance)
 
-    # Schedule weekly strategy adaptation
-    schedule.every().monday.at("08:00").do(adapt_strategy)
+def analyze_performance():
+    """Analyze post performance of the default account"""
+    default_agent().analyze_performance()
+
+
+def adapt_strategy():
+    """Adapt the default account's posting strategy"""
+    default_agent().adapt_strategy()
+
+
+def save_data():
+    """Compact the default account's history store"""
+    default_agent().save_data()
+
+
+def load_data():
+    """Load the default account's existing data"""
+    default_agent().load_data()
+
 
+def schedule_posts(scheduler):
+    """Schedule the default account's jobs"""
+    default_agent().schedule(scheduler)
     logger.info("All tasks scheduled successfully!")
 
 
 # Main execution function
-def run_agent(days=30):
+def run_agent(days=30, stream=False):
     """Run the AI agent for specified number of days"""
+    import asyncio
+
+    from async_scheduler import AsyncScheduler
+
+    agent = default_agent()
     logger.info(f"Starting AI Twitter Agent for {days} days...")
+    metrics.start_from_env()
 
     # Load existing data
     load_data()
 
     # Verify API connection
-    try:
-        api.verify_credentials()
-        logger.info("API authentication successful!")
-    except Exception as e:
-        logger.error(f"API authentication failed: {str(e)}")
+    if not agent.verify_credentials():
         return
 
     # Schedule all tasks
-    schedule_posts()
+    scheduler = AsyncScheduler()
+    schedule_posts(scheduler)
 
-    # Run the agent
-    end_date = datetime.now() + timedelta(days=days)
+    # Stream mode replies to mentions within seconds; the 2-hour job still catches up on any
+    # mentions missed while the stream was disconnected
+    events = agent.event_stream().start() if stream else None
 
-    while datetime.now() < end_date:
-        try:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+    # Run the agent: the scheduler sleeps until the next job is due and runs jobs concurrently
+    end_date = datetime.now() + timedelta(days=days)
 
-        except KeyboardInterrupt:
-            logger.info("Agent stopped by user")
-            break
-        except Exception as e:
-            logger.error(f"Error in main loop: {str(e)}")
-            time.sleep(300)  # Wait 5 minutes before retrying
+    try:
+        asyncio.run(scheduler.run(until=end_date.timestamp()))
+    except KeyboardInterrupt:
+        logger.info("Agent stopped by user")
+    finally:
+        if events is not None:
+            logger.info(f"Event stream: {events.stop()}")
+            agent.mentions.save()
+        scheduler.shutdown()
+        save_data()
 
     logger.info("AI Twitter Agent completed successfully!")
 
 
-# Testing and Manual Functions
 def test_post():
     """Test posting functionality"""
-    try:
-        content = "🤖 Testing my AI Twitter Agent! This is automated content creation in action. #AI #Automation #Test"
-        tweet = api.update_status(content)
-        logger.info(f"Test tweet posted successfully: {tweet.id}")
-        return True
-    except Exception as e:
-        logger.error(f"Test post failed: {str(e)}")
-        return False
+    return default_agent().test_post()
 
 
 def manual_post(content):
     """Manually post custom content"""
-    try:
-        tweet = api.update_status(content)
-        logger.info(f"Manual tweet posted: {content[:50]}...")
-        return True
-    except Exception as e:
-        logger.error(f"Manual post failed: {str(e)}")
-        return False
+    return default_agent().manual_post(content)
 
 
 def get_analytics_summary():
     """Get current analytics summary"""
-    if not analytics_data:
-        return "No analytics data available yet."
-
-    latest = analytics_data[-1]
-    return f"""
-    📊 Latest Analytics Summary:
-    📅 Date: {latest['date']}
-    📝 Total Posts: {latest['total_posts']}
-    ❤️ Total Likes: {latest['total_likes']}
-    🔄 Total Retweets: {latest['total_retweets']}
-    📈 Average Engagement: {latest['average_engagement']:.2f}
-    """
+    return default_agent().get_analytics_summary()
 
 
 # Interactive Menu
-def main():
-    """Main function with interactive menu"""
+def menu():
+    """Interactive menu for the default account"""
     print("🤖 AI Twitter Agent - Interactive Menu")
     print("=" * 40)
 
@@ -395,7 +611,7 @@ def main():
 
         if choice == "1":
             try:
-                api.verify_credentials()
+                default_agent().api.verify_credentials()
                 print("✅ API connection successful!")
             except Exception as e:
                 print(f"❌ API connection failed: {str(e)}")
@@ -428,8 +644,45 @@ def main():
             print("❌ Invalid choice. Please try again.")
 
 
+def main(argv=None):
+    """Command line entry point: the interactive menu, or one command"""
+    parser = argparse.ArgumentParser(description="AI Twitter Agent")
+    commands = parser.add_subparsers(dest="command")
+    run = commands.add_parser("run", help="run the automation")
+    run.add_argument("--days", type=int, default=30)
+    run.add_argument("--stream", action="store_true", help="reply to mentions as they arrive")
+    commands.add_parser("verify", help="test the API connection")
+    commands.add_parser("test-post", help="post a test tweet")
+    post = commands.add_parser("post", help="post custom content")
+    post.add_argument("content")
+    commands.add_parser("analytics", help="show the latest analytics")
+    args = parser.parse_args(argv)
+
+    # Load environment variables and set up logging: records are written by a background thread
+    # in batches (LOG_FORMAT=json for structured lines), so posting and replying never wait on
+    # disk or terminal I/O
+    load_env()
+    from log_pipeline import setup_logging
+
+    setup_logging("twitter_agent.log")
+
+    if args.command is None:
+        menu()
+    elif args.command == "run":
+        run_agent(args.days, stream=args.stream)
+    elif args.command == "verify":
+        return 0 if default_agent().verify_credentials() else 1
+    elif args.command == "test-post":
+        return 0 if test_post() else 1
+    elif args.command == "post":
+        return 0 if manual_post(args.content) else 1
+    elif args.command == "analytics":
+        print(get_analytics_summary())
+    return 0
+
+
 # Graded Assignment (20): Create an AI agent that automates tasks of creating posts on social media platforms
 # like X.com (formerly Twitter), LinkedIn, Pinterest, Telegram (etc) using Python.
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+# Agent Runtime
+# Hosts many X.com agents (one per account) in a single process.
+#
+# Running one OS process per account duplicates the interpreter, the imported libraries, the
+# HTTP connection pool and the scheduler for every account. The runtime shares them instead:
+# 1. **One scheduler**: Every agent's jobs go into one AsyncScheduler and one event loop.
+# 2. **One connection pool**: All tweepy clients reuse one pooled requests.Session
+#    (tweepy signs each request with the account's own OAuth credentials).
+# 3. **One logging pipeline**: Agents log through the shared logger, tagged with their account.
+#
+# Accounts can be added in code or loaded from a JSON file such as:
+# [{"account": "acme", "env_prefix": "ACME_TWITTER", "posting_times": ["10:00", "16:00"]}]
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+import metrics
+from AI_Driven_Agent import Agent, credentials_from_env
+from async_scheduler import AsyncScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def pooled_session(pool_size=64):
+    """Build one keep-alive HTTP session sized for many accounts"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class AgentRuntime:
+    def __init__(self, data_dir=".", max_workers=32, pool_size=64, clock=time.time):
+        self.data_dir = data_dir
+        self.pool_size = pool_size
+        self.clock = clock
+        self.scheduler = AsyncScheduler(clock=clock, max_workers=max_workers)
+        self.agents = {}
+        self._session = None
+
+    @property
+    def session(self):
+        """The HTTP session shared by every hosted agent, created on first use"""
+        if self._session is None:
+            self._session = pooled_session(self.pool_size)
+        return self._session
+
+    def add_agent(self, account, credentials=None, api=None, **options):
+        """Create and host an agent for one account"""
+        if account in self.agents:
+            raise ValueError(f"Account {account} is already hosted")
+        if api is None:
+            options["session"] = self.session
+        agent = Agent(
+            account=account,
+            api=api,
+            credentials=credentials,
+            data_dir=options.pop("data_dir", self.data_dir),
+            clock=self.clock,
+            **options,
+        )
+        self.agents[account] = agent
+        return agent
+
+    def load_accounts(self, path):
+        """Host every account listed in a JSON config file"""
+        with open(path, "r") as f:
+            accounts = json.load(f)
+        for entry in accounts:
+            entry = dict(entry)
+            account = entry.pop("account")
+            prefix = entry.pop("env_prefix", "TWITTER")
+            self.add_agent(account, credentials=credentials_from_env(prefix), **entry)
+        logger.info(f"Loaded {len(accounts)} accounts from {path}")
+
+    def start(self, verify=True):
+        """Load every agent's data, verify credentials and schedule its jobs"""
+        pool = self.scheduler.executor
+        for agent in self.agents.values():
+            if not agent.loaded:
+                agent.load_data()
+        if verify:
+            results = pool.map(lambda agent: (agent, agent.verify_credentials()), self.agents.values())
+            for agent, ok in list(results):
+                if not ok:
+                    logger.error(f"Not scheduling {agent.account}: authentication failed")
+                    del self.agents[agent.account]
+        for agent in self.agents.values():
+            agent.schedule(self.scheduler)
+        logger.info(
+            f"Runtime started: {len(self.agents)} agents, {len(self.scheduler.jobs)} jobs scheduled"
+        )
+
+    def run(self, days=30, verify=True):
+        """Run every hosted agent for the given number of days"""
+        metrics.start_from_env()
+        self.start(verify)
+        end_date = datetime.fromtimestamp(self.clock()) + timedelta(days=days)
+        try:
+            asyncio.run(self.scheduler.run(until=end_date.timestamp()))
+        except KeyboardInterrupt:
+            logger.info("Runtime stopped by user")
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the scheduler and close every agent's store"""
+        self.scheduler.shutdown()
+        for agent in self.agents.values():
+            agent.store.close()
+        if self._session is not None:
+            self._session.close()
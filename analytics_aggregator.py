@@ -0,0 +1,205 @@
+# Analytics Aggregator
+# Incremental, bucketed engagement analytics for the agents.
+#
+# analyze_performance() used to re-sum likes and retweets over the entire post history on
+# every run. The aggregator keeps running totals instead and only touches what changed:
+# 1. **Totals**: Posts, likes, retweets and replies across the whole history.
+# 2. **Buckets**: The same counters per day, per hashtag and per content type.
+# 3. **Time decay**: Each bucket also keeps an exponentially decayed engagement rate, so
+#    recent performance counts more than last month's.
+# 4. **Deltas**: A metrics refresh applies only the difference to the affected buckets, so a
+#    report costs O(changed posts) instead of O(history).
+#
+# The aggregator state is small (one entry per day/hashtag/content type, with day buckets kept
+# for RETENTION_DAYS) and is persisted in the history store's state table together with the
+# sequence number of the newest post it covers. Saving is left to the daily analysis and
+# shutdown; on startup only posts appended since the last save are replayed from the history,
+# and the state is only rebuilt from scratch if it is missing.
+
+import bisect
+import math
+import re
+import time
+from datetime import datetime, timedelta
+
+from history_store import post_timestamp
+
+HASHTAG_PATTERN = re.compile(r"#\w+")
+METRICS = ("likes", "retweets", "replies")
+BUCKET_KINDS = ("day", "hashtag", "content_type")
+STATE_KEY = "analytics_aggregator"
+RETENTION_DAYS = 400
+
+
+def hashtags(content):
+    """Return the distinct hashtags in a post, lower-cased"""
+    return sorted({tag.lower() for tag in HASHTAG_PATTERN.findall(content or "")})
+
+
+def _empty_bucket():
+    return {
+        "posts": 0,
+        "likes": 0,
+        "retweets": 0,
+        "replies": 0,
+        "decayed_engagement": 0.0,
+        "decayed_posts": 0.0,
+        "updated": 0.0,
+    }
+
+
+class AnalyticsAggregator:
+    def __init__(self, half_life_days=7, classify=None, clock=time.time, retention_days=RETENTION_DAYS):
+        self.retention_days = retention_days
+        self.decay_rate = math.log(2) / (half_life_days * 24 * 60 * 60)
+        self.classify = classify or (lambda content: "general")
+        self.clock = clock
+        self.totals = _empty_bucket()
+        self.buckets = {kind: {} for kind in BUCKET_KINDS}
+        self.days = []  # sorted day keys for range queries
+
+    # Bucket bookkeeping
+    def _keys(self, post):
+        yield "day", post["date"]
+        for tag in hashtags(post.get("content")):
+            yield "hashtag", tag
+        yield "content_type", post.get("content_type") or self.classify(post.get("content"))
+
+    def _bucket(self, kind, key):
+        buckets = self.buckets[kind]
+        if key not in buckets:
+            buckets[key] = _empty_bucket()
+            if kind == "day":
+                bisect.insort(self.days, key)
+        return buckets[key]
+
+    def _decay(self, bucket, now):
+        elapsed = now - bucket["updated"]
+        if elapsed > 0:
+            factor = math.exp(-self.decay_rate * elapsed)
+            bucket["decayed_engagement"] *= factor
+            bucket["decayed_posts"] *= factor
+            bucket["updated"] = now
+
+    def _apply(self, bucket, delta, now):
+        self._decay(bucket, now)
+        for name, value in delta.items():
+            bucket[name] += value
+        bucket["decayed_engagement"] += delta.get("likes", 0) + delta.get("retweets", 0)
+        bucket["decayed_posts"] += delta.get("posts", 0)
+
+    # Updates
+    def add_post(self, post, now=None):
+        """Count a newly created post and its current metrics"""
+        now = self.clock() if now is None else now
+        delta = {"posts": 1}
+        for name in METRICS:
+            delta[name] = post.get(name, 0)
+        self._apply(self.totals, delta, now)
+        for kind, key in self._keys(post):
+            self._apply(self._bucket(kind, key), delta, now)
+
+    def update_post(self, post, previous, now=None):
+        """Apply the change between a post's previous and current metrics"""
+        now = self.clock() if now is None else now
+        delta = {
+            name: post.get(name, 0) - previous.get(name, 0)
+            for name in METRICS
+            if post.get(name, 0) != previous.get(name, 0)
+        }
+        if not delta:
+            return
+        self._apply(self.totals, delta, now)
+        for kind, key in self._keys(post):
+            self._apply(self._bucket(kind, key), delta, now)
+
+    # Queries
+    def _summary(self, bucket, now):
+        self._decay(bucket, now)
+        posts = bucket["posts"]
+        engagement = bucket["likes"] + bucket["retweets"]
+        return {
+            "posts": posts,
+            "likes": bucket["likes"],
+            "retweets": bucket["retweets"],
+            "replies": bucket["replies"],
+            "average_engagement": engagement / posts if posts else 0,
+            "decayed_engagement_rate": (
+                bucket["decayed_engagement"] / bucket["decayed_posts"]
+                if bucket["decayed_posts"] > 1e-9
+                else 0
+            ),
+        }
+
+    def bucket(self, kind, key, now=None):
+        """Return the summary of one bucket, e.g. bucket("hashtag", "#ai")"""
+        now = self.clock() if now is None else now
+        bucket = self.buckets[kind].get(key)
+        return self._summary(bucket, now) if bucket else self._summary(_empty_bucket(), now)
+
+    def keys(self, kind):
+        """Return the keys of every bucket of a kind"""
+        return list(self.days) if kind == "day" else list(self.buckets[kind])
+
+    def range(self, start_date, end_date):
+        """Sum the day buckets between two YYYY-MM-DD dates (inclusive)"""
+        low = bisect.bisect_left(self.days, str(start_date))
+        high = bisect.bisect_right(self.days, str(end_date))
+        combined = {"posts": 0, "likes": 0, "retweets": 0, "replies": 0}
+        for day in self.days[low:high]:
+            bucket = self.buckets["day"][day]
+            for name in combined:
+                combined[name] += bucket[name]
+        engagement = combined["likes"] + combined["retweets"]
+        combined["average_engagement"] = engagement / combined["posts"] if combined["posts"] else 0
+        return combined
+
+    def report(self, date=None, now=None):
+        """Build an analytics snapshot from the running totals"""
+        now = self.clock() if now is None else now
+        summary = self._summary(self.totals, now)
+        return {
+            "date": str(date or datetime.fromtimestamp(now).date()),
+            "total_posts": summary["posts"],
+            "total_likes": summary["likes"],
+            "total_retweets": summary["retweets"],
+            "total_replies": summary["replies"],
+            "average_engagement": summary["average_engagement"],
+            "decayed_engagement_rate": summary["decayed_engagement_rate"],
+        }
+
+    def prune(self, now=None):
+        """Drop day buckets older than the retention window; totals and other buckets keep their counts"""
+        now = self.clock() if now is None else now
+        cutoff = str((datetime.fromtimestamp(now) - timedelta(days=self.retention_days)).date())
+        expired = bisect.bisect_left(self.days, cutoff)
+        for day in self.days[:expired]:
+            del self.buckets["day"][day]
+        del self.days[:expired]
+
+    # Persistence
+    def save(self, store):
+        """Persist the aggregator state in the history store"""
+        self.prune()
+        seq = store.last_seq()
+        store.set_state(STATE_KEY, {"seq": seq, "totals": self.totals, "buckets": self.buckets})
+
+    def load(self, store):
+        """Restore state from the store, replaying only posts appended since it was saved"""
+        state = store.get_state(STATE_KEY)
+        if state is None:
+            for post in store.iter_posts():
+                self.add_post(post, now=post_timestamp(post))
+            self.save(store)
+            return self
+
+        self.totals = state["totals"]
+        self.buckets = state["buckets"]
+        self.days = sorted(self.buckets["day"])
+        # State saved before the sequence number was recorded was written after every post
+        seq = state.get("seq")
+        if seq is not None:
+            for post in store.iter_posts(after_seq=seq):
+                self.add_post(post, now=post_timestamp(post))
+        self.prune()
+        return self
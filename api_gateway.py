@@ -0,0 +1,277 @@
+# API Gateway
+# Single entry point for the agents' X.com API calls, aware of each endpoint's rate limit.
+#
+# How it works:
+# 1. **Rate windows**: Each v1.1 endpoint gets a window (limit, remaining, reset). Windows start
+#    from the documented per-user limits and are corrected from the x-rate-limit-* headers of
+#    every response. A call takes one from `remaining` first; when the window is empty it waits
+#    for the reset instead of sending a request that would come back 429.
+# 2. **Jittered backoff**: 429s, 5xx errors and dropped connections are retried with
+#    exponential backoff and full jitter. A 429 waits at least until its window resets. Writes
+#    are only retried after a 429, because a 5xx or timeout may still have posted.
+# 3. **Coalesced reads**: Identical read calls already in flight share one request, so
+#    concurrent jobs asking for the same status or mentions page cost one call.
+# 4. **Budget API**: budget(), calls_available() and time_until() let jobs size their work to
+#    the quota that is left (see Agent.analyze_performance and engage_with_followers).
+# 5. **Metrics**: Every request's latency and outcome is recorded per endpoint (see metrics.py).
+
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# tweepy.API method -> (v1.1 resource, calls per window, window seconds) for user auth
+ENDPOINTS = {
+    "verify_credentials": ("account/verify_credentials", 75, 15 * 60),
+    "get_status": ("statuses/show", 900, 15 * 60),
+    "lookup_statuses": ("statuses/lookup", 900, 15 * 60),
+    "mentions_timeline": ("statuses/mentions_timeline", 75, 15 * 60),
+    "user_timeline": ("statuses/user_timeline", 900, 15 * 60),
+    "home_timeline": ("statuses/home_timeline", 15, 15 * 60),
+    # Writes send no rate-limit headers; this is the documented 300 per 3 hours
+    "update_status": ("statuses/update", 300, 3 * 60 * 60),
+}
+WRITE_METHODS = {"update_status", "destroy_status", "retweet", "create_favorite"}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait longer than the gateway's max_wait"""
+
+    def __init__(self, endpoint, wait):
+        super().__init__(f"{endpoint} rate limit exhausted for another {wait:.0f}s")
+        self.endpoint = endpoint
+        self.wait = wait
+
+
+class RateWindow:
+    def __init__(self, limit, window_seconds, clock=time.time):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.remaining = limit
+        self.reset = clock() + window_seconds
+
+    def _roll(self, now):
+        if now >= self.reset:
+            self.remaining = self.limit
+            self.reset = now + self.window_seconds
+
+    def available(self, now):
+        self._roll(now)
+        return self.remaining
+
+    def time_until(self, calls, now):
+        """Seconds until `calls` calls fit in the window"""
+        self._roll(now)
+        if calls <= self.remaining:
+            return 0.0
+        # A window refills completely at its reset; more than one window's worth waits longer
+        windows = -(-(calls - self.remaining) // self.limit)
+        return self.reset - now + (windows - 1) * self.window_seconds
+
+    def take(self, now):
+        """Reserve one call; return 0 or the seconds to wait before trying again"""
+        self._roll(now)
+        if self.remaining > 0:
+            self.remaining -= 1
+            return 0.0
+        return max(self.reset - now, 0.0)
+
+    def update(self, limit, remaining, reset):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+
+
+def _status_code(error):
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _is_connection_error(error):
+    # tweepy re-raises requests errors as TweepyException("Failed to send request: ...")
+    requests = sys.modules.get("requests")
+    if requests is None:
+        # Nothing has been sent through requests, so the error cannot come from it
+        return False
+    cause = error.__cause__ or error.__context__
+    return isinstance(error, requests.RequestException) or isinstance(cause, requests.RequestException)
+
+
+def _freeze(value):
+    """A hashable copy of call arguments, for coalescing"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+class ApiGateway:
+    def __init__(
+        self,
+        api,
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_max=60.0,
+        max_wait=15 * 60,
+        clock=time.time,
+        sleep=time.sleep,
+        rng=None,
+    ):
+        self.api = api
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.windows = {
+            method: RateWindow(limit, window_seconds, clock)
+            for method, (_, limit, window_seconds) in ENDPOINTS.items()
+        }
+        self.stats = {"calls": 0, "coalesced": 0, "retries": 0, "waited_seconds": 0.0}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.api, name)
+        if not callable(attribute):
+            return attribute
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    # Budget API
+    def budget(self, endpoint):
+        """Return {limit, remaining, reset} for an endpoint, or None if it is not tracked"""
+        window = self.windows.get(endpoint)
+        if window is None:
+            return None
+        with self._lock:
+            remaining = window.available(self.clock())
+            return {"limit": window.limit, "remaining": remaining, "reset": window.reset}
+
+    def budgets(self):
+        return {endpoint: self.budget(endpoint) for endpoint in self.windows}
+
+    def calls_available(self, endpoint):
+        """Calls that can be made right now without waiting"""
+        budget = self.budget(endpoint)
+        return float("inf") if budget is None else budget["remaining"]
+
+    def time_until(self, endpoint, calls=1):
+        """Seconds until `calls` calls to an endpoint can be made"""
+        window = self.windows.get(endpoint)
+        if window is None:
+            return 0.0
+        with self._lock:
+            return window.time_until(calls, self.clock())
+
+    # Calls
+    def _wait(self, seconds):
+        self.sleep(seconds)
+        with self._lock:
+            self.stats["waited_seconds"] += seconds
+
+    def _reserve(self, endpoint):
+        window = self.windows.get(endpoint)
+        if window is None:
+            return
+        while True:
+            with self._lock:
+                wait = window.take(self.clock())
+            if wait <= 0:
+                return
+            if wait > self.max_wait:
+                raise RateLimitExceeded(endpoint, wait)
+            logger.info(f"{endpoint}: rate limit reached, waiting {wait:.0f}s for the window to reset")
+            self._wait(wait)
+
+    def _record_headers(self, endpoint, response):
+        if response is None or endpoint not in self.windows:
+            return
+        headers = getattr(response, "headers", None) or {}
+        resource = ENDPOINTS[endpoint][0]
+        # api.last_response is shared; only trust it if it belongs to this endpoint
+        if "x-rate-limit-remaining" not in headers or resource not in str(getattr(response, "url", "")):
+            return
+        try:
+            limit = int(headers["x-rate-limit-limit"])
+            remaining = int(headers["x-rate-limit-remaining"])
+            # The reset is in whole seconds; wait one more so the first call after it is not early
+            reset = float(headers["x-rate-limit-reset"]) + 1
+        except (KeyError, ValueError):
+            return
+        with self._lock:
+            self.windows[endpoint].update(limit, remaining, reset)
+
+    def _backoff(self, attempt):
+        return self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _send(self, endpoint, args, kwargs):
+        write = endpoint in WRITE_METHODS
+        attempt = 0
+        while True:
+            self._reserve(endpoint)
+            with self._lock:
+                self.stats["calls"] += 1
+            start = time.perf_counter()
+            try:
+                result = getattr(self.api, endpoint)(*args, **kwargs)
+                metrics.API_LATENCY.labels("x", endpoint).observe(time.perf_counter() - start)
+                metrics.API_CALLS.labels("x", endpoint, "ok").inc()
+                self._record_headers(endpoint, getattr(self.api, "last_response", None))
+                return result
+            except Exception as e:
+                status = _status_code(e)
+                metrics.API_LATENCY.labels("x", endpoint).observe(time.perf_counter() - start)
+                metrics.API_CALLS.labels("x", endpoint, str(status or "error")).inc()
+                if status == 429:
+                    self._record_headers(endpoint, e.response)
+                    window = self.windows.get(endpoint)
+                    with self._lock:
+                        if window is not None:
+                            window.remaining = 0
+                    delay = max(self.time_until(endpoint), self._backoff(attempt))
+                elif not write and ((status is not None and status >= 500) or _is_connection_error(e)):
+                    delay = self._backoff(attempt)
+                else:
+                    raise
+                if attempt >= self.max_retries or delay > self.max_wait:
+                    raise
+                attempt += 1
+                with self._lock:
+                    self.stats["retries"] += 1
+                logger.warning(f"{endpoint} failed ({str(e)}), retry {attempt} in {delay:.1f}s")
+                self._wait(delay)
+
+    def call(self, endpoint, *args, **kwargs):
+        """Call an API method through the rate windows, retries and read coalescing"""
+        if endpoint in WRITE_METHODS:
+            return self._send(endpoint, args, kwargs)
+        key = (endpoint, _freeze(args), _freeze(kwargs))
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not owner:
+            return future.result()
+        try:
+            result = self._send(endpoint, args, kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
@@ -0,0 +1,229 @@
+# Async Scheduler
+# Heap-based asyncio scheduler for the agents' recurring jobs.
+#
+# run_agent() used to poll schedule.run_pending() and then sleep for 60 seconds, so jobs fired
+# up to a minute late and ran one after another. This scheduler instead:
+# 1. **Sleeps until the next job is due**: Jobs live in a heap ordered by due time and the loop
+#    waits exactly until the earliest one (or until a new job is added), with no fixed polling.
+# 2. **Runs jobs concurrently**: Each due job becomes its own task; blocking functions run on a
+#    shared thread pool so a slow engagement pass never delays a post.
+# 3. **Enforces per-job timeouts**: A job that overruns its timeout is logged and abandoned.
+#    Blocking jobs wait for a free pool thread before their clock starts, and an abandoned job
+#    keeps its thread until it really returns, so queued jobs are never counted as timed out.
+# 4. **Keeps the `schedule` semantics**: every(seconds), daily at "HH:MM", weekly on a weekday.
+# 5. **Exports metrics**: Lag (fire time minus due time), duration and outcome of every job, and
+#    the number of jobs running (see metrics.py).
+#
+# One scheduler (and one event loop) can drive the jobs of hundreds of accounts.
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import metrics
+from log_pipeline import current_job, run_job
+
+logger = logging.getLogger(__name__)
+
+LAG = metrics.histogram("scheduler_lag_seconds", "Delay between a job's due time and when it fired")
+JOB_SECONDS = metrics.histogram("scheduler_job_seconds", "Job run time", ("job",))
+JOBS = metrics.counter("scheduler_jobs_total", "Jobs run, by outcome", ("job", "outcome"))
+RUNNING = metrics.gauge("scheduler_jobs_running", "Jobs currently running")
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def _parse_time(at):
+    hour, minute = at.split(":")[:2]
+    return int(hour), int(minute)
+
+
+class Job:
+    def __init__(self, func, name=None, interval=None, at=None, weekday=None, timeout=None):
+        self.func = func
+        self.name = name or getattr(func, "__name__", repr(func))
+        self.interval = interval
+        self.at = _parse_time(at) if at else None
+        self.weekday = WEEKDAYS.index(weekday.lower()) if isinstance(weekday, str) else weekday
+        self.timeout = timeout
+        self.next_run = None
+        self.last_run = None
+        self.cancelled = False
+
+    def compute_next_run(self, after):
+        """Return the first due time strictly after the epoch timestamp `after`"""
+        if self.interval is not None:
+            if self.next_run is None:
+                return after + self.interval
+            # Skip runs missed while the loop was busy instead of firing them in a burst
+            missed = max(0, int((after - self.next_run) // self.interval))
+            return self.next_run + (missed + 1) * self.interval
+
+        moment = datetime.fromtimestamp(after)
+        candidate = moment.replace(hour=self.at[0], minute=self.at[1], second=0, microsecond=0)
+        if self.weekday is not None:
+            candidate += timedelta(days=(self.weekday - candidate.weekday()) % 7)
+            step = timedelta(days=7)
+        else:
+            step = timedelta(days=1)
+        while candidate.timestamp() <= after:
+            candidate += step
+        return candidate.timestamp()
+
+    def __repr__(self):
+        return f"Job({self.name}, next_run={self.next_run})"
+
+
+class AsyncScheduler:
+    def __init__(self, clock=time.time, max_workers=32, default_timeout=None):
+        self.clock = clock
+        self.default_timeout = default_timeout
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs = []
+        self._heap = []
+        self._seq = itertools.count()
+        self._loop = None
+        self._wakeup = None
+        self._slots = None  # one per pool thread, released when the thread is done
+        self._running = set()
+        self._stopped = False
+
+    # Job registration (mirrors schedule.every(...))
+    def add(self, job):
+        """Add a job and wake the loop if it is now the earliest"""
+        job.next_run = job.compute_next_run(self.clock())
+        self.jobs.append(job)
+        heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return job
+
+    def every(self, seconds, func, **kwargs):
+        """Run `func` every `seconds` seconds, first run one interval from now"""
+        return self.add(Job(func, interval=seconds, **kwargs))
+
+    def daily(self, at, func, **kwargs):
+        """Run `func` every day at "HH:MM" local time"""
+        return self.add(Job(func, at=at, **kwargs))
+
+    def weekly(self, weekday, at, func, **kwargs):
+        """Run `func` once a week, e.g. weekly("monday", "08:00", func)"""
+        return self.add(Job(func, at=at, weekday=weekday, **kwargs))
+
+    def cancel(self, job):
+        """Stop a job from firing again (its heap entry is dropped lazily)"""
+        job.cancelled = True
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def next_run(self):
+        """Return the due time of the earliest job, or None"""
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and reschedule every job due at `now`; return [(due_time, job)]"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_time, _, job = heapq.heappop(self._heap)
+            if job.cancelled:
+                continue
+            due.append((due_time, job))
+            job.last_run = now
+            job.next_run = job.compute_next_run(max(now, due_time))
+            heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
+        return due
+
+    # Execution
+    async def _submit(self, job):
+        """Start `job` on a pool thread once one is free and return its future"""
+        loop, slots = self._loop, self._slots
+        await slots.acquire()
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                pass  # the loop has already closed
+
+        future = self.executor.submit(run_job, job.name, job.func)
+        future.add_done_callback(release)
+        return asyncio.wrap_future(future)
+
+    async def _execute(self, job, due_time):
+        kind = metrics.job_kind(job.name)
+        timeout = job.timeout if job.timeout is not None else self.default_timeout
+        coroutine = inspect.iscoroutinefunction(job.func)
+        # Only the time spent running counts against the timeout; waiting for a thread is lag
+        running = None if coroutine else await self._submit(job)
+        lag = self.clock() - due_time
+        LAG.observe(lag)
+        start = time.perf_counter()
+        outcome = "ok"
+        # Tag log records with the job: this task's context for coroutines, run_job in the thread
+        current_job.set(job.name)
+        try:
+            if coroutine:
+                await asyncio.wait_for(job.func(), timeout)
+            else:
+                await asyncio.wait_for(running, timeout)
+            elapsed = time.perf_counter() - start
+            logger.debug(f"Job {job.name} done in {elapsed:.3f}s (lag {lag:.3f}s)", extra={"latency": round(elapsed, 4)})
+        except asyncio.TimeoutError:
+            # The worker thread cannot be interrupted; it finishes in the background
+            outcome = "timeout"
+            logger.error(f"Job {job.name} timed out after {timeout}s")
+        except Exception as e:
+            outcome = "error"
+            logger.error(f"Job {job.name} failed: {str(e)}")
+        JOB_SECONDS.labels(kind).observe(time.perf_counter() - start)
+        JOBS.labels(kind, outcome).inc()
+
+    def _dispatch(self, due):
+        for due_time, job in due:
+            task = self._loop.create_task(self._execute(job, due_time))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def run(self, until=None):
+        """Dispatch jobs as they come due until `until` (epoch seconds) or stop()"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_workers)
+        RUNNING.set_function(lambda: len(self._running))
+        self._stopped = False
+        try:
+            while not self._stopped:
+                now = self.clock()
+                if until is not None and now >= until:
+                    break
+                self._dispatch(self.pop_due(now))
+
+                deadlines = [t for t in (self.next_run(), until) if t is not None]
+                timeout = max(0.0, min(deadlines) - self.clock()) if deadlines else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+        finally:
+            self._loop = None
+
+    def stop(self):
+        """Ask a running loop to finish after the jobs in flight"""
+        self._stopped = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def shutdown(self):
+        """Release the job thread pool"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
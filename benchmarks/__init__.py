@@ -0,0 +1,2 @@
+# Benchmarks for the agents and file tools.
+# Run each module from the repository root, e.g. `python -m benchmarks.metrics_refresh`.
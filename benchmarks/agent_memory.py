@@ -0,0 +1,55 @@
+# Benchmark: memory per hosted account in one AgentRuntime
+# Usage: python -m benchmarks.agent_memory [accounts] [posts_per_account]
+#
+# Hosts N agents backed by fake APIs and on-disk history stores, schedules their jobs and
+# reports the resident-set and Python-heap growth per account.
+
+import logging
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from agent_runtime import AgentRuntime
+from fake_apis import FakeTwitterAPI
+
+
+def rss_bytes():
+    """Current resident set size of this process (Linux)"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    posts = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        runtime = AgentRuntime(data_dir=data_dir)
+        tracemalloc.start()
+        rss_before = rss_bytes()
+        heap_before = tracemalloc.get_traced_memory()[0]
+
+        for i in range(accounts):
+            # No posting limits, so every create_post() call adds a post to the history
+            agent = runtime.add_agent(
+                f"account{i}", api=FakeTwitterAPI(), max_posts_per_day=None, rate_windows=[]
+            )
+            for _ in range(posts):
+                agent.create_post()
+        runtime.start(verify=False)
+
+        heap_after = tracemalloc.get_traced_memory()[0]
+        rss_after = rss_bytes()
+        tracemalloc.stop()
+
+        print(f"accounts hosted:      {accounts}")
+        print(f"jobs scheduled:       {len(runtime.scheduler.jobs)}")
+        print(f"RSS per account:      {(rss_after - rss_before) / accounts / 1024:.1f} KiB")
+        print(f"Python heap/account:  {(heap_after - heap_before) / accounts / 1024:.1f} KiB")
+        runtime.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Benchmark: content generation from a large JSONL template library
+# Usage: python -m benchmarks.content_engine [templates] [samples]
+#
+# Writes a corpus of weighted templates, builds its sidecar index once, then measures how long
+# reopening it takes, how much memory it costs, and the per-post generation latency.
+
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import json
+from datetime import datetime
+
+from content_engine import ContentEngine, TemplateCorpus
+
+PHRASES = ["Tip", "Thought", "Idea", "Reminder", "Question", "Fact"]
+
+
+def write_corpus(path, count):
+    rng = random.Random(7)
+    with open(path, "w") as f:
+        for i in range(count):
+            text = f"{PHRASES[i % len(PHRASES)]} #{i} for $day: exploring $topic today! $hashtag"
+            f.write(json.dumps({"text": text, "weight": rng.uniform(0.1, 10)}) + "\n")
+
+
+def rss_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "templates.jsonl")
+        write_corpus(path, count)
+        print(f"corpus: {count} templates, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        TemplateCorpus(path).build_index()
+        print(f"build index (once): {time.perf_counter() - start:.2f}s")
+
+        rss_before = rss_kib()
+        tracemalloc.start()
+        start = time.perf_counter()
+        corpus = TemplateCorpus(path).open()
+        print(f"open with index: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+        engine = ContentEngine({"library": corpus}, topics=["AI", "Python", "automation", "data science"])
+        when = datetime.now()
+        start = time.perf_counter()
+        for _ in range(samples):
+            engine.generate({"library": 1}, when)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"generate: {samples} posts, {elapsed / samples * 1e6:.1f}us per post")
+        print(f"python heap peak: {peak / 1024:.0f} KiB, max RSS growth: {rss_kib() - rss_before} KiB")
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Benchmark: serial shutil.copy2 vs the parallel CopyEngine
+# Usage: python -m benchmarks.copy_engine [small_files] [large_files] [large_mib] [workers]
+#
+# Two workloads: many small files, and a few large ones. Each is copied serially with
+# shutil.copy2 (the old exe.py loop), with a single-worker CopyEngine (the cost of atomic temp
+# file writes alone), with a full CopyEngine pool, and with a bandwidth cap to show the throttle
+# holding.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from copy_engine import CopyEngine
+
+
+def make_files(path, count, size):
+    os.makedirs(path)
+    for i in range(count):
+        with open(os.path.join(path, f"file{i}.bin"), "wb") as f:
+            f.write(os.urandom(size))
+    return [os.path.join(path, name) for name in sorted(os.listdir(path))]
+
+
+def serial(files, dest):
+    start = time.perf_counter()
+    for path in files:
+        shutil.copy2(path, os.path.join(dest, os.path.basename(path)))
+    return time.perf_counter() - start
+
+
+def parallel(files, dest, **options):
+    with CopyEngine(**options) as engine:
+        stats = engine.copy_many((path, os.path.join(dest, os.path.basename(path))) for path in files)
+    return stats["seconds"]
+
+
+def main():
+    small = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    large = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    large_size = (int(sys.argv[3]) if len(sys.argv) > 3 else 128) * 1024 * 1024
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workloads = (
+            (f"{small} x 16 KiB", make_files(os.path.join(tmp, "small"), small, 16 * 1024)),
+            (f"{large} x {large_size // (1024 * 1024)} MiB", make_files(os.path.join(tmp, "large"), large, large_size)),
+        )
+        for label, files in workloads:
+            total = sum(os.path.getsize(path) for path in files)
+            runs = (
+                ("serial copy2", lambda dest: serial(files, dest)),
+                ("CopyEngine x1 (atomic writes, no parallelism)", lambda dest: parallel(files, dest, workers=1)),
+                (f"CopyEngine x{workers}", lambda dest: parallel(files, dest, workers=workers)),
+                (
+                    f"CopyEngine x{workers}, capped at 50 MB/s",
+                    lambda dest: parallel(files, dest, workers=workers, bandwidth=50_000_000),
+                ),
+            )
+            for name, run in runs:
+                dest = tempfile.mkdtemp(dir=tmp)
+                seconds = run(dest)
+                print(f"{label}, {name}: {seconds:.2f}s ({total / seconds / 1e6:.0f} MB/s)")
+                shutil.rmtree(dest)
+
+
+if __name__ == "__main__":
+    main()
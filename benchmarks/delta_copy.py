@@ -0,0 +1,65 @@
+# Benchmark: backing up a large file after small edits, shutil.copy2 vs delta_copy
+# Usage: python -m benchmarks.delta_copy [file_mib]
+#
+# Each scenario edits the source (overwrite in the middle, insertion near the start, append),
+# then updates the backup with both methods and reports time and bytes transferred.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from delta_copy import delta_copy
+
+
+def overwrite(path):
+    with open(path, "r+b") as f:
+        f.seek(os.path.getsize(path) // 2)
+        f.write(os.urandom(4096))
+
+
+def insert(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:1000])
+        f.write(b"inserted bytes")
+        f.write(data[1000:])
+
+
+def append(path):
+    with open(path, "ab") as f:
+        f.write(os.urandom(1024 * 1024))
+
+
+def main():
+    size = (int(sys.argv[1]) if len(sys.argv) > 1 else 256) * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.bin")
+        with open(source, "wb") as f:
+            for _ in range(size // (1024 * 1024)):
+                f.write(os.urandom(1024 * 1024))
+        copy_backup = os.path.join(tmp, "copy.bin")
+        delta_backup = os.path.join(tmp, "delta.bin")
+        shutil.copy2(source, copy_backup)
+        shutil.copy2(source, delta_backup)
+        print(f"source: {size / 1e6:.0f} MB")
+
+        for label, edit in (("overwrite 4 KiB", overwrite), ("insert 14 bytes", insert), ("append 1 MiB", append)):
+            edit(source)
+            start = time.perf_counter()
+            shutil.copy2(source, copy_backup)
+            copy_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            stats = delta_copy(source, delta_backup)
+            delta_seconds = time.perf_counter() - start
+            print(
+                f"{label}: copy2 {copy_seconds:.2f}s | delta_copy ({stats['method']}) {delta_seconds:.2f}s, "
+                f"{stats['transferred'] / 1e6:.2f} of {stats['size'] / 1e6:.0f} MB transferred"
+            )
+
+
+if __name__ == "__main__":
+    main()
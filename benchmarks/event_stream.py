@@ -0,0 +1,127 @@
+# Benchmark: mention-to-reply latency in stream mode
+# Usage: python -m benchmarks.event_stream [events] [api_latency_ms] [events_per_second]
+#
+# Emits synthetic mentions from a local FakeXStreamServer into an Agent's event stream, and
+# messages from a FakeTelegramServer into TelegramAgent.listen()'s getUpdates long poll. It reports
+# the time from emitting each event to its reply, next to the theoretical latency of the batch
+# job it replaces, which answers a mention up to ENGAGE_INTERVAL after it arrives. Rates above what the handler workers can
+# reply to build up a queue, and then the sources block (backpressure).
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from telebot import apihelper
+
+from AI_Driven_Agent import ENGAGE_INTERVAL, Agent
+from event_stream import EventStream, TelegramLongPoller
+from fake_apis import FakeTelegramServer, FakeTwitterAPI, FakeXStreamServer
+from history_store import HistoryStore
+from rate_limiter import TokenBucket
+from telegram_agent import TelegramAgent
+from telegram_clients import TelegramClientManager
+
+TOKEN = "123456:FAKE"
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(label, latencies, summary):
+    print(
+        f"{label}: {len(latencies)} replies, "
+        f"p50 {percentile(latencies, 0.5) * 1000:.1f}ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f}ms, "
+        f"max {max(latencies) * 1000:.1f}ms, "
+        f"producer blocked {summary['blocked_seconds']:.2f}s"
+    )
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def x_stream(count, latency, interval, data_dir):
+    api = FakeTwitterAPI(latency=latency)
+    agent = Agent("bench", api=api, store=HistoryStore(os.path.join(data_dir, "bench.db")))
+    # Lift the 300-per-3h reply limit so runs above 300 mentions measure the pipeline, not the bucket
+    agent.mentions.limiter = TokenBucket(1e6)
+    server = FakeXStreamServer(api=api).start()
+
+    emitted = {}
+    replied = {}
+    update_status = api.update_status
+
+    def timed_update_status(status, in_reply_to_status_id=None, **kwargs):
+        created = update_status(status, in_reply_to_status_id=in_reply_to_status_id, **kwargs)
+        replied[in_reply_to_status_id] = time.perf_counter()
+        return created
+
+    api.update_status = timed_update_status
+    stream = agent.event_stream(bearer_token="fake", base_url=server.base_url).start()
+    wait_for(lambda: server.connections)
+
+    for i in range(count):
+        emitted[server.emit(f"user{i}")] = time.perf_counter()
+        time.sleep(interval)
+    wait_for(lambda: len(replied) >= count)
+    summary = stream.stop()
+    server.stop()
+    agent.store.close()
+    return [replied[tweet_id] - emitted[tweet_id] for tweet_id in emitted if tweet_id in replied], summary
+
+
+def telegram_long_poll(count, latency, interval):
+    server = FakeTelegramServer(latency=latency).start()
+    apihelper.API_URL = server.api_url
+    clients = TelegramClientManager()
+    os.environ["TELEGRAM_BOT_TOKEN"] = TOKEN
+    agent = TelegramAgent(clients=clients)
+
+    emitted = {}
+    replied = {}
+    handle_event = agent.handle_event
+
+    def timed_handle_event(event):
+        handle_event(event)
+        replied[event["chat_id"]] = time.perf_counter()
+
+    stream = EventStream(timed_handle_event)
+    stream.add_source(TelegramLongPoller(TOKEN, base_url=server.base_url, timeout=5))
+    stream.start()
+    for i in range(count):
+        chat_id = 1000 + i
+        emitted[chat_id] = time.perf_counter()
+        server.push_update("hello", chat_id=chat_id)
+        time.sleep(interval)
+    wait_for(lambda: len(replied) >= count)
+    summary = stream.stop()
+    clients.close()
+    server.stop()
+    return [replied[chat_id] - emitted[chat_id] for chat_id in emitted if chat_id in replied], summary
+
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    interval = 1 / (float(sys.argv[3]) if len(sys.argv) > 3 else 50)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        report("X filtered stream", *x_stream(count, latency, interval, data_dir))
+    report("Telegram getUpdates", *telegram_long_poll(count, latency, interval))
+    # Not measured: a mention arriving uniformly between two batch passes waits half the interval
+    print(
+        f"Batch job every {ENGAGE_INTERVAL}s (theoretical, not measured): "
+        f"mean {ENGAGE_INTERVAL / 2 * 1000:.1f}ms, max {ENGAGE_INTERVAL * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Benchmark: repeated scans of a large tree, full os.walk + stat vs FileIndex
+# Usage: python -m benchmarks.file_index [dirs] [files_per_dir] [changed]
+#
+# Builds dirs x files_per_dir empty files, indexes them once, changes a few files and
+# directories, then times a full walk against FileIndex.scan with and without check_files.
+
+import os
+import sys
+import tempfile
+import time
+
+from file_index import FileIndex
+
+
+def make_tree(root, dirs, files_per_dir):
+    for d in range(dirs):
+        path = os.path.join(root, f"dir{d // 100}", f"dir{d}")
+        os.makedirs(path)
+        for f in range(files_per_dir):
+            open(os.path.join(path, f"file{f}.txt"), "w").close()
+    # Age the tree so nothing is inside the index's racy-timestamp window
+    old = time.time() - 3600
+    for dir_path, dir_names, file_names in os.walk(root):
+        for name in dir_names + file_names:
+            os.utime(os.path.join(dir_path, name), (old, old))
+    os.utime(root, (old, old))
+
+
+def full_walk(root):
+    count = 0
+    for dir_path, _, file_names in os.walk(root):
+        for name in file_names:
+            os.stat(os.path.join(dir_path, name))
+            count += 1
+    return count
+
+
+def change_tree(root, dirs, changed):
+    for i in range(changed):
+        d = i * dirs // changed
+        path = os.path.join(root, f"dir{d // 100}", f"dir{d}")
+        open(os.path.join(path, f"new{i}.txt"), "w").close()
+        with open(os.path.join(path, "file0.txt"), "a") as f:
+            f.write("changed")
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label}: {time.perf_counter() - start:.3f}s {result}")
+
+
+def main():
+    dirs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    files_per_dir = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    changed = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "tree")
+        make_tree(root, dirs, files_per_dir)
+        index = FileIndex(os.path.join(tmp, "index.db"))
+        print(f"{dirs * files_per_dir} files in {dirs} directories, {changed} directories changed")
+
+        timed("initial index", lambda: len(index.scan(root)["added"]))
+        change_tree(root, dirs, changed)
+        summary = lambda changes: {kind: len(paths) for kind, paths in changes.items()}
+        timed("full walk + stat", lambda: full_walk(root))
+        timed("index scan, new files only", lambda: summary(index.scan(root, check_files=False)))
+        change_tree(root, dirs, changed)
+        timed("index scan, stat known files", lambda: summary(index.scan(root)))
+        timed("index scan, nothing changed", lambda: summary(index.scan(root, check_files=False)))
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# Benchmark: organizer throughput on a synthetic downloads folder
+# Usage: python -m benchmarks.file_organizer [files] [workers...]
+#
+# Creates a flat folder of empty files with a mix of known and unknown extensions, then
+# organizes a fresh copy of it with each worker count.
+
+import os
+import sys
+import tempfile
+
+from automate_file_management import FileOrganizer, folders
+
+EXTENSIONS = [ext for exts in folders.values() for ext in exts] + [".unknown", ".bak"]
+
+
+def make_tree(path, files):
+    os.makedirs(path)
+    for i in range(files):
+        open(os.path.join(path, f"file{i}{EXTENSIONS[i % len(EXTENSIONS)]}"), "w").close()
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or [1, 8]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in worker_counts:
+            tree = os.path.join(tmp, f"downloads_{workers}")
+            make_tree(tree, files)
+            stats = FileOrganizer(tree, workers=workers, verbose=False).organize()
+            print(
+                f"workers={workers}: scanned {stats['scanned']}, moved {stats['moved']} "
+                f"in {stats['seconds']:.2f}s ({stats['files_per_second']:.0f} files/s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
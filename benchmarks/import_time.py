@@ -0,0 +1,61 @@
+# Benchmark: startup cost of the agent modules
+# Usage: python -m benchmarks.import_time [runs]
+#
+# Imports each agent module in a fresh interpreter with -X importtime and reports its cumulative
+# import time (median of `runs`), which heavy libraries the import pulled in, and the same import
+# with those libraries loaded eagerly as the modules used to (tweepy, requests, telebot, schedule,
+# asyncio, http.server, python-dotenv). The python -c "pass" baseline is interpreter startup alone.
+
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY = ["tweepy", "requests", "telebot", "schedule", "asyncio", "http.server", "dotenv"]
+EAGER = {
+    "AI_Driven_Agent": ["tweepy", "asyncio", "requests", "http.server", "dotenv"],
+    "telegram_agent": ["telebot", "schedule", "requests", "http.server", "dotenv"],
+}
+
+
+def measure(statement, module, runs):
+    """Median cumulative -X importtime of `module`, and median wall time of the interpreter"""
+    cumulative, wall = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True
+        )
+        wall.append(time.perf_counter() - start)
+        total = 0
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package", nested imports indented
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2][1:] in module:
+                total += int(parts[1])
+        cumulative.append(total)
+    return statistics.median(cumulative) / 1000, statistics.median(wall) * 1000
+
+
+def loaded(module):
+    """Heavy libraries present in sys.modules after importing `module`"""
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    _, baseline = measure("pass", (), runs)
+    print(f"interpreter startup: {baseline:.1f}ms wall")
+    for module, eager in EAGER.items():
+        lazy_import, lazy_wall = measure(f"import {module}", (module,), runs)
+        eager_import, eager_wall = measure(f"import {', '.join(eager)}, {module}", (module, *eager), runs)
+        print(
+            f"{module}: {lazy_import:.1f}ms import ({lazy_wall:.1f}ms wall), loads {loaded(module) or 'no heavy libraries'}; "
+            f"with eager imports {eager_import:.1f}ms ({eager_wall:.1f}ms wall), "
+            f"{eager_import / lazy_import:.1f}x slower"
+        )
+
+
+if __name__ == "__main__":
+    main()
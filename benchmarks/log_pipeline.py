@@ -0,0 +1,106 @@
+# Benchmark: logging throughput under a broadcast burst
+# Usage: python -m benchmarks.log_pipeline [records per thread] [threads]
+#
+# Several threads log at once, like broadcast workers each reporting every send. Compares the
+# agents' previous setup (logging.basicConfig with a FileHandler and a StreamHandler) with the
+# asynchronous pipeline in text and JSON format. The console goes to os.devnull so the terminal
+# does not dominate. The pipeline's queue is sized to hold the whole burst (setup_logging's default
+# of 100,000 records drops what does not fit and logs how many). Reports the time the producing threads spend logging, the total time until
+# everything is on disk, and the p99 cost of one logging call.
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import log_pipeline
+
+
+def burst(threads, records):
+    log = logging.getLogger("bench.broadcast")
+    per_call = []
+
+    def worker(n):
+        samples = []
+        for i in range(records):
+            start = time.perf_counter()
+            log.info(f"Sent broadcast to chat {n}-{i}", extra={"account": f"acct{n}", "latency": 0.012})
+            samples.append(time.perf_counter() - start)
+        per_call.extend(samples)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start, sorted(per_call)
+
+
+def basic_config(path, devnull):
+    root = logging.getLogger()
+    for handler in [logging.FileHandler(path), logging.StreamHandler(devnull)]:
+        handler.setFormatter(logging.Formatter(log_pipeline.TEXT_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    def stop():
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+
+    return stop
+
+
+def pipeline(path, devnull, json_format, queue_size):
+    file_handler = log_pipeline.RotatingBatchFileHandler(path, max_bytes=0)
+    text = log_pipeline.TextFormatter()
+    file_handler.setFormatter(log_pipeline.JsonFormatter() if json_format else text)
+    console = log_pipeline.BatchStreamHandler(devnull)
+    console.setFormatter(text)
+    installed = log_pipeline.build_pipeline([file_handler, console], queue_size=queue_size)
+
+    def stop():
+        installed.stop()
+        if installed.dropped:
+            print(f"  queue full: {installed.dropped} records dropped")
+
+    return stop
+
+
+def run(label, setup, threads, records, data_dir):
+    path = os.path.join(data_dir, f"{label.replace(' ', '_')}.log")
+    with open(os.devnull, "w") as devnull:
+        stop = setup(path, devnull)
+        start = time.perf_counter()
+        produced, per_call = burst(threads, records)
+        stop()
+        total = time.perf_counter() - start
+    with open(path) as f:
+        lines = sum(1 for _ in f)
+    p99 = per_call[int(0.99 * (len(per_call) - 1))]
+    print(
+        f"{label}: producers {produced:.3f}s, until flushed {total:.3f}s "
+        f"({lines / total:,.0f} records/s), p99 per call {p99 * 1e6:.1f}us, {lines} lines written"
+    )
+    return produced, total
+
+
+def main():
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f"{threads} threads x {records} records")
+    with tempfile.TemporaryDirectory() as data_dir:
+        base = run("basicConfig", basic_config, threads, records, data_dir)
+        # The queue holds the whole burst, so every setup writes every record
+        size = threads * records + 1
+        text = run("pipeline text", lambda path, devnull: pipeline(path, devnull, False, size), threads, records, data_dir)
+        structured = run("pipeline json", lambda path, devnull: pipeline(path, devnull, True, size), threads, records, data_dir)
+    for label, (produced, total) in (("text", text), ("json", structured)):
+        print(f"pipeline {label}: producers {base[0] / produced:.2f}x faster, total {base[1] / total:.2f}x faster")
+
+
+if __name__ == "__main__":
+    main()
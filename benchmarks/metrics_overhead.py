@@ -0,0 +1,67 @@
+# Benchmark: cost of the metrics instrumentation on the agents' hot paths
+# Usage: python -m benchmarks.metrics_overhead [calls]
+#
+# Times single metric updates, then the instrumented paths themselves: API calls through the
+# ApiGateway (against a zero-latency FakeTwitterAPI, so the gateway's own overhead dominates) and
+# HistoryStore writes. Each runs with metrics disabled (the default), enabled, and enabled with
+# the sampling profiler running.
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import metrics
+from api_gateway import ApiGateway
+from fake_apis import FakeTwitterAPI
+from history_store import HistoryStore
+
+
+def per_call(op, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        op(i)
+    return (time.perf_counter() - start) / calls
+
+
+def run(label, calls, data_dir):
+    histogram = metrics.histogram("bench_seconds", "Benchmark histogram", ("endpoint",))
+    api = FakeTwitterAPI()
+    status = api.seed_status()
+    # Lift the rate windows so the loop measures the gateway, not waiting
+    gateway = ApiGateway(api)
+    for window in gateway.windows.values():
+        window.limit = window.remaining = 10**9
+    store = HistoryStore(os.path.join(data_dir, f"{label.replace(' ', '_')}.db"))
+    results = {
+        "histogram observe": per_call(lambda i: histogram.labels("get_status").observe(0.01), calls * 10),
+        "gateway get_status": per_call(lambda i: gateway.get_status(status.id), calls),
+        "store set_state": per_call(lambda i: store.set_state("bench", i), calls // 10),
+    }
+    store.close()
+    print(f"{label}: " + ", ".join(f"{name} {seconds * 1e6:.2f}us" for name, seconds in results.items()))
+    return results
+
+
+def main():
+    logging.getLogger().setLevel(logging.WARNING)
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as data_dir:
+        disabled = run("disabled", calls, data_dir)
+        metrics.enable()
+        enabled = run("enabled", calls, data_dir)
+        profiler = metrics.SamplingProfiler(interval=0.01).start()
+        profiled = run("enabled + profiler", calls, data_dir)
+        profiler.stop()
+        metrics.disable()
+    for name in disabled:
+        print(
+            f"{name}: enabling adds {(enabled[name] - disabled[name]) * 1e6:+.2f}us, "
+            f"the profiler {(profiled[name] - enabled[name]) * 1e6:+.2f}us more"
+        )
+    print(f"profiler: {profiler.samples} samples, hottest frames {profiler.top(3)}")
+
+
+if __name__ == "__main__":
+    main()
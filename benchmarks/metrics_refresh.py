@@ -0,0 +1,69 @@
+# Benchmark: per-post get_status() versus the bulk metrics fetcher
+# Usage: python -m benchmarks.metrics_refresh [posts] [latency_ms]
+
+import random
+import sys
+import time
+
+from fake_apis import FakeTwitterAPI, FakeTwitterClient
+from history_store import HistoryStore
+from metrics_fetcher import BulkMetricsFetcher
+from rate_limiter import TokenBucket
+
+
+def build(posts, latency):
+    api = FakeTwitterAPI(latency=latency)
+    store = HistoryStore(":memory:")
+    for _ in range(posts):
+        status = api.seed_status(
+            favorite_count=random.randint(0, 50), retweet_count=random.randint(0, 10)
+        )
+        store.append_post({"id": str(status.id), "content": "x", "date": "2025-01-01"})
+    return api, store
+
+
+def per_post(api, store):
+    posts = list(store.iter_posts())
+    for post in posts:
+        tweet = api.get_status(post["id"])
+        post["likes"] = tweet.favorite_count
+        post["retweets"] = tweet.retweet_count
+        post["engagement"] = post["likes"] + post["retweets"]
+    store.update_posts(posts)
+
+
+def bulk(fetcher, store):
+    fetcher.refresh(list(store.iter_posts()), store)
+
+
+def main():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    unlimited = TokenBucket(1e9)
+
+    api, store = build(posts, latency)
+    start = time.perf_counter()
+    per_post(api, store)
+    serial = time.perf_counter() - start
+    print(f"per-post get_status: {posts} posts, {api.calls['get_status']} calls, {serial:.2f}s")
+
+    for label, make_fetcher in (
+        ("bulk v1.1 lookup_statuses", lambda api: BulkMetricsFetcher(api=api, limiter=unlimited)),
+        (
+            "bulk v2 get_tweets",
+            lambda api: BulkMetricsFetcher(client=FakeTwitterClient(api), limiter=unlimited),
+        ),
+    ):
+        api, store = build(posts, latency)
+        fetcher = make_fetcher(api)
+        start = time.perf_counter()
+        bulk(fetcher, store)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label}: {posts} posts, {sum(api.calls.values())} calls, "
+            f"{elapsed:.2f}s ({serial / elapsed:.0f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+# Benchmark suite: the agents' and file tools' hot paths at growing history and tree sizes
+# Usage: python -m benchmarks.run_all [--quick] [--output results.json] [--compare baseline.json]
+#                                     [--threshold 1.2]
+#                                     [--latency-ms N] [--error-rate R] [--rate-limit N]
+#
+# Everything runs against local fakes (see fake_apis.py) and synthetic data in a temporary
+# directory, never against live APIs or real folders:
+# - create_post, analyze_performance and engage_with_followers: an Agent on a FakeTwitterAPI,
+#   with a history store pre-filled with N posts.
+# - TelegramAgent.post_daily_content: a FakeTelegramServer, with N posts of history.
+# - FileOrganizer.organize() and exe.backup_modified_files(): flat trees of N small files.
+#   Backups run once in full, then incrementally after 1% of the files change.
+#
+# Each benchmark reports throughput, p50/p99 latency per operation, and the peak Python heap of
+# one extra traced operation (tracemalloc is kept out of the timed runs). Results are printed
+# and can be written as JSON. --compare flags benchmarks whose p50 grew by more than
+# --threshold (default 1.2x) against an earlier JSON file, and exits non-zero if any did.
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from telebot import apihelper
+
+import exe
+from AI_Driven_Agent import Agent
+from automate_file_management import FileOrganizer, folders
+from content_engine import ContentEngine, TemplateList
+from copy_engine import CopyEngine
+from fake_apis import FakeTelegramServer, FakeTwitterAPI
+from file_index import FileIndex
+from history_store import HistoryStore
+from rate_limiter import TokenBucket
+from telegram_agent import TelegramAgent
+from telegram_clients import TelegramClientManager
+
+SIZES = {
+    "quick": {"history": [100, 1000], "tree": [1000], "repeat": 5},
+    "full": {"history": [100, 1000, 10_000], "tree": [1000, 10_000, 50_000], "repeat": 20},
+}
+MENTIONS_PER_CYCLE = 50
+EXTENSIONS = [ext for exts in folders.values() for ext in exts] + [".unknown", ".bak"]
+REGRESSION_THRESHOLD = 1.2
+TOKEN = "123456:FAKE"
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(name, size, op, repeat, setup=None):
+    """Time `repeat` calls of op() (each returns the items it processed) plus one traced call"""
+    latencies = []
+    items = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        items += op() or 1
+        latencies.append(time.perf_counter() - start)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    op()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    seconds = sum(latencies)
+    return {
+        "benchmark": name,
+        "size": size,
+        "ops": repeat,
+        "items": items,
+        "seconds": round(seconds, 6),
+        "items_per_second": round(items / seconds, 2) if seconds else None,
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "peak_memory_kib": round(peak / 1024, 1),
+    }
+
+
+def print_result(result):
+    print(
+        f"{result['benchmark']:<28} size={result['size']:<7} {result['items_per_second'] or 0:>10.1f} items/s  "
+        f"p50 {result['p50_ms']:>9.2f}ms  p99 {result['p99_ms']:>9.2f}ms  "
+        f"peak {result['peak_memory_kib']:>9.1f} KiB"
+    )
+
+
+def synthetic_texts(count, rng, words=12):
+    """Unrelated random posts, so the near-duplicate check does not reject them"""
+    return [
+        " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(words))
+        for _ in range(count)
+    ]
+
+
+# X agent
+def make_agent(data_dir, history, api_options, rng):
+    api = FakeTwitterAPI(**api_options)
+    engine = ContentEngine(
+        {"daily": TemplateList(synthetic_texts(2000, rng)), "tech": TemplateList(synthetic_texts(2000, rng))},
+        rng=rng,
+    )
+    store = HistoryStore(os.path.join(data_dir, f"history_{history}.db"))
+    agent = Agent(
+        f"bench{history}",
+        api=api,
+        store=store,
+        max_posts_per_day=None,
+        rate_windows=[],
+        content_engine=engine,
+    )
+    # Measure the code paths, not the platform quotas: lift the reply and endpoint limits
+    agent.mentions.limiter = TokenBucket(1e9)
+    for window in agent.api.windows.values():
+        window.limit = window.remaining = 10**9
+
+    start = time.time() - history * 3600
+    for i, text in enumerate(synthetic_texts(history, rng)):
+        status = api.seed_status(text, favorite_count=rng.randrange(50), retweet_count=rng.randrange(10))
+        when = datetime.fromtimestamp(start + i * 3600)
+        store.append_post(
+            {
+                "id": str(status.id),
+                "content": text,
+                "date": str(when.date()),
+                "time": when.strftime("%H:%M:%S"),
+                "timestamp": when.timestamp(),
+                "content_type": "daily",
+                "likes": 0,
+                "retweets": 0,
+                "replies": 0,
+            }
+        )
+    agent.load_data()
+    return agent, api
+
+
+def bench_agent(data_dir, history, api_options, repeat, rng):
+    results = []
+    agent, api = make_agent(data_dir, history, api_options, rng)
+    results.append(measure("create_post", history, agent.create_post, repeat))
+
+    def engage():
+        for i in range(MENTIONS_PER_CYCLE):
+            api.add_mention(f"user{rng.randrange(10**6)}")
+        agent.engage_with_followers()
+        return MENTIONS_PER_CYCLE
+
+    results.append(measure("engage_with_followers", history, engage, repeat))
+
+    def analyze():
+        # New engagement on a few posts, so every run has deltas to apply
+        for status in rng.sample(list(api.statuses.values()), min(50, len(api.statuses))):
+            status.favorite_count += 1
+        agent.analyze_performance()
+        return min(history, 1000)
+
+    results.append(measure("analyze_performance", history, analyze, max(1, repeat // 4)))
+    agent.store.close()
+    return results
+
+
+# Telegram agent
+def bench_telegram(data_dir, history, server_options, repeat, rng):
+    server = FakeTelegramServer(**server_options).start()
+    apihelper.API_URL = server.api_url
+    os.environ["TELEGRAM_BOT_TOKEN"] = TOKEN
+    os.environ["TELEGRAM_CHAT_ID"] = "1000"
+    clients = TelegramClientManager()
+    cwd = os.getcwd()
+    # TelegramAgent keeps its history in telegram_history.json in the working directory
+    os.chdir(data_dir)
+    try:
+        agent = TelegramAgent(clients=clients)
+        agent.post_history = [
+            {"content": text, "date": "2024-01-01", "time": "09:00:00", "success": True}
+            for text in synthetic_texts(history, rng)
+        ]
+        result = measure("telegram_post_daily_content", history, agent.post_daily_content, repeat)
+    finally:
+        os.chdir(cwd)
+        clients.close()
+        server.stop()
+    return [result]
+
+
+# File tools
+def make_tree(path, files, size=0):
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    data = os.urandom(size)
+    # Backdated, so the index does not treat the whole tree as changed within its racy window
+    old = time.time() - 2 * 3600
+    for i in range(files):
+        file_path = os.path.join(path, f"file{i}{EXTENSIONS[i % len(EXTENSIONS)]}")
+        with open(file_path, "wb") as f:
+            f.write(data)
+        os.utime(file_path, (old, old))
+
+
+def bench_organizer(data_dir, files, repeat):
+    tree = os.path.join(data_dir, f"downloads_{files}")
+
+    def organize():
+        return FileOrganizer(tree, verbose=False).organize()["scanned"]
+
+    return [measure("organizer_organize", files, organize, max(1, repeat // 4), setup=lambda: make_tree(tree, files))]
+
+
+def bench_backup(data_dir, files, repeat, rng):
+    exe.source_folder = os.path.join(data_dir, f"source_{files}")
+    exe.backup_folder = os.path.join(data_dir, f"backup_{files}")
+    index_path = os.path.join(data_dir, f"backup_index_{files}.db")
+    make_tree(exe.source_folder, files, size=1024)
+    names = sorted(os.listdir(exe.source_folder))
+    state = {}
+
+    def reset():
+        # A fresh index and backup folder, so every run backs up the whole tree
+        if "index" in state:
+            state["index"].close()
+        for path in (exe.backup_folder, index_path):
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        os.makedirs(exe.backup_folder)
+        state["index"] = exe.index = FileIndex(index_path)
+
+    def touch_some():
+        # Change 1% of the files, with a distinct mtime per pass that is outside the racy window
+        changed = rng.sample(names, max(1, files // 100))
+        state["passes"] = state.get("passes", 0) + 1
+        mtime = time.time() - 3600 + state["passes"]
+        for name in changed:
+            path = os.path.join(exe.source_folder, name)
+            with open(path, "r+b") as f:
+                f.write(os.urandom(16))
+            os.utime(path, (mtime, mtime))
+        state["changed"] = len(changed)
+
+    def backup():
+        exe.backup_modified_files()
+        return files
+
+    def incremental():
+        exe.backup_modified_files()
+        return state["changed"]
+
+    results = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        exe.engine = CopyEngine()
+        try:
+            results.append(measure("backup_full", files, backup, max(1, repeat // 4), setup=reset))
+            reset()
+            exe.backup_modified_files()
+            results.append(measure("backup_incremental", files, incremental, repeat, setup=touch_some))
+        finally:
+            exe.engine.close()
+            exe.engine = None
+            exe.index = None
+            state["index"].close()
+    return results
+
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Print how each benchmark's p50 moved against an earlier run; return the regressions"""
+    with open(baseline_path, "r") as f:
+        baseline = {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        old = baseline.get((result["benchmark"], result["size"]))
+        if old is None or not old["p50_ms"]:
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['benchmark']:<28} size={result['size']:<7} p50 x{ratio:.2f}{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agents and file tools against local fakes")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="compare against a JSON file from an earlier run")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="p50 ratio counted as a regression")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latency of every fake API call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake API calls that fail")
+    parser.add_argument("--rate-limit", type=int, help="Telegram messages per second before 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.CRITICAL)
+    sizes = SIZES["quick" if args.quick else "full"]
+    repeat = sizes["repeat"]
+    rng = random.Random(args.seed)
+    latency = args.latency_ms / 1000
+    api_options = {"latency": latency, "error_rate": args.error_rate}
+    server_options = {"latency": latency, "error_rate": args.error_rate, "rate_limit": args.rate_limit}
+
+    results = []
+
+    def record(new_results):
+        for result in new_results:
+            print_result(result)
+        results.extend(new_results)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        for history in sizes["history"]:
+            record(bench_agent(data_dir, history, api_options, repeat, rng))
+            record(bench_telegram(data_dir, history, server_options, repeat, rng))
+        for files in sizes["tree"]:
+            record(bench_organizer(data_dir, files, repeat))
+            record(bench_backup(data_dir, files, repeat, rng))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# Benchmark: near-duplicate lookups against a large post history
+# Usage: python -m benchmarks.similarity_index [history] [lookups]
+#
+# Indexes `history` synthetic posts, then times lookups of reworded copies (one word replaced)
+# and of unrelated new posts, reporting latency and how many reworded copies were caught.
+
+import random
+import sys
+import time
+
+from similarity_index import SimilarityIndex, popcount, simhash
+
+
+def main():
+    history = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(3)
+    words = [f"word{i}" for i in range(5000)]
+    post = lambda: " ".join(rng.choice(words) for _ in range(15))
+
+    posts = [post() for _ in range(history)]
+    index = SimilarityIndex(max_entries=history, ttl_seconds=float("inf"))
+    start = time.perf_counter()
+    for key, text in enumerate(posts):
+        index.add(text, key=key)
+    print(f"indexed {history} posts in {time.perf_counter() - start:.2f}s")
+
+    reworded = []
+    for text in posts[:lookups]:
+        parts = text.split()
+        parts[rng.randrange(len(parts))] = "reworded"
+        reworded.append(" ".join(parts))
+    close = sum(popcount(simhash(a) ^ simhash(b)) <= index.max_distance for a, b in zip(reworded, posts))
+
+    for label, texts in (("reworded copies", reworded), ("unrelated posts", [post() for _ in range(lookups)])):
+        start = time.perf_counter()
+        hits = sum(index.is_duplicate(text) for text in texts)
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {elapsed / lookups * 1e6:.0f}us per lookup, {hits}/{lookups} flagged")
+    print(f"reworded copies within {index.max_distance} bits (exhaustive check): {close}/{lookups}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Benchmark: per-message latency of Telegram posts, fresh client vs pooled client manager
+# Usage: python -m benchmarks.telegram_latency [messages] [server_latency_ms]
+#
+# Runs against a local FakeTelegramServer. The "fresh" case builds a new TeleBot and a new HTTP
+# session for every message; the "pooled" case sends through TelegramClientManager, which reuses
+# one bot and one keep-alive connection. On loopback a new connection costs almost nothing, so
+# the difference shows in the connection count; against api.telegram.org every new connection
+# adds a TCP and TLS handshake (pass server_latency_ms to approximate the round trips).
+
+import statistics
+import sys
+import time
+
+import telebot
+from telebot import apihelper
+
+from fake_apis import FakeTelegramServer
+from telegram_clients import TelegramClientManager
+
+TOKEN = "123456:FAKE"
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def fresh_client(count):
+    # A session time-to-live of 0 makes telebot open a new session (and connection) per request
+    apihelper.SESSION_TIME_TO_LIVE = 0
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        telebot.TeleBot(TOKEN, threaded=False).send_message(1000 + i, "hello")
+        latencies.append(time.perf_counter() - start)
+    apihelper.SESSION_TIME_TO_LIVE = None
+    return latencies
+
+
+def pooled_client(count):
+    clients = TelegramClientManager()
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        clients.send(TOKEN, 1000 + i, "hello")
+        latencies.append(time.perf_counter() - start)
+    clients.close()
+    return latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 0) / 1000
+
+    for label, run in (("fresh client per message", fresh_client), ("pooled client manager", pooled_client)):
+        server = FakeTelegramServer(latency=latency).start()
+        apihelper.API_URL = server.api_url
+        latencies = run(count)
+        print(
+            f"{label}: {count} messages, {server.connections} connections, "
+            f"mean {statistics.mean(latencies) * 1000:.2f}ms, "
+            f"p50 {percentile(latencies, 0.5) * 1000:.2f}ms, "
+            f"p99 {percentile(latencies, 0.99) * 1000:.2f}ms"
+        )
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
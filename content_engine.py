@@ -0,0 +1,278 @@
+# Content Engine
+# Shared content generation for the X and Telegram agents.
+#
+# How it works:
+# 1. **Template pools**: Content comes from named pools (daily, tech, ...). A pool is either a
+#    small in-memory TemplateList or a TemplateCorpus backed by a JSONL file of
+#    {"text": ..., "weight": ...} lines.
+# 2. **Lazy corpora**: A corpus is memory-mapped, and a binary sidecar (<corpus>.idx) holds each
+#    line's offset plus a precomputed alias table. Opening a 1M-template library maps two files
+#    instead of parsing them, and only the sampled line is ever decoded.
+# 3. **O(1) weighted sampling**: Walker's alias method picks a weighted template with one random
+#    index and one coin flip, whatever the size of the pool.
+# 4. **Precompiled templates**: Templates use string.Template variables ($day, $date, $topic,
+#    $hashtag). Compiled templates are kept in an LRU cache and rendered only for the pick.
+# 5. **Recent dedupe**: Hashes of recently generated posts, normalized for case, spacing and
+#    punctuation, are kept in a bounded set, so near-identical posts are not repeated back to back.
+
+import functools
+import hashlib
+import json
+import mmap
+import os
+import random
+import re
+import string
+import struct
+import threading
+from array import array
+from collections import deque
+from datetime import datetime
+
+day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+INDEX_HEADER = struct.Struct("8sQqQ")
+INDEX_MAGIC = b"CORPIDX1"
+NON_WORD = re.compile(r"[\W_]+")
+
+
+def build_alias(weights):
+    """Build Walker alias tables (prob, alias) for O(1) weighted sampling"""
+    n = len(weights)
+    prob = array("d", bytes(8 * n))
+    alias = array("I", bytes(4 * n))
+    total = float(sum(weights))
+    if n == 0 or total <= 0:
+        raise ValueError("weights must contain at least one positive value")
+    scaled = [w * n / total for w in weights]
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    for i in large + small:
+        prob[i] = 1.0
+        alias[i] = i
+    return prob, alias
+
+
+def alias_sample(prob, alias, rng):
+    i = rng.randrange(len(prob))
+    return i if rng.random() < prob[i] else alias[i]
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template(text):
+    return string.Template(text)
+
+
+class TemplateList:
+    def __init__(self, texts, weights=None, by_day=False):
+        self.texts = list(texts)
+        self.by_day = by_day
+        self.prob, self.alias = build_alias(weights or [1.0] * len(self.texts))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def sample(self, rng, when):
+        """Return a template index; day-bound lists use the one for `when`'s weekday"""
+        if self.by_day:
+            return when.weekday() % len(self.texts)
+        return alias_sample(self.prob, self.alias, rng)
+
+    def text(self, index):
+        return self.texts[index]
+
+
+class TemplateCorpus:
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or f"{path}.idx"
+        self._file = None
+        self._data = None
+        self._index = None
+        self._index_map = None
+        self._lock = threading.Lock()
+
+    def _source_stamp(self):
+        st = os.stat(self.path)
+        return st.st_size, st.st_mtime_ns
+
+    def build_index(self):
+        """Scan the corpus once and write its offset and alias table sidecar"""
+        offsets = array("Q")
+        weights = []
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            position = 0
+            size = len(data)
+            while position < size:
+                end = data.find(b"\n", position)
+                if end < 0:
+                    end = size
+                line = data[position:end].strip()
+                if line:
+                    offsets.append(position)
+                    weights.append(float(json.loads(line).get("weight", 1.0)))
+                position = end + 1
+            offsets.append(size)
+        prob, alias = build_alias(weights)
+        size, mtime_ns = self._source_stamp()
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, size, mtime_ns, len(weights)))
+            offsets.tofile(f)
+            prob.tofile(f)
+            alias.tofile(f)
+        os.replace(tmp_path, self.index_path)
+
+    def _index_is_current(self):
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, "rb") as f:
+            header = f.read(INDEX_HEADER.size)
+        if len(header) < INDEX_HEADER.size:
+            return False
+        magic, size, mtime_ns, _ = INDEX_HEADER.unpack(header)
+        return magic == INDEX_MAGIC and (size, mtime_ns) == self._source_stamp()
+
+    def open(self):
+        """Map the corpus and its index, building the index first if it is missing or stale"""
+        with self._lock:
+            if self._data is None:
+                self._open()
+        return self
+
+    def _open(self):
+        if not self._index_is_current():
+            self.build_index()
+        with open(self.index_path, "rb") as f:
+            self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, count = INDEX_HEADER.unpack_from(self._index_map)
+        view = memoryview(self._index_map)
+        start = INDEX_HEADER.size
+        self._index = (
+            view[start : start + 8 * (count + 1)].cast("Q"),
+            view[start + 8 * (count + 1) : start + 8 * (2 * count + 1)].cast("d"),
+            view[start + 8 * (2 * count + 1) : start + 8 * (2 * count + 1) + 4 * count].cast("I"),
+        )
+        self._file = open(self.path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._data is None:
+            return
+        for view in self._index:
+            view.release()
+        self._index = None
+        self._index_map.close()
+        self._data.close()
+        self._file.close()
+        self._data = None
+
+    def __len__(self):
+        self.open()
+        return len(self._index[1])
+
+    def sample(self, rng, when):
+        self.open()
+        _, prob, alias = self._index
+        return alias_sample(prob, alias, rng)
+
+    def text(self, index):
+        self.open()
+        offsets = self._index[0]
+        return json.loads(self._data[offsets[index] : offsets[index + 1]])["text"]
+
+
+class RecentContent:
+    def __init__(self, size=200):
+        self.size = size
+        self._order = deque()
+        self._pools = {}
+
+    @staticmethod
+    def fingerprint(text):
+        """Hash of the text with case, punctuation, emoji and spacing differences removed"""
+        normalized = NON_WORD.sub(" ", text.lower()).strip()
+        return hashlib.blake2b(normalized.encode(), digest_size=8).digest()
+
+    def __contains__(self, text):
+        return self.fingerprint(text) in self._pools
+
+    def add(self, text, pool):
+        key = self.fingerprint(text)
+        if key not in self._pools:
+            self._order.append(key)
+            if len(self._order) > self.size:
+                self._pools.pop(self._order.popleft(), None)
+        self._pools[key] = pool
+
+    def pool_of(self, text):
+        return self._pools.get(self.fingerprint(text))
+
+
+class ContentEngine:
+    def __init__(self, pools, topics=None, recent_size=200, attempts=5, rng=None):
+        self.pools = dict(pools)
+        self.topics = list(topics or [])
+        self.attempts = attempts
+        self.recent = RecentContent(recent_size)
+        self.rng = rng or random.Random()
+
+    def context(self, when):
+        """Template variables for a post generated at `when`"""
+        day = day_names[when.weekday()]
+        topic = self.rng.choice(self.topics) if self.topics else ""
+        return {
+            "day": day,
+            "date": when.strftime("%Y-%m-%d"),
+            "topic": topic,
+            "hashtag": "#" + NON_WORD.sub("", topic) if topic else f"#{day}",
+        }
+
+    def render(self, pool, when, context=None):
+        """Sample and render one template from a pool"""
+        templates = self.pools[pool]
+        text = templates.text(templates.sample(self.rng, when))
+        if "$" not in text:
+            return text
+        return compile_template(text).safe_substitute(context or self.context(when))
+
+    def choose_pool(self, weights):
+        names = [name for name in weights if name in self.pools and weights[name] > 0]
+        return self.rng.choices(names, [weights[name] for name in names])[0]
+
+    def _retry_weights(self, weights, pool):
+        """Weights for a resample; a day-bound pool has one option per day, so try the others"""
+        if not (isinstance(self.pools[pool], TemplateList) and self.pools[pool].by_day):
+            return weights
+        others = {name: weight for name, weight in weights.items() if name != pool and name in self.pools}
+        return others if any(weight > 0 for weight in others.values()) else weights
+
+    def generate(self, weights, when=None, context=None):
+        """Return (text, pool) for a new post, avoiding near-duplicates of recent posts"""
+        when = when or datetime.now()
+        context = context or self.context(when)
+        pool = self.choose_pool(weights)
+        text = self.render(pool, when, context)
+        for _ in range(self.attempts):
+            if text not in self.recent:
+                break
+            pool = self.choose_pool(self._retry_weights(weights, pool))
+            text = self.render(pool, when, context)
+        self.recent.add(text, pool)
+        return text, pool
+
+    def pool_of(self, text):
+        """Return the pool a recently generated post came from, or None"""
+        return self.recent.pool_of(text)
+
+    def close(self):
+        for templates in self.pools.values():
+            if isinstance(templates, TemplateCorpus):
+                templates.close()
@@ -0,0 +1,139 @@
+# Copy Engine
+# Parallel file copier for the backup script that stays polite to the disks it reads and writes.
+#
+# How it works:
+# 1. **Worker pool**: Copies run on a thread pool (file I/O releases the GIL), so a burst of
+#    modified files no longer queues behind the slowest one.
+# 2. **Reusable buffers**: Each copy borrows a large pre-allocated buffer and reads into it with
+#    readinto(), instead of allocating a new bytes object per block.
+# 3. **Per-device limits**: A semaphore per device (st_dev) caps concurrent copies touching the
+#    same disk, so many workers do not thrash one spindle.
+# 4. **Throttling**: Optional token buckets cap bytes per second and I/O operations per second,
+#    so backups do not starve production I/O.
+# 5. **Atomic writes**: Data goes to a temporary file in the destination folder, which is renamed
+#    over the destination only once it is complete.
+# 6. **Metrics**: Bytes, files and per-file copy time are exported (see metrics.py).
+
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = 1024 * 1024
+
+COPY_BYTES = metrics.counter("copy_bytes_total", "Bytes copied")
+COPY_FILES = metrics.counter("copy_files_total", "Files copied, by outcome", ("outcome",))
+COPY_SECONDS = metrics.histogram("copy_file_seconds", "Time to copy one file, throttling included")
+
+
+class CopyEngine:
+    def __init__(self, workers=8, buffer_size=BUFFER_SIZE, per_device=4, bandwidth=None, iops=None, fsync=False):
+        self.workers = workers
+        self.buffer_size = buffer_size
+        self.per_device = per_device
+        self.fsync = fsync
+        # Allow bursts of 0.1s, but at least one buffer's worth or a full read could never proceed
+        self.bandwidth = TokenBucket(bandwidth, capacity=max(bandwidth / 10, buffer_size)) if bandwidth else None
+        self.iops = TokenBucket(iops) if iops else None
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="copy")
+        self._buffers = queue.LifoQueue()
+        self._device_limits = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+    def _device_limit(self, device):
+        with self._lock:
+            limit = self._device_limits.get(device)
+            if limit is None:
+                limit = self._device_limits[device] = threading.BoundedSemaphore(self.per_device)
+            return limit
+
+    def _borrow_buffer(self):
+        try:
+            return self._buffers.get_nowait()
+        except queue.Empty:
+            return bytearray(self.buffer_size)
+
+    def _throttle(self, nbytes):
+        if self.iops is not None:
+            self.iops.acquire()
+        if self.bandwidth is not None:
+            self.bandwidth.acquire(nbytes)
+
+    def copy_file(self, src, dest):
+        """Copy src to dest atomically, with metadata like shutil.copy2; return bytes copied"""
+        start = time.perf_counter()
+        dest_dir = os.path.dirname(os.path.abspath(dest))
+        # Take device semaphores in a fixed order so two copies can never deadlock
+        devices = sorted({os.stat(src).st_dev, os.stat(dest_dir).st_dev})
+        limits = [self._device_limit(device) for device in devices]
+        for limit in limits:
+            limit.acquire()
+        buffer = self._borrow_buffer()
+        view = memoryview(buffer)
+        fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=f".{os.path.basename(dest)}.", suffix=".tmp")
+        copied = 0
+        try:
+            with open(src, "rb", buffering=0) as fsrc, open(fd, "wb", buffering=0) as fdst:
+                while True:
+                    n = fsrc.readinto(buffer)
+                    if not n:
+                        break
+                    self._throttle(n)
+                    fdst.write(view[:n])
+                    copied += n
+                if self.fsync:
+                    os.fsync(fdst.fileno())
+            shutil.copystat(src, tmp_path)
+            os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            COPY_FILES.labels("error").inc()
+            raise
+        finally:
+            view.release()
+            self._buffers.put(buffer)
+            for limit in reversed(limits):
+                limit.release()
+        COPY_BYTES.inc(copied)
+        COPY_FILES.labels("ok").inc()
+        COPY_SECONDS.observe(time.perf_counter() - start)
+        return copied
+
+    def submit(self, func, *args, **kwargs):
+        """Run func on the copy pool; return its Future"""
+        return self.pool.submit(func, *args, **kwargs)
+
+    def copy_many(self, pairs):
+        """Copy every (src, dest) pair in parallel; return counts and throughput"""
+        start = time.perf_counter()
+        stats = {"files": 0, "bytes": 0, "errors": 0}
+        futures = [(src, self.pool.submit(self.copy_file, src, dest)) for src, dest in pairs]
+        for src, future in futures:
+            try:
+                stats["bytes"] += future.result()
+                stats["files"] += 1
+            except OSError as e:
+                logger.error(f"Error copying {src}: {str(e)}")
+                stats["errors"] += 1
+        stats["seconds"] = time.perf_counter() - start
+        stats["bytes_per_second"] = stats["bytes"] / stats["seconds"] if stats["seconds"] else 0
+        return stats
@@ -0,0 +1,182 @@
+# Delta Copy
+# Updates a backup copy of a large file by transferring only the blocks that changed.
+#
+# How it works:
+# 1. **Aligned fast path**: Most edits overwrite bytes in place or append, so the source and
+#    the previous backup are first compared block by block at the same offsets.
+# 2. **Rolling checksums**: If the aligned comparison finds little in common (bytes were
+#    inserted or removed), rsync's algorithm takes over. Each old block gets a weak Adler-32
+#    and a strong BLAKE2 checksum, and a weak checksum rolled one byte at a time over the source
+#    finds those blocks at any offset. The roll is a Python loop, so it gives up (and the file is
+#    copied whole) once more than half the file is new, or after 2 seconds without a match.
+# 3. **Zero-copy assembly**: The new backup is built in a temporary file. Unchanged ranges come
+#    from the old backup, and changed ones from the source, with os.copy_file_range (falling back
+#    to os.sendfile, then plain reads), so the data never passes through Python. The result
+#    then atomically replaces the old backup.
+
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+ADLER_MOD = 65521
+ROLLING_BUDGET_SECONDS = 2.0
+
+
+def copy_range(src_fd, dst_fd, offset, count):
+    """Append count bytes from src_fd at offset to dst_fd's current position"""
+    while count > 0:
+        try:
+            if hasattr(os, "copy_file_range"):
+                copied = os.copy_file_range(src_fd, dst_fd, count, offset)
+            else:
+                copied = os.sendfile(dst_fd, src_fd, offset, count)
+        except OSError:
+            # Not supported for this pair of files (e.g. across filesystems on old kernels)
+            data = os.pread(src_fd, min(count, 1024 * 1024), offset)
+            copied = os.write(dst_fd, data)
+        if copied == 0:
+            raise OSError(f"Unexpected end of file copying {count} bytes at offset {offset}")
+        offset += copied
+        count -= copied
+
+
+def block_signature(path, block_size=BLOCK_SIZE):
+    """Map the weak checksum of every full block of path to [(strong checksum, offset)]"""
+    signature = {}
+    with open(path, "rb") as f:
+        offset = 0
+        while True:
+            block = f.read(block_size)
+            if len(block) < block_size:
+                return signature
+            strong = hashlib.blake2b(block, digest_size=16).digest()
+            signature.setdefault(zlib.adler32(block), []).append((strong, offset))
+            offset += block_size
+
+
+def _add_op(ops, kind, offset, length):
+    """Append a copy operation, merging it with the previous one when contiguous"""
+    if ops and ops[-1][0] == kind and ops[-1][1] + ops[-1][2] == offset:
+        ops[-1] = (kind, ops[-1][1], ops[-1][2] + length)
+    else:
+        ops.append((kind, offset, length))
+
+
+def aligned_delta(src_path, old_path, block_size=BLOCK_SIZE):
+    """Compare blocks at equal offsets; return ops [("old" | "new", offset, length)]"""
+    ops = []
+    with open(src_path, "rb") as src, open(old_path, "rb") as old:
+        offset = 0
+        while True:
+            block = src.read(block_size)
+            if not block:
+                return ops
+            kind = "old" if old.read(block_size) == block else "new"
+            _add_op(ops, kind, offset, len(block))
+            offset += len(block)
+
+
+def rolling_delta(src_path, signature, block_size=BLOCK_SIZE, max_literal=None, budget=ROLLING_BUDGET_SECONDS):
+    """Find old blocks anywhere in src with a rolling checksum; return ops like aligned_delta, or None"""
+    # None means the search was abandoned: more than max_literal bytes (default: half the file)
+    # are new, or `budget` seconds passed without a match. A plain copy is then cheaper.
+    ops = []
+    size = os.path.getsize(src_path)
+    if size == 0:
+        return ops
+    if max_literal is None:
+        max_literal = size // 2
+    deadline = time.monotonic() + budget if budget is not None else None
+    with open(src_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        i = 0
+        literal_start = 0
+        # The search is abandoned when the current literal run reaches this offset
+        give_up_at = max_literal + 1
+        weak = None
+        while i + block_size <= size:
+            if i >= give_up_at:
+                return None
+            if deadline is not None and not i & 0xFFFF and time.monotonic() > deadline:
+                return None
+            if weak is None:
+                weak = zlib.adler32(data[i : i + block_size])
+            candidates = signature.get(weak)
+            if candidates:
+                strong = hashlib.blake2b(data[i : i + block_size], digest_size=16).digest()
+                match = next((offset for candidate, offset in candidates if candidate == strong), None)
+                if match is not None:
+                    if literal_start < i:
+                        _add_op(ops, "new", literal_start, i - literal_start)
+                    _add_op(ops, "old", match, block_size)
+                    i += block_size
+                    give_up_at += block_size
+                    literal_start = i
+                    if deadline is not None:
+                        deadline = time.monotonic() + budget
+                    weak = None
+                    continue
+            if i + block_size == size:
+                break
+            # Roll the Adler-32 window forward by one byte
+            out_byte = data[i]
+            in_byte = data[i + block_size]
+            a = ((weak & 0xFFFF) - out_byte + in_byte) % ADLER_MOD
+            b = ((weak >> 16) - block_size * out_byte + a - 1) % ADLER_MOD
+            weak = (b << 16) | a
+            i += 1
+        if literal_start < size:
+            _add_op(ops, "new", literal_start, size - literal_start)
+    return ops
+
+
+def apply_delta(ops, src_path, old_path, dest_path):
+    """Build dest_path from ops, reading "old" ranges from old_path and "new" ones from src_path"""
+    # A unique temporary file, so concurrent updates of one destination never share it
+    dst_fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(dest_path)), prefix=f".{os.path.basename(dest_path)}.", suffix=".delta-tmp"
+    )
+    try:
+        with open(src_path, "rb", buffering=0) as src, (open(old_path, "rb", buffering=0) if old_path else src) as old:
+            for kind, offset, length in ops:
+                copy_range((old if kind == "old" else src).fileno(), dst_fd, offset, length)
+    except BaseException:
+        os.close(dst_fd)
+        os.remove(tmp_path)
+        raise
+    os.close(dst_fd)
+    os.replace(tmp_path, dest_path)
+
+
+def delta_copy(src_path, dest_path, block_size=BLOCK_SIZE):
+    """Bring dest_path up to date with src_path; return size, transferred bytes and the method used"""
+    size = os.path.getsize(src_path)
+    if not os.path.exists(dest_path):
+        ops = [("new", 0, size)] if size else []
+        method = "full"
+        apply_delta(ops, src_path, None, dest_path)
+    else:
+        ops = aligned_delta(src_path, dest_path, block_size)
+        reused = sum(length for kind, _, length in ops if kind == "old")
+        method = "aligned"
+        if reused == size and os.path.getsize(dest_path) == size:
+            method = "unchanged"
+        elif reused < size // 2:
+            ops = rolling_delta(src_path, block_signature(dest_path, block_size), block_size)
+            method = "rolling"
+            if ops is None:
+                # Mostly rewritten: copy it whole
+                ops = [("new", 0, size)] if size else []
+                method = "full"
+        if method != "unchanged":
+            apply_delta(ops, src_path, dest_path, dest_path)
+    shutil.copystat(src_path, dest_path)
+    transferred = sum(length for kind, _, length in ops if kind == "new") if method != "unchanged" else 0
+    return {"size": size, "transferred": transferred, "method": method}
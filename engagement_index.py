@@ -0,0 +1,136 @@
+# Engagement Index
+# Maintained top-K index over post engagement, partitioned by hashtag and content pool.
+#
+# adapt_strategy() used to sort the entire post history every week just to look at the three
+# best posts. The index keeps one max-heap per partition ("all", "hashtag:#ai", "pool:tech", ...)
+# and is updated whenever a post's metrics change:
+# 1. **Updates**: Push a new heap entry per partition in O(log n); the old entry becomes stale.
+# 2. **Queries**: top(k) pops valid entries (discarding stale ones for good) and pushes them back.
+# 3. **Compaction**: A heap is rebuilt once stale entries outnumber live ones.
+# 4. **Persistence**: The live entries are saved in the history store's state table with the
+#    sequence number of the newest post they cover. On startup the heaps are rebuilt from that
+#    snapshot with heapify(), and only posts appended since are read from the history.
+#
+# adapt_pool_weights() turns per-pool engagement rates into the content selection weights
+# used by generate_content().
+
+import heapq
+import itertools
+
+from analytics_aggregator import hashtags
+
+ALL = "all"
+STATE_KEY = "engagement_index"
+
+
+def partitions_for(post, classify=None):
+    """Return the index partitions a post belongs to"""
+    parts = [ALL]
+    parts.extend(f"hashtag:{tag}" for tag in hashtags(post.get("content")))
+    pool = post.get("content_type") or (classify(post.get("content")) if classify else None)
+    if pool:
+        parts.append(f"pool:{pool}")
+    return parts
+
+
+class EngagementIndex:
+    def __init__(self, classify=None):
+        self.classify = classify
+        self.scores = {}  # post_id -> (engagement, version)
+        self.heaps = {}  # partition -> [(-engagement, version, post_id)]
+        self.sizes = {}  # partition -> number of live posts
+        self._versions = itertools.count()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def update(self, post):
+        """Record a post's current engagement"""
+        post_id = str(post["id"])
+        engagement = post.get("engagement", 0)
+        current = self.scores.get(post_id)
+        if current is not None and current[0] == engagement:
+            return
+        version = next(self._versions)
+        self.scores[post_id] = (engagement, version)
+        for partition in partitions_for(post, self.classify):
+            if current is None:
+                self.sizes[partition] = self.sizes.get(partition, 0) + 1
+            heap = self.heaps.setdefault(partition, [])
+            heapq.heappush(heap, (-engagement, version, post_id))
+            if len(heap) > 64 and len(heap) > 2 * self.sizes[partition]:
+                self._compact(partition)
+
+    def _valid(self, entry):
+        score = self.scores.get(entry[2])
+        return score is not None and score[1] == entry[1]
+
+    def _compact(self, partition):
+        heap = [entry for entry in self.heaps[partition] if self._valid(entry)]
+        heapq.heapify(heap)
+        self.heaps[partition] = heap
+
+    def top(self, k, partition=ALL):
+        """Return up to k (post_id, engagement) pairs with the highest engagement"""
+        heap = self.heaps.get(partition)
+        if not heap:
+            return []
+        best = []
+        while heap and len(best) < k:
+            entry = heapq.heappop(heap)
+            if self._valid(entry):
+                best.append(entry)
+        for entry in best:
+            heapq.heappush(heap, entry)
+        return [(post_id, -neg_engagement) for neg_engagement, _, post_id in best]
+
+    def partitions(self, prefix=""):
+        """Return the partition names starting with a prefix, e.g. "hashtag:" """
+        return [name for name in self.heaps if name.startswith(prefix)]
+
+    def save(self, store):
+        """Persist the live entries of every partition in the history store"""
+        seq = store.last_seq()
+        partitions = {}
+        for partition, heap in self.heaps.items():
+            partitions[partition] = [[entry[2], -entry[0]] for entry in heap if self._valid(entry)]
+        store.set_state(STATE_KEY, {"seq": seq, "partitions": partitions})
+
+    def load(self, store):
+        """Restore the index from the store, reading only posts appended since it was saved"""
+        state = store.get_state(STATE_KEY)
+        if state is None:
+            for post in store.iter_posts():
+                self.update(post)
+            self.save(store)
+            return self
+
+        for partition, entries in state["partitions"].items():
+            heap = []
+            for post_id, engagement in entries:
+                score = self.scores.get(post_id)
+                if score is None:
+                    score = self.scores[post_id] = (engagement, next(self._versions))
+                heap.append((-engagement, score[1], post_id))
+            heapq.heapify(heap)
+            self.heaps[partition] = heap
+            self.sizes[partition] = len(heap)
+        for post in store.iter_posts(after_seq=state["seq"]):
+            self.update(post)
+        return self
+
+
+def adapt_pool_weights(current, rates, floor=0.1, ceiling=0.7, smoothing=0.5):
+    """Move each pool's selection weight toward its share of the engagement rate
+
+    `current` and `rates` map pool name -> weight / engagement rate. Weights are smoothed
+    so one good week doesn't swing the mix, and clamped to [floor, ceiling].
+    """
+    total = sum(rates.get(pool, 0) for pool in current)
+    if total <= 0:
+        return dict(current)
+    adapted = {}
+    for pool, weight in current.items():
+        target = rates.get(pool, 0) / total
+        adapted[pool] = min(ceiling, max(floor, (1 - smoothing) * weight + smoothing * target))
+    return adapted
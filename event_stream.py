@@ -0,0 +1,379 @@
+# Event Stream
+# Real-time ingestion of mentions and messages, so replies go out in seconds instead of waiting
+# for the 2-hour engagement job.
+#
+# How it works:
+# 1. **Sources**: Each source runs on its own thread and turns platform traffic into event
+#    dicts:
+#    - XFilteredStream reads the X API v2 filtered stream.
+#    - TelegramLongPoller long-polls getUpdates.
+#    - TelegramWebhook receives updates pushed by Telegram.
+#    Base URLs are configurable, so local stub servers (see fake_apis.py) can stand in.
+# 2. **Bounded queue**: Sources put events into a fixed-size queue. When handlers fall behind,
+#    put() blocks the source, which stops reading its connection. That backpressure reaches
+#    the server instead of piling events up in memory.
+# 3. **Handlers**: A few worker threads take events off the queue and call the handler (for
+#    example Agent.handle_event), recording end-to-end latency.
+# 4. **Reconnects**: Dropped streams reconnect with jittered exponential backoff.
+# 5. **Metrics**: Queue depth, time sources spend blocked, and each event's end-to-end latency
+#    and outcome are exported per platform (see metrics.py).
+
+import json
+import logging
+import queue
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+X_API_URL = "https://api.twitter.com"
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+QUEUE_DEPTH = metrics.gauge("event_queue_depth", "Events waiting for a handler")
+BLOCKED_SECONDS = metrics.counter("event_source_blocked_seconds_total", "Time sources spent blocked on a full queue")
+EVENT_LATENCY = metrics.histogram("event_latency_seconds", "Time from receiving an event to handling it", ("platform",))
+EVENTS = metrics.counter("events_total", "Events handled, by outcome", ("platform", "outcome"))
+
+
+def backoff_delays(initial=1.0, maximum=60.0):
+    """Yield jittered, exponentially growing reconnect delays"""
+    delay = initial
+    while True:
+        yield random.uniform(delay / 2, delay)
+        delay = min(delay * 2, maximum)
+
+
+class XFilteredStream:
+    def __init__(self, bearer_token, rules=(), base_url=X_API_URL, session=None, tag=None):
+        self.bearer_token = bearer_token
+        self.rules = list(rules)
+        # Rules are shared by every consumer of the bearer token; the tag marks the ones we own
+        self.tag = tag
+        self.base_url = base_url.rstrip("/")
+        self.session = session or requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {bearer_token}"
+        self._response = None
+
+    def set_rules(self):
+        """Make self.rules the rules under self.tag, leaving other consumers' rules alone"""
+        url = f"{self.base_url}/2/tweets/search/stream/rules"
+        current = self.session.get(url, timeout=10).json().get("data") or []
+        ours = [rule for rule in current if rule.get("tag") == self.tag]
+        # Without a tag, untagged rules may belong to anyone, so nothing is deleted
+        stale = [rule["id"] for rule in ours if rule["value"] not in self.rules] if self.tag is not None else []
+        present = {rule["value"] for rule in ours}
+        missing = [rule for rule in dict.fromkeys(self.rules) if rule not in present]
+        if stale:
+            self.session.post(url, json={"delete": {"ids": stale}}, timeout=10)
+        if missing:
+            add = [{"value": rule, "tag": self.tag} if self.tag is not None else {"value": rule} for rule in missing]
+            self.session.post(url, json={"add": add}, timeout=10)
+
+    def _matches(self, payload):
+        """Whether a tweet was delivered for one of our rules rather than another consumer's"""
+        if self.tag is None or "matching_rules" not in payload:
+            return True
+        return any(rule.get("tag") == self.tag for rule in payload["matching_rules"])
+
+    def events(self, stop):
+        """Yield mention events until stop is set, reconnecting when the stream drops"""
+        url = f"{self.base_url}/2/tweets/search/stream"
+        params = {"expansions": "author_id", "user.fields": "username"}
+        delays = backoff_delays()
+        while not stop.is_set():
+            try:
+                # The server sends a keep-alive newline every 20s; 90s of silence means a dead stream
+                with self.session.get(url, params=params, stream=True, timeout=(10, 90)) as response:
+                    response.raise_for_status()
+                    self._response = response
+                    delays = backoff_delays()
+                    for line in response.iter_lines():
+                        if stop.is_set():
+                            return
+                        if not line:
+                            continue
+                        payload = json.loads(line)
+                        if "data" not in payload or not self._matches(payload):
+                            continue
+                        users = {user["id"]: user for user in payload.get("includes", {}).get("users", [])}
+                        tweet = payload["data"]
+                        yield {
+                            "platform": "x",
+                            "type": "mention",
+                            "id": int(tweet["id"]),
+                            "text": tweet.get("text", ""),
+                            "screen_name": users.get(tweet.get("author_id"), {}).get("username"),
+                            "received": time.monotonic(),
+                        }
+            except (requests.RequestException, ValueError) as e:
+                if stop.is_set():
+                    return
+                delay = next(delays)
+                logger.warning(f"X stream disconnected ({str(e)}), reconnecting in {delay:.1f}s")
+                stop.wait(delay)
+            except Exception:
+                # close() from another thread pulls the connection out from under iter_lines()
+                if stop.is_set():
+                    return
+                raise
+            finally:
+                self._response = None
+
+    def close(self):
+        response = self._response
+        if response is not None:
+            response.close()
+
+
+class TelegramLongPoller:
+    def __init__(self, token, base_url=TELEGRAM_API_URL, session=None, timeout=30, store=None):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.store = store
+        self.state_key = "telegram_update_offset"
+        self.offset = store.get_state(self.state_key) if store is not None else None
+        self._confirmed = self.offset  # the offset Telegram has last been sent
+
+    def events(self, stop):
+        """Yield message events from getUpdates until stop is set or an event is refused"""
+        # The consumer may send() False back for an event it could not take (see EventStream._read);
+        # the offset then stays on that update, so it is delivered again after a restart
+        url = f"{self.base_url}/bot{self.token}/getUpdates"
+        delays = backoff_delays()
+        try:
+            while not stop.is_set():
+                try:
+                    params = {"timeout": self.timeout, "allowed_updates": json.dumps(["message"])}
+                    if self.offset is not None:
+                        params["offset"] = self.offset
+                    response = self.session.get(url, params=params, timeout=self.timeout + 10)
+                    self._confirmed = self.offset
+                    payload = response.json()
+                    if not payload.get("ok"):
+                        raise ValueError(payload.get("description", "getUpdates failed"))
+                    delays = backoff_delays()
+                    for update in payload["result"]:
+                        event = telegram_event(update)
+                        if event is not None and (yield event) is False:
+                            return
+                        # The update is queued: the next call's offset confirms it to Telegram
+                        self.offset = update["update_id"] + 1
+                    if payload["result"] and self.store is not None:
+                        self.store.set_state(self.state_key, self.offset)
+                except (requests.RequestException, ValueError) as e:
+                    if stop.is_set():
+                        return
+                    delay = next(delays)
+                    logger.warning(f"Telegram getUpdates failed ({str(e)}), retrying in {delay:.1f}s")
+                    stop.wait(delay)
+        finally:
+            self.acknowledge()
+
+    def acknowledge(self):
+        """Confirm the updates taken from the last batch, so a restart does not receive them again"""
+        # Called from the polling thread once it stops, never next to an in-flight long poll
+        if self.offset is None or self.offset == self._confirmed:
+            return
+        url = f"{self.base_url}/bot{self.token}/getUpdates"
+        try:
+            self.session.get(url, params={"offset": self.offset, "limit": 1, "timeout": 0}, timeout=10)
+            self._confirmed = self.offset
+        except requests.RequestException as e:
+            logger.warning(f"Could not acknowledge Telegram updates ({str(e)})")
+        if self.store is not None:
+            self.store.set_state(self.state_key, self.offset)
+
+    def close(self):
+        self.session.close()
+
+
+def telegram_event(update):
+    """Convert a Telegram update into an event dict, or None for updates without a message"""
+    message = update.get("message")
+    if not message:
+        return None
+    return {
+        "platform": "telegram",
+        "type": "message",
+        "id": update["update_id"],
+        "message_id": message.get("message_id"),
+        "chat_id": message.get("chat", {}).get("id"),
+        "text": message.get("text", ""),
+        "screen_name": message.get("from", {}).get("username"),
+        "received": time.monotonic(),
+    }
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        webhook = self.server.webhook
+        if self.path != webhook.path or (
+            webhook.secret_token and self.headers.get("X-Telegram-Bot-Api-Secret-Token") != webhook.secret_token
+        ):
+            self.send_response(403)
+            self.end_headers()
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        event = telegram_event(json.loads(self.rfile.read(length) or b"{}"))
+        if event is not None:
+            # Blocks while the queue is full; Telegram retries the delivery if we are too slow
+            webhook.deliver(event)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class TelegramWebhook:
+    def __init__(self, host="127.0.0.1", port=8443, path="/telegram", secret_token=None):
+        self.path = path
+        self.secret_token = secret_token
+        self.server = ThreadingHTTPServer((host, port), _WebhookHandler)
+        self.server.daemon_threads = True
+        self.server.webhook = self
+        self.deliver = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def serve(self, deliver, stop):
+        """Run the webhook server, passing events to deliver(), until stop is set"""
+        self.deliver = deliver
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        stop.wait()
+        self.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class EventStream:
+    def __init__(self, handler, queue_size=1000, workers=4):
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = workers
+        self.stop_event = threading.Event()
+        self.sources = []
+        self._threads = []
+        self._lock = threading.Lock()
+        self.stats = {"received": 0, "handled": 0, "failed": 0, "blocked_seconds": 0.0, "latencies": []}
+
+    def add_source(self, source):
+        """Add an XFilteredStream, TelegramLongPoller or TelegramWebhook"""
+        self.sources.append(source)
+        return source
+
+    def put(self, event):
+        """Queue an event, blocking while the queue is full (backpressure); False if stopped first"""
+        start = time.monotonic()
+        queued = False
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(event, timeout=0.5)
+                queued = True
+                break
+            except queue.Full:
+                continue
+        blocked = time.monotonic() - start
+        with self._lock:
+            self.stats["received"] += 1
+            self.stats["blocked_seconds"] += blocked
+        BLOCKED_SECONDS.inc(blocked)
+        return queued
+
+    def _read(self, source):
+        if isinstance(source, TelegramWebhook):
+            source.serve(self.put, self.stop_event)
+            return
+        # Tell the source whether each event was queued, so it never acknowledges a dropped one
+        events = source.events(self.stop_event)
+        try:
+            event = next(events)
+            while True:
+                event = events.send(self.put(event))
+        except StopIteration:
+            pass
+
+    def _work(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            try:
+                self.handler(event)
+                latency = time.monotonic() - event.get("received", time.monotonic())
+                EVENT_LATENCY.labels(event.get("platform")).observe(latency)
+                EVENTS.labels(event.get("platform"), "ok").inc()
+                with self._lock:
+                    self.stats["handled"] += 1
+                    self.stats["latencies"].append(latency)
+                    if len(self.stats["latencies"]) > 10000:
+                        del self.stats["latencies"][:5000]
+            except Exception as e:
+                logger.error(f"Error handling {event.get('platform')} event {event.get('id')}: {str(e)}")
+                EVENTS.labels(event.get("platform"), "error").inc()
+                with self._lock:
+                    self.stats["failed"] += 1
+
+    def start(self):
+        QUEUE_DEPTH.set_function(self.queue.qsize)
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        for source in self.sources:
+            thread = threading.Thread(target=self._read, args=(source,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def summary(self):
+        with self._lock:
+            latencies = sorted(self.stats["latencies"])
+            summary = {key: value for key, value in self.stats.items() if key != "latencies"}
+        if latencies:
+            summary["p50_latency"] = statistics.median(latencies)
+            summary["p99_latency"] = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        return summary
+
+    def stop(self, timeout=5):
+        """Stop the sources, let handlers finish queued events, and return the summary"""
+        self.stop_event.set()
+        # Closing the X stream's response unblocks its reader; a long poller finishes its current
+        # getUpdates and acknowledges what it took before its session is closed
+        for source in self.sources:
+            if isinstance(source, XFilteredStream):
+                source.close()
+        for _ in range(self.workers):
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        for source in self.sources:
+            if isinstance(source, TelegramLongPoller):
+                source.close()
+        return self.summary()
+
+    def run(self, until=None):
+        """Run until the `until` epoch time (or forever) or Ctrl+C"""
+        self.start()
+        try:
+            while until is None or time.time() < until:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        return self.stop()
@@ -1,40 +1,267 @@
 # Exercise 1: Create an automation script that backs up files from a folder with within 3minutes of
 # modification to a backup folder.
+#
+# Two modes:
+# - watch (default on Linux): inotify reports each change as it happens; bursts of writes to the
+#   same file are coalesced and the file is backed up once it has been quiet for a moment.
+# - poll: every `interval` seconds, files added or changed since the last pass are backed up,
+#   tracked in a persisted FileIndex instead of a fixed 3-minute window.
+# In both modes a file is only recorded in the index once its backup has succeeded, so failed or
+# interrupted backups are retried by the next pass (and after a restart).
+#
+# With --store PATH, files go into a deduplicating BackupStore (see backup_store.py) that keeps
+# the last --keep snapshots (100 by default) instead of overwriting a single copy in the backup
+# folder. In watch mode, the files that settle together go into one snapshot. It is opt-in: its
+# first backup reads and chunks every file in pure Python (roughly 35 MB/s), far slower than copy2
+# on a large tree; later backups only read the files that changed.
+#
+# With --delta, a changed file only transfers the blocks that differ from its previous backup
+# (see delta_copy.py), which matters for large files with small edits.
+#
+# With --workers, --bandwidth or --iops, copies run on a CopyEngine worker pool (see
+# copy_engine.py) that can cap the I/O the backup may use. Otherwise files are copied one by one
+# with shutil.copy2, which is faster for small files: the engine's atomic temp-file writes cost
+# more per file than parallelism wins back on small copies.
+#
+# With --metrics-port PORT, backup counts, copy throughput and latencies are served in the
+# Prometheus format at http://127.0.0.1:PORT/metrics (see metrics.py).
+import argparse
 import os
 import shutil
+import threading
 import time
-from datetime import datetime, timedelta
+
+import metrics
+from backup_store import BackupStore
+from copy_engine import CopyEngine
+from delta_copy import delta_copy
+from file_index import FileIndex
+from file_watcher import watch
 
 # Define source and backup folders
 source_folder = '/home/jeff/Documents/source_folder'
 backup_folder = '/home/jeff/Documents/backup_folder'
 
-# Ensure backup folder exists
-os.makedirs(backup_folder, exist_ok=True)
+# Index of the inode, size and mtime of every file already backed up
+index_path = os.path.join(backup_folder, '.backup_index.db')
+
+# The FileIndex at index_path, opened by main()
+index = None
+
+# Deduplicating snapshot store, set by --store
+store = None
+
+# Transfer only changed blocks of modified files, set by --delta
+use_delta = False
+
+# Parallel, throttled copier, set up by main() when --workers, --bandwidth or --iops is given
+engine = None
+
+# Destinations with a backup job in flight, and those changed again while it ran
+_in_flight = set()
+_rerun = set()
+_in_flight_lock = threading.Lock()
+
+BACKED_UP = metrics.counter('backed_up_files_total', 'Files backed up, by method', ('method',))
+
+
+def snapshot(paths):
+    stats = store.backup(source_folder, paths)
+    print(
+        f"Snapshot {stats['snapshot']}: {stats['files']} files, {stats['new_chunks']}/{stats['chunks']} new chunks, "
+        f"{stats['bytes_written']} bytes stored"
+    )
+    return stats
+
+
+def snapshot_files(paths, racy_check=True):
+    """Take one snapshot of the given files (and deleted ones); record those that made it in"""
+    # The state each file is snapshotted from: a change made meanwhile is not marked as backed up
+    before = []
+    for file_path in paths:
+        try:
+            before.append((file_path, os.stat(file_path)))
+        except FileNotFoundError:
+            pass
+    failed = set(snapshot(paths)['failed'])
+    backed_up = [(file_path, st) for file_path, st in before if file_path not in failed]
+    record(backed_up, racy_check)
+    BACKED_UP.labels('snapshot').inc(len(backed_up))
+
+
+def record(items, racy_check=True):
+    """Mark (path, stat before its backup) pairs as backed up in the index"""
+    if index is not None and items:
+        index.update_many(items, racy_check)
+
+
+def dest_for(file_path):
+    return os.path.join(backup_folder, os.path.basename(file_path))
+
+
+def backup_file(file_path, racy_check=True):
+    # The state the copy starts from: a change made while copying is not marked as backed up
+    if store is not None:
+        snapshot_files([file_path], racy_check)
+        return
+    st = os.stat(file_path)
+    dest_path = dest_for(file_path)
+    if use_delta:
+        stats = delta_copy(file_path, dest_path)
+        BACKED_UP.labels('delta').inc()
+        print(
+            f"Backed up: {os.path.basename(file_path)} ({stats['method']}, "
+            f"{stats['transferred']} of {stats['size']} bytes transferred)"
+        )
+        record([(file_path, st)], racy_check)
+        return
+    if engine is not None:
+        engine.copy_file(file_path, dest_path)
+    else:
+        shutil.copy2(file_path, dest_path)
+    record([(file_path, st)], racy_check)
+    BACKED_UP.labels('copy').inc()
+    print(f'Backed up: {os.path.basename(file_path)}')
 
-# Define the time window (3 minutes)
-time_window = timedelta(minutes=3)
+
+def report_error(file_path, future):
+    error = future.exception()
+    if error is not None:
+        print(f'Error backing up {os.path.basename(file_path)}: {error}')
+
+
+def serialized_backup(file_path, racy_check):
+    """Back up a file, then again for as long as it changed while being copied"""
+    dest_path = dest_for(file_path)
+    try:
+        while True:
+            backup_file(file_path, racy_check)
+            with _in_flight_lock:
+                if dest_path not in _rerun:
+                    _in_flight.discard(dest_path)
+                    return
+                _rerun.discard(dest_path)
+    except BaseException:
+        with _in_flight_lock:
+            _in_flight.discard(dest_path)
+            _rerun.discard(dest_path)
+        raise
+
+
+def queue_backup(file_path, racy_check=False):
+    """Back up a file on the copy pool without blocking the caller"""
+    # From the watcher, recent mtimes can be trusted: inotify reports any later change
+    if engine is None or store is not None:
+        try:
+            backup_file(file_path, racy_check)
+        except Exception as e:
+            # Keep watching: one failed copy must not stop the backup loop
+            print(f'Error backing up {os.path.basename(file_path)}: {e}')
+        return None
+    # One job per destination at a time: two workers replacing the same backup could read
+    # it as a delta basis while the other swaps it out. A change arriving meanwhile is
+    # picked up by the running job once its current copy finishes.
+    dest_path = dest_for(file_path)
+    with _in_flight_lock:
+        if dest_path in _in_flight:
+            _rerun.add(dest_path)
+            return None
+        _in_flight.add(dest_path)
+    future = engine.submit(serialized_backup, file_path, racy_check)
+    future.add_done_callback(lambda f: report_error(file_path, f))
+    return future
 
 
 def backup_modified_files():
-    current_time = datetime.now()
+    """Back up every file changed since the previous pass"""
+    changes = index.scan(source_folder, recursive=False)
+    changed = changes['added'] + changes['modified']
+    # The scan has already recorded these files; until each backup succeeds they count as changed
+    index.forget(changed)
+    if store is not None:
+        if changed or changes['removed']:
+            snapshot_files(changed + changes['removed'])
+        return
+    futures = [queue_backup(file_path, racy_check=True) for file_path in changed]
+    for future in futures:
+        if future is not None:
+            future.exception()  # wait for the whole pass before the next one
+
 
-    for filename in os.listdir(source_folder):
-        file_path = os.path.join(source_folder, filename)
+def poll_forever(interval=60):
+    while True:
+        backup_modified_files()
+        print(f"Backup check complete. Waiting for {interval} seconds...")
+        time.sleep(interval)
 
-        if os.path.isfile(file_path):
-            # Get last modified time
-            modified_time = datetime.fromtimestamp(os.path.getmtime(file_path))
 
-            # Check if modified within the last 3 minutes
-            if current_time - modified_time <= time_window:
-                dest_path = os.path.join(backup_folder, filename)
-                shutil.copy2(file_path, dest_path)
-                print(f'Backed up: {filename}')
+def snapshot_batch(paths):
+    """Snapshot every file that settled at the same time at once, rather than one manifest each"""
+    try:
+        snapshot_files(paths, racy_check=False)
+    except Exception as e:
+        # Keep watching: one failed snapshot must not stop the backup loop
+        print(f'Error taking a snapshot of {len(paths)} files: {e}')
 
 
-# Run the backup check every minute
-while True:
+def catch_up():
+    # Anything changed while the script was not running; changes from now on are already watched
     backup_modified_files()
-    print("Backup check complete. Waiting for 1 minute...")
-    time.sleep(60)  # Check every 60 seconds
+    print(f"Watching {source_folder} for changes...")
+
+
+def watch_forever(debounce=0.5):
+    watch(
+        source_folder,
+        snapshot_batch if store is not None else queue_backup,
+        debounce=debounce,
+        on_overflow=backup_modified_files,
+        batch=store is not None,
+        on_start=catch_up,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Back up modified files')
+    parser.add_argument('--mode', choices=['watch', 'poll'], default='watch')
+    parser.add_argument('--interval', type=int, default=60, help='seconds between passes in poll mode')
+    parser.add_argument('--debounce', type=float, default=0.5, help='quiet time before a changed file is copied')
+    parser.add_argument('--store', help='back up into a deduplicating snapshot store at this path')
+    parser.add_argument('--keep', type=int, default=100, help='with --store, number of snapshots to keep')
+    parser.add_argument('--delta', action='store_true', help='only transfer the changed blocks of modified files')
+    parser.add_argument('--workers', type=int, help='copy this many files in parallel (default: one at a time)')
+    parser.add_argument('--bandwidth', type=float, help='maximum copy bandwidth in MB/s')
+    parser.add_argument('--iops', type=float, help='maximum read/write operations per second')
+    parser.add_argument('--metrics-port', type=int, help='serve Prometheus metrics on this localhost port')
+    parser.add_argument('--profile', type=float, metavar='SECONDS', help='with --metrics-port, sample stacks at this interval')
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        metrics.start_server(args.metrics_port, profile_interval=args.profile)
+
+    global store, use_delta, engine, index
+    use_delta = args.delta
+    if args.workers or args.bandwidth or args.iops:
+        engine = CopyEngine(
+            workers=args.workers or 4,
+            bandwidth=args.bandwidth * 1_000_000 if args.bandwidth else None,
+            iops=args.iops,
+        )
+    if args.store:
+        store = BackupStore(args.store, keep=args.keep)
+
+    # Ensure backup folder exists
+    os.makedirs(backup_folder, exist_ok=True)
+    index = FileIndex(index_path)
+
+    if args.mode == 'watch':
+        try:
+            watch_forever(args.debounce)
+            return
+        except OSError as e:
+            print(f"inotify unavailable ({e}); falling back to polling")
+    poll_forever(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,509 @@
+# Fake APIs
+# In-process stand-ins for the tweepy clients and the Telegram Bot API, used by the benchmarks
+# and simulation.py.
+#
+# FakeTwitterAPI mimics the tweepy.API (v1.1) methods the agents call and FakeTwitterClient
+# mimics the tweepy.Client (v2) lookups. Both share one in-memory timeline, and every call
+# can be slowed down with a fixed latency to model network round trips. FakeTwitterAPI can
+# also enforce per-endpoint limits in 15-minute windows: it records last_response with
+# x-rate-limit-* headers like tweepy.API, and raises FakeHTTPError (429, or 503 at `error_rate`)
+# carrying the response, like tweepy's HTTPException. An on_status callback sees every status
+# created through update_status, so a simulated audience can react to posts.
+#
+# FakeTelegramServer is a local HTTP/1.1 server speaking enough of the Bot API for telebot;
+# point telebot.apihelper.API_URL at server.api_url to use it. It can enforce a global
+# messages-per-second limit (answering 429 with retry_after like the real API) and fail a
+# fraction of requests at random. Updates queued with push_update() are served to getUpdates
+# long polls, and send_webhook_update() pushes one to a webhook URL instead.
+#
+# FakeXStreamServer serves the X API v2 filtered stream and its rules endpoint. Mentions
+# queued with emit() are written to every open stream as newline-delimited JSON, with a
+# keep-alive newline when idle; a slow reader fills the socket buffers and stalls the writer,
+# as with the real stream.
+
+import itertools
+import json
+import queue
+import random
+import socket
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+
+# tweepy.API method -> v1.1 resource, for last_response.url
+RESOURCES = {
+    "verify_credentials": "account/verify_credentials",
+    "update_status": "statuses/update",
+    "get_status": "statuses/show",
+    "lookup_statuses": "statuses/lookup",
+    "mentions_timeline": "statuses/mentions_timeline",
+}
+
+
+class FakeStatus(SimpleNamespace):
+    """Minimal tweepy Status: id, text, user, favorite_count, retweet_count"""
+
+
+class FakeHTTPError(Exception):
+    """An error response, shaped like tweepy's HTTPException"""
+
+    def __init__(self, response):
+        super().__init__(f"{response.status_code} {response.reason}")
+        self.response = response
+
+
+class FakeTwitterAPI:
+    def __init__(
+        self,
+        latency=0.0,
+        screen_name="agent",
+        max_lookup=100,
+        rate_limits=None,
+        window=15 * 60,
+        error_rate=0.0,
+        on_status=None,
+    ):
+        self.latency = latency
+        self.on_status = on_status  # called with every status created through update_status
+        self.max_lookup = max_lookup
+        self.rate_limits = dict(rate_limits or {})
+        self.window = window
+        self.error_rate = error_rate
+        self.last_response = None
+        self.rejected = 0
+        self._windows = {}  # endpoint -> (window reset time, calls made)
+        self.user = SimpleNamespace(id=1, screen_name=screen_name)
+        self.statuses = {}
+        self.mentions = []
+        self.calls = {}
+        self._ids = itertools.count(1_000_000)
+        self._lock = threading.Lock()
+
+    def _call(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            response = SimpleNamespace(
+                url=f"https://api.twitter.com/1.1/{RESOURCES.get(endpoint, endpoint)}.json",
+                status_code=200,
+                reason="OK",
+                headers={},
+            )
+            limit = self.rate_limits.get(endpoint)
+            if limit is not None:
+                now = time.time()
+                reset, used = self._windows.get(endpoint, (0, 0))
+                if now >= reset:
+                    reset, used = now + self.window, 0
+                used += 1
+                self._windows[endpoint] = (reset, used)
+                response.headers = {
+                    "x-rate-limit-limit": str(limit),
+                    "x-rate-limit-remaining": str(max(limit - used, 0)),
+                    "x-rate-limit-reset": str(int(reset)),
+                }
+                if used > limit:
+                    response.status_code, response.reason = 429, "Too Many Requests"
+            if response.status_code == 200 and self.error_rate and random.random() < self.error_rate:
+                response.status_code, response.reason = 503, "Service Unavailable"
+            self.last_response = response
+            if response.status_code != 200:
+                self.rejected += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if response.status_code != 200:
+            raise FakeHTTPError(response)
+
+    # Helpers for setting up scenarios
+    def seed_status(self, text="seed", favorite_count=0, retweet_count=0):
+        """Create a status without counting it as an API call"""
+        status = FakeStatus(
+            id=next(self._ids),
+            text=text,
+            user=self.user,
+            favorite_count=favorite_count,
+            retweet_count=retweet_count,
+            reply_count=0,
+            in_reply_to_status_id=None,
+        )
+        with self._lock:
+            self.statuses[status.id] = status
+        return status
+
+    def add_mention(self, screen_name, text="hello"):
+        """Add an incoming mention from another user"""
+        status = FakeStatus(
+            id=next(self._ids),
+            text=f"@{self.user.screen_name} {text}",
+            user=SimpleNamespace(id=hash(screen_name) & 0xFFFF, screen_name=screen_name),
+            favorite_count=0,
+            retweet_count=0,
+            reply_count=0,
+            in_reply_to_status_id=None,
+        )
+        with self._lock:
+            self.mentions.append(status)
+        return status
+
+    # tweepy.API surface
+    def verify_credentials(self):
+        self._call("verify_credentials")
+        return self.user
+
+    def update_status(self, status, in_reply_to_status_id=None, **kwargs):
+        self._call("update_status")
+        created = self.seed_status(status)
+        created.in_reply_to_status_id = in_reply_to_status_id
+        if self.on_status is not None:
+            self.on_status(created)
+        return created
+
+    def get_status(self, id, **kwargs):
+        self._call("get_status")
+        return self.statuses[int(id)]
+
+    def lookup_statuses(self, id, **kwargs):
+        self._call("lookup_statuses")
+        if len(id) > self.max_lookup:
+            raise ValueError(f"lookup_statuses accepts at most {self.max_lookup} ids")
+        return [self.statuses[int(i)] for i in id if int(i) in self.statuses]
+
+    def mentions_timeline(self, count=20, since_id=None, max_id=None, **kwargs):
+        self._call("mentions_timeline")
+        with self._lock:
+            mentions = sorted(self.mentions, key=lambda m: m.id, reverse=True)
+        if since_id is not None:
+            mentions = [m for m in mentions if m.id > int(since_id)]
+        if max_id is not None:
+            mentions = [m for m in mentions if m.id <= int(max_id)]
+        return mentions[:count]
+
+
+class FakeTwitterClient:
+    def __init__(self, api):
+        self.api = api
+
+    def get_tweets(self, ids, tweet_fields=None, **kwargs):
+        self.api._call("get_tweets")
+        if len(ids) > self.api.max_lookup:
+            raise ValueError(f"get_tweets accepts at most {self.api.max_lookup} ids")
+        data = []
+        for i in ids:
+            status = self.api.statuses.get(int(i))
+            if status is None:
+                continue
+            data.append(
+                SimpleNamespace(
+                    id=status.id,
+                    text=status.text,
+                    public_metrics={
+                        "like_count": status.favorite_count,
+                        "retweet_count": status.retweet_count,
+                        "reply_count": status.reply_count,
+                        "quote_count": 0,
+                    },
+                )
+            )
+        return SimpleNamespace(data=data or None, errors=[], includes={}, meta={})
+
+
+class _TelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like api.telegram.org
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this, Nagle's algorithm and the
+        # client's delayed ACK add ~40ms to every response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode()
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                params.update(json.loads(body))
+            else:
+                params.update({k: v[0] for k, v in parse_qs(body).items()})
+        return url.path, params
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        path, params = self._params()
+        # Paths look like /bot<token>/<method>
+        method = path.rsplit("/", 1)[-1]
+        status, payload = self.server.handle_method(method, params)
+        self._reply(status, payload)
+
+    do_GET = do_POST
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, rate_limit=None, retry_after=1, error_rate=0.0, host="127.0.0.1", port=0):
+        super().__init__((host, port), _TelegramHandler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.sent = []
+        self.rejected = 0
+        self._window = []  # send times within the last second
+        self._message_ids = itertools.count(1)
+        self._thread = None
+        self.updates = []
+        self._update_ids = itertools.count(1)
+        self._updates_changed = threading.Condition()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        """URL template in telebot.apihelper.API_URL format"""
+        return self.base_url + "/bot{0}/{1}"
+
+    def make_update(self, text, chat_id=1, username="user"):
+        update_id = next(self._update_ids)
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "username": username},
+                "text": text,
+            },
+        }
+
+    def push_update(self, text, chat_id=1, username="user"):
+        """Queue an incoming message for getUpdates"""
+        update = self.make_update(text, chat_id, username)
+        with self._updates_changed:
+            self.updates.append(update)
+            self._updates_changed.notify_all()
+        return update
+
+    def send_webhook_update(self, url, text, chat_id=1, username="user", secret_token=None):
+        """POST an incoming message to a webhook, as Telegram does; return the HTTP status"""
+        body = json.dumps(self.make_update(text, chat_id, username)).encode()
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        if secret_token:
+            request.add_header("X-Telegram-Bot-Api-Secret-Token", secret_token)
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+
+    def get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        deadline = time.monotonic() + float(params.get("timeout") or 0)
+        limit = int(params.get("limit") or 100)
+        with self._updates_changed:
+            # A call with an offset confirms every update before it
+            self.updates = [update for update in self.updates if update["update_id"] >= offset]
+            while not self.updates and time.monotonic() < deadline:
+                self._updates_changed.wait(deadline - time.monotonic())
+            return 200, {"ok": True, "result": self.updates[:limit]}
+
+    def handle_method(self, method, params):
+        if self.latency:
+            time.sleep(self.latency)
+        if method == "getMe":
+            return 200, {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "fake", "username": "fake_bot"}}
+        if method == "getUpdates":
+            return self.get_updates(params)
+        if method == "sendMessage":
+            chat_id = params.get("chat_id")
+            with self.lock:
+                now = time.monotonic()
+                self._window = [t for t in self._window if t > now - 1]
+                if self.rate_limit is not None and len(self._window) >= self.rate_limit:
+                    self.rejected += 1
+                    return 429, {
+                        "ok": False,
+                        "error_code": 429,
+                        "description": f"Too Many Requests: retry after {self.retry_after}",
+                        "parameters": {"retry_after": self.retry_after},
+                    }
+                if self.error_rate and random.random() < self.error_rate:
+                    return 500, {"ok": False, "error_code": 500, "description": "Internal Server Error"}
+                self._window.append(now)
+                self.sent.append((chat_id, params.get("text")))
+            return 200, {
+                "ok": True,
+                "result": {
+                    "message_id": next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, "type": "private"},
+                    "text": params.get("text", ""),
+                },
+            }
+        return 404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"}
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _XStreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/2/tweets/search/stream/rules":
+            self._reply(200, {"data": list(self.server.rules.values()) or None, "meta": {}})
+        elif path == "/2/tweets/search/stream":
+            self.server.serve_stream(self)
+        else:
+            self._reply(404, {"title": "Not Found"})
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/2/tweets/search/stream/rules":
+            self._reply(404, {"title": "Not Found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self._reply(200, self.server.update_rules(payload))
+
+
+class FakeXStreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, api=None, keep_alive=20.0, host="127.0.0.1", port=0):
+        super().__init__((host, port), _XStreamHandler)
+        self.api = api
+        self.keep_alive = keep_alive
+        self.rules = {}
+        self.connections = 0
+        self._rule_ids = itertools.count(1)
+        self._tweet_ids = itertools.count(2_000_000)
+        self._streams = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def update_rules(self, payload):
+        with self._lock:
+            for rule_id in payload.get("delete", {}).get("ids", []):
+                self.rules.pop(rule_id, None)
+            added = []
+            for rule in payload.get("add", []):
+                rule_id = str(next(self._rule_ids))
+                self.rules[rule_id] = {"id": rule_id, "value": rule["value"]}
+                if "tag" in rule:
+                    self.rules[rule_id]["tag"] = rule["tag"]
+                added.append(self.rules[rule_id])
+        return {"data": added or None, "meta": {"summary": {"created": len(added)}}}
+
+    def emit(self, screen_name, text="hello"):
+        """Deliver a mention to every open stream; with an api, it also joins its mentions"""
+        if self.api is not None:
+            status = self.api.add_mention(screen_name, text)
+            tweet_id, text = status.id, status.text
+        else:
+            tweet_id = next(self._tweet_ids)
+        line = json.dumps(
+            {
+                "data": {"id": str(tweet_id), "text": text, "author_id": screen_name},
+                "includes": {"users": [{"id": screen_name, "username": screen_name}]},
+                "matching_rules": list(self.rules.values()),
+            }
+        )
+        with self._lock:
+            streams = list(self._streams)
+        for lines in streams:
+            lines.put(line)
+        return tweet_id
+
+    def serve_stream(self, handler):
+        # Chunked, like the real stream: each line is sent as its own chunk as soon as it exists
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        handler.close_connection = True
+        lines = queue.Queue()
+        with self._lock:
+            self._streams.append(lines)
+            self.connections += 1
+        try:
+            while not self._closed.is_set():
+                try:
+                    line = lines.get(timeout=self.keep_alive)
+                except queue.Empty:
+                    line = ""
+                if line is None:
+                    break
+                data = line.encode() + b"\r\n"
+                handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            handler.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._streams.remove(lines)
+
+    def disconnect(self):
+        """Close every open stream, as the real API does on maintenance"""
+        with self._lock:
+            streams = list(self._streams)
+        for lines in streams:
+            lines.put(None)
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._closed.set()
+        self.disconnect()
+        self.shutdown()
+        self.server_close()
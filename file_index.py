@@ -0,0 +1,236 @@
+# File Index
+# A persistent record of what a directory tree looked like at the last scan, shared by the
+# organizer and the backup script so repeated runs only pay for what changed.
+#
+# How it works:
+# 1. **SQLite table**: Every file's path, inode, size, mtime_ns and optional hash is kept in
+#    SQLite (WAL mode), indexed by parent directory.
+# 2. **Directory mtimes**: A directory's mtime only changes when entries are added, removed or
+#    renamed, so a directory whose mtime matches the index is not listed again. New and deleted
+#    files are found by reading only the directories that changed.
+# 3. **Content changes**: Editing a file does not touch its directory's mtime, so by default the
+#    known files are still stat()ed (cheap, with no directory listing). Callers that only care
+#    about new files, like the organizer, pass check_files=False and skip that too.
+# 4. **Racy timestamps**: A file or directory modified within RACY_WINDOW_NS of the scan could
+#    change again without its mtime moving, so its mtime is stored as unknown. That way the
+#    next scan looks at it again instead of trusting it.
+# 5. **Acknowledged changes**: A scan records what it saw before the caller has acted on it. A
+#    caller that may fail (a backup, a move) forgets the reported paths first and update()s each
+#    one once it has been handled, so anything failed or interrupted is reported again.
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RACY_WINDOW_NS = 2_000_000_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_parent ON files (parent);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dirs_parent ON dirs (parent);
+"""
+
+
+def file_hash(path):
+    """Return the BLAKE2b hex digest of a file's contents"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileIndex:
+    def __init__(self, path="file_index.db", hash_files=False):
+        self.path = path
+        self.hash_files = hash_files
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._scan_start_ns = 0
+        self._dir_mtimes = {}
+        self._subdirs = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, path):
+        """Return the indexed state of a file, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT inode, size, mtime_ns, hash FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"inode": row[0], "size": row[1], "mtime_ns": row[2], "hash": row[3]}
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def _recorded_mtime(self, mtime_ns):
+        """The mtime to store, or -1 if it is too close to the scan to be trusted"""
+        return -1 if mtime_ns >= self._scan_start_ns - RACY_WINDOW_NS else mtime_ns
+
+    def forget(self, paths):
+        """Drop files from the index so the next scan reports them again"""
+        paths = [os.path.abspath(path) for path in paths]
+        with self._lock:
+            self._conn.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in paths))
+            # The parent must be listed again to find the files, even if its mtime is unchanged
+            parents = {os.path.dirname(path) for path in paths}
+            self._conn.executemany("UPDATE dirs SET mtime_ns = -1 WHERE path = ?", ((parent,) for parent in parents))
+            self._conn.commit()
+
+    def update(self, path, st=None, racy_check=True):
+        """Record one file as handled (see update_many)"""
+        self.update_many([(path, st)], racy_check)
+
+    def update_many(self, items, racy_check=True):
+        """Record (path, stat result or None) pairs as handled, with the state they were handled in"""
+        # Callers pass the stat taken before handling a file, so a change made meanwhile is not
+        # marked as seen. racy_check=False trusts recent mtimes, for callers that hear about
+        # later changes some other way (inotify).
+        now_ns = time.time_ns()
+        rows = []
+        for path, st in items:
+            path = os.path.abspath(path)
+            try:
+                st = st or os.stat(path)
+                digest = file_hash(path) if self.hash_files else None
+            except OSError as e:
+                logger.error(f"Error indexing {path}: {str(e)}")
+                continue
+            mtime_ns = st.st_mtime_ns
+            if racy_check and mtime_ns >= now_ns - RACY_WINDOW_NS:
+                mtime_ns = -1
+            rows.append((path, os.path.dirname(path), st.st_ino, st.st_size, mtime_ns, digest))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, parent, inode, size, mtime_ns, hash) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def _check_file(self, path, parent, st, known, changes):
+        state = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if known is not None and known[:3] == state:
+            return
+        digest = None
+        if self.hash_files:
+            try:
+                digest = file_hash(path)
+            except OSError as e:
+                logger.error(f"Error hashing {path}: {str(e)}")
+        if known is None:
+            changes["added"].append(path)
+        elif not (digest is not None and digest == known[3]):
+            changes["modified"].append(path)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files (path, parent, inode, size, mtime_ns, hash) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, parent, st.st_ino, st.st_size, self._recorded_mtime(st.st_mtime_ns), digest),
+        )
+
+    def _remove_file(self, path, changes):
+        changes["removed"].append(path)
+        self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def _forget_tree(self, path, changes):
+        """Drop a deleted directory and everything indexed under it"""
+        low, high = path + os.sep, path + chr(ord(os.sep) + 1)
+        rows = self._conn.execute("SELECT path FROM files WHERE path >= ? AND path < ?", (low, high))
+        changes["removed"].extend(row[0] for row in rows)
+        self._conn.execute("DELETE FROM files WHERE path >= ? AND path < ?", (low, high))
+        self._conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high))
+
+    def _known_files(self, parent):
+        return {
+            file_path: (inode, size, mtime_ns, digest)
+            for file_path, inode, size, mtime_ns, digest in self._conn.execute(
+                "SELECT path, inode, size, mtime_ns, hash FROM files WHERE parent = ?", (parent,)
+            )
+        }
+
+    def _scan_dir(self, path, recursive, check_files, skip_dirs, changes):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._forget_tree(path, changes)
+            return
+        known_subdirs = self._subdirs.get(path, set())
+        if self._dir_mtimes.get(path) == st.st_mtime_ns:
+            # No entries were added or removed: skip the listing
+            if check_files:
+                for file_path, known in self._known_files(path).items():
+                    try:
+                        self._check_file(file_path, path, os.stat(file_path), known, changes)
+                    except FileNotFoundError:
+                        self._remove_file(file_path, changes)
+            subdirs = sorted(known_subdirs) if recursive else []
+        else:
+            known_files = self._known_files(path)
+            subdirs = []
+            seen = set()
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive and entry.path not in skip_dirs:
+                            subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        seen.add(entry.path)
+                        known = known_files.get(entry.path)
+                        if known is None or check_files:
+                            self._check_file(entry.path, path, entry.stat(follow_symlinks=False), known, changes)
+            for file_path in known_files.keys() - seen:
+                self._remove_file(file_path, changes)
+            for dir_path in known_subdirs - set(subdirs):
+                self._forget_tree(dir_path, changes)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                (path, os.path.dirname(path), self._recorded_mtime(st.st_mtime_ns)),
+            )
+
+        for subdir in subdirs:
+            self._scan_dir(subdir, recursive, check_files, skip_dirs, changes)
+
+    def scan(self, root, recursive=True, check_files=True, skip_dirs=()):
+        """Update the index from disk; return the added, modified and removed file paths"""
+        root = os.path.abspath(root)
+        skip_dirs = {os.path.abspath(path) for path in skip_dirs}
+        changes = {"added": [], "modified": [], "removed": []}
+        with self._lock:
+            self._scan_start_ns = time.time_ns()
+            # Directories are few next to files, so their state is loaded up front
+            self._dir_mtimes = {}
+            self._subdirs = {}
+            for dir_path, parent, mtime_ns in self._conn.execute("SELECT path, parent, mtime_ns FROM dirs"):
+                self._dir_mtimes[dir_path] = mtime_ns
+                self._subdirs.setdefault(parent, set()).add(dir_path)
+            try:
+                self._scan_dir(root, recursive, check_files, skip_dirs, changes)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return changes
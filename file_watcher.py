@@ -0,0 +1,140 @@
+# File Watcher
+# Event-driven change detection for the backup script, with a polling fallback.
+#
+# 1. **inotify**: On Linux the kernel tells us which file changed (via ctypes, no extra package),
+#    so an idle folder costs no CPU and a change is seen immediately.
+# 2. **Debouncing**: A burst of writes to the same file is coalesced into one callback, fired
+#    once the file has been quiet for `debounce` seconds. Callers can also take every file that
+#    settled at the same time in one callback (batch=True).
+#
+# Where inotify is unavailable, the backup script falls back to polling a FileIndex
+# (see file_index.py).
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found; inotify is unavailable")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not supported on this platform")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.watches[wd] = path
+        return wd
+
+    def fileno(self):
+        return self.fd
+
+    def read_events(self):
+        """Return [(directory, name, mask)] for every queued event"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return events
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset : offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+                offset += length
+                events.append((self.watches.get(wd), name, mask))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Debouncer:
+    def __init__(self, delay=0.5, clock=time.monotonic):
+        self.delay = delay
+        self.clock = clock
+        self.pending = {}  # path -> time of the last event
+
+    def touch(self, path):
+        self.pending[path] = self.clock()
+
+    def next_deadline(self):
+        """Seconds until the earliest pending path is ready, or None if nothing is pending"""
+        if not self.pending:
+            return None
+        return max(0.0, min(self.pending.values()) + self.delay - self.clock())
+
+    def ready(self):
+        """Pop and return every path that has been quiet for `delay` seconds"""
+        cutoff = self.clock() - self.delay
+        ready = [path for path, last in self.pending.items() if last <= cutoff]
+        for path in ready:
+            del self.pending[path]
+        return ready
+
+
+def watch(folder, callback, debounce=0.5, on_overflow=None, stop=None, batch=False, on_start=None):
+    """Call callback(path) for files in folder once their writes settle (Linux inotify)"""
+    # With batch=True, callback gets the list of all paths that settled together instead.
+    # on_start runs once the watch is in place, so a catch-up scan there cannot miss a change.
+    inotify = Inotify()
+    inotify.add_watch(folder)
+    debouncer = Debouncer(debounce)
+    try:
+        if on_start is not None:
+            on_start()
+        while stop is None or not stop.is_set():
+            # Block until an event arrives or a debounced path is due: no busy polling
+            timeout = debouncer.next_deadline()
+            if stop is not None and timeout is None:
+                timeout = 1.0
+            readable, _, _ = select.select([inotify], [], [], timeout)
+            if readable:
+                for directory, name, mask in inotify.read_events():
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were dropped by the kernel; let the caller rescan
+                        if on_overflow is not None:
+                            on_overflow()
+                        continue
+                    if mask & IN_ISDIR or not name:
+                        continue
+                    debouncer.touch(os.path.join(directory, name))
+            ready = [path for path in debouncer.ready() if os.path.isfile(path)]
+            if batch:
+                if ready:
+                    callback(ready)
+            else:
+                for path in ready:
+                    callback(path)
+    finally:
+        inotify.close()
@@ -0,0 +1,285 @@
+# Post History Store
+# Append-only, indexed storage for the agent's post history and analytics snapshots.
+#
+# The agents used to dump their whole history to JSON with indent=2 after every post,
+# which costs O(total history) per save and leaves a corrupt file if the process dies
+# mid-write. This store keeps every record in SQLite running in WAL mode:
+# 1. **Appends**: Adding a post or analytics snapshot appends one row to the write-ahead log.
+# 2. **Indexes**: Posts are indexed by id, date and engagement, so lookups never scan the history.
+# 3. **Crash safety**: A half-written transaction is simply discarded on the next open.
+# 4. **Compaction**: The WAL is periodically checkpointed and free pages are reclaimed.
+# 5. **Metrics**: Every write's latency, lock wait and commit included, is recorded by operation
+#    (see metrics.py).
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+WRITE_SECONDS = metrics.histogram("history_store_write_seconds", "History store write latency", ("operation",))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    date TEXT NOT NULL,
+    ts REAL NOT NULL,
+    engagement INTEGER NOT NULL DEFAULT 0,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_date ON posts (date);
+CREATE INDEX IF NOT EXISTS idx_posts_ts ON posts (ts);
+CREATE INDEX IF NOT EXISTS idx_posts_engagement ON posts (engagement DESC, seq);
+CREATE TABLE IF NOT EXISTS analytics (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def post_timestamp(post):
+    """Return the epoch timestamp of a post record built from its date and time fields"""
+    if "timestamp" in post:
+        return float(post["timestamp"])
+    try:
+        return datetime.strptime(
+            f"{post['date']} {post.get('time', '00:00:00')}", "%Y-%m-%d %H:%M:%S"
+        ).timestamp()
+    except (KeyError, ValueError):
+        return datetime.now().timestamp()
+
+
+class HistoryStore:
+    def __init__(self, path="agent_history.db", compact_every=1000):
+        self.path = path
+        self.compact_every = compact_every
+        self._writes = 0
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # auto_vacuum must be chosen before the first table is created
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        """Checkpoint the log and close the database"""
+        with self._lock:
+            self.compact()
+            self._conn.close()
+
+    def _wrote(self, operation, start, count=1):
+        """Commit a write started at `start` and compact the log every `compact_every` writes"""
+        self._conn.commit()
+        WRITE_SECONDS.labels(operation).observe(time.perf_counter() - start)
+        self._writes += count
+        if self._writes >= self.compact_every:
+            self.compact()
+
+    # Posts
+    def append_post(self, post):
+        """Append one post record"""
+        start = time.perf_counter()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO posts (id, date, ts, engagement, record) VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(post["id"]),
+                    post["date"],
+                    post_timestamp(post),
+                    post.get("engagement", 0),
+                    json.dumps(post),
+                ),
+            )
+            self._wrote("append_post", start)
+
+    def update_posts(self, posts):
+        """Rewrite the records of existing posts (e.g. after a metrics refresh) in one transaction"""
+        rows = [
+            (post.get("engagement", 0), json.dumps(post), str(post["id"]))
+            for post in posts
+        ]
+        if not rows:
+            return
+        start = time.perf_counter()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE posts SET engagement = ?, record = ? WHERE id = ?", rows
+            )
+            self._wrote("update_posts", start, len(rows))
+
+    def update_post(self, post):
+        """Rewrite the record of a single existing post"""
+        self.update_posts([post])
+
+    def get_post(self, post_id):
+        """Look up a post by id"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM posts WHERE id = ?", (str(post_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def posts_on(self, date):
+        """Return all posts made on a given date (YYYY-MM-DD)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM posts WHERE date = ? ORDER BY seq", (str(date),)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count_on(self, date):
+        """Count the posts made on a given date using the date index"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM posts WHERE date = ?", (str(date),)
+            ).fetchone()[0]
+
+    def posts_since(self, timestamp):
+        """Return posts made at or after an epoch timestamp, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM posts WHERE ts >= ? ORDER BY ts", (timestamp,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def recent(self, n):
+        """Return the `n` most recent posts, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM posts ORDER BY seq DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def top_posts(self, n):
+        """Return the `n` posts with the highest engagement"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM posts ORDER BY engagement DESC, seq LIMIT ?", (n,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_posts(self, batch_size=500, after_seq=0):
+        """Stream every post appended after `after_seq`, oldest first, without materialising the whole history"""
+        last_seq = after_seq
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, record FROM posts WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for seq, record in rows:
+                last_seq = seq
+                yield json.loads(record)
+
+    def last_seq(self):
+        """Return the sequence number of the newest post, or 0"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM posts").fetchone()[0]
+
+    def count(self):
+        """Return the total number of posts"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    # Analytics
+    def append_analytics(self, report):
+        """Append one analytics snapshot"""
+        start = time.perf_counter()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO analytics (date, record) VALUES (?, ?)",
+                (report.get("date", str(datetime.now().date())), json.dumps(report)),
+            )
+            self._wrote("append_analytics", start)
+
+    def latest_analytics(self):
+        """Return the most recent analytics snapshot, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM analytics ORDER BY seq DESC LIMIT 1"
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Small key/value state (cursors, adapted weights, ...)
+    def get_state(self, key, default=None):
+        """Read a JSON value from the state table"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        """Write a JSON value to the state table"""
+        start = time.perf_counter()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+            self._wrote("set_state", start)
+
+    # Maintenance
+    def compact(self):
+        """Checkpoint the write-ahead log into the database and reclaim free pages"""
+        start = time.perf_counter()
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._conn.execute("PRAGMA incremental_vacuum")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error compacting history store: {str(e)}")
+            self._writes = 0
+        WRITE_SECONDS.labels("compact").observe(time.perf_counter() - start)
+
+    def migrate_legacy(self, history_file="post_history.json", analytics_file="analytics_data.json"):
+        """Import the old full-rewrite JSON files once, then rename them out of the way"""
+        with self._lock:
+            if os.path.exists(history_file):
+                with open(history_file, "r") as f:
+                    posts = json.load(f)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO posts (id, date, ts, engagement, record) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (
+                            str(post["id"]),
+                            post["date"],
+                            post_timestamp(post),
+                            post.get("engagement", 0),
+                            json.dumps(post),
+                        )
+                        for post in posts
+                    ],
+                )
+                self._conn.commit()
+                os.replace(history_file, history_file + ".migrated")
+                logger.info(f"Migrated {len(posts)} posts from {history_file}")
+
+            if os.path.exists(analytics_file):
+                with open(analytics_file, "r") as f:
+                    reports = json.load(f)
+                self._conn.executemany(
+                    "INSERT INTO analytics (date, record) VALUES (?, ?)",
+                    [(report.get("date", ""), json.dumps(report)) for report in reports],
+                )
+                self._conn.commit()
+                os.replace(analytics_file, analytics_file + ".migrated")
+                logger.info(f"Migrated {len(reports)} reports from {analytics_file}")
@@ -0,0 +1,371 @@
+# Log Pipeline
+# Asynchronous, batched logging for the agent processes.
+#
+# logging.basicConfig with a FileHandler and a StreamHandler makes every logger.info() in the
+# posting and reply paths write and flush the log file and the terminal on the calling thread.
+# The pipeline instead:
+# 1. **Queues records**: The root logger gets one QueueHandler, so logging from a job or a
+#    broadcast worker only formats the message and puts it on an in-memory queue. If the queue
+#    ever fills up, records are dropped and counted rather than blocking the caller.
+# 2. **Writes in batches**: One listener thread drains up to `batch_size` queued records at a
+#    time and gives each handler the whole batch: one write() and one flush() per batch
+#    instead of per line.
+# 3. **Rotates**: The log file rolls over to name.1, name.2, ... when it would pass `max_bytes`
+#    or is older than `rotate_seconds`, keeping `backup_count` old files.
+# 4. **Structured records**: With json_format (or LOG_FORMAT=json) each line is a JSON object
+#    with time, level, logger and message, plus the account, job and latency fields when a
+#    record has them. The scheduler tags records with the job they were logged from (run_job),
+#    and agents tag theirs with their account (AccountLogger).
+#
+# setup_logging() replaces logging.basicConfig in both agents and stops the listener (flushing
+# what is queued) at exit.
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+STRUCTURED_FIELDS = ("account", "job", "latency")
+
+current_job = contextvars.ContextVar("current_job", default=None)
+
+
+def run_job(name, func):
+    """Call func() with log records tagged with the job name"""
+    token = current_job.set(name)
+    try:
+        return func()
+    finally:
+        current_job.reset(token)
+
+
+class JobFilter(logging.Filter):
+    """Copy the running job's name onto records logged from it"""
+
+    def filter(self, record):
+        if getattr(record, "job", None) is None:
+            record.job = current_job.get()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """logging.Formatter that formats each second's timestamp once instead of per record"""
+
+    def __init__(self, fmt=TEXT_FORMAT):
+        super().__init__(fmt)
+        self._second = None
+        self._stamp = None
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        if second != self._second:
+            self._stamp = time.strftime(self.default_time_format, self.converter(record.created))
+            self._second = second
+        return self.default_msec_format % (self._stamp, record.msecs)
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, fields=STRUCTURED_FIELDS):
+        super().__init__()
+        self.fields = fields
+        self._second = None
+        self._stamp = None
+
+    def iso_time(self, record):
+        second = int(record.created)
+        if second != self._second:
+            self._stamp = time.strftime("%Y-%m-%dT%H:%M:%S", self.converter(record.created))
+            self._second = second
+        return f"{self._stamp}.{int(record.msecs):03d}"
+
+    def format(self, record):
+        entry = {
+            "time": self.iso_time(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.fields:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BatchStreamHandler(logging.StreamHandler):
+    """StreamHandler that can write a batch of records with one write and one flush"""
+
+    def format(self, record):
+        # Handlers sharing a formatter (file and console in text mode) format each record once
+        cached = record.__dict__.get("_formatted")
+        if cached is not None and cached[0] is self.formatter:
+            return cached[1]
+        text = super().format(record)
+        record._formatted = (self.formatter, text)
+        return text
+
+    def format_batch(self, records):
+        return "".join(self.format(record) + self.terminator for record in records)
+
+    def emit_batch(self, records):
+        try:
+            text = self.format_batch(records)
+            with self.lock:
+                self.stream.write(text)
+                self.flush()
+        except Exception:
+            self.handleError(records[-1])
+
+
+class RotatingBatchFileHandler(BatchStreamHandler):
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, rotate_seconds=None, backup_count=5, encoding="utf-8"):
+        self.filename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.encoding = encoding
+        super().__init__(self._open())
+
+    def _open(self):
+        self.opened_at = time.time()
+        stream = open(self.filename, "a", encoding=self.encoding)
+        self.size = stream.tell()
+        return stream
+
+    def should_rollover(self, size):
+        """Whether `size` more bytes start a new file"""
+        if self.max_bytes and self.size and self.size + size > self.max_bytes:
+            return True
+        return bool(self.rotate_seconds) and time.time() - self.opened_at >= self.rotate_seconds
+
+    def rollover(self):
+        self.stream.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.filename}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.filename}.{i + 1}")
+        if self.backup_count:
+            os.replace(self.filename, f"{self.filename}.1")
+        else:
+            os.remove(self.filename)
+        self.stream = self._open()
+
+    def emit_batch(self, records):
+        try:
+            lines = [self.format(record) + self.terminator for record in records]
+            with self.lock:
+                # One write per batch, unless the batch crosses a rollover: then one per file
+                chunk = []
+                for line in lines:
+                    length = len(line.encode(self.encoding))
+                    if self.should_rollover(length):
+                        self.stream.write("".join(chunk))
+                        self.rollover()
+                        chunk = []
+                    chunk.append(line)
+                    self.size += length
+                self.stream.write("".join(chunk))
+                self.flush()
+        except Exception:
+            self.handleError(records[-1])
+
+    def emit(self, record):
+        self.emit_batch([record])
+
+    def close(self):
+        with self.lock:
+            try:
+                self.flush()
+                self.stream.close()
+            finally:
+                logging.Handler.close(self)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record and counts it"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """Only merge the message arguments here; the listener thread does the formatting"""
+        # No copy: handlers running after this one still see the same message and traceback
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener:
+    def __init__(self, log_queue, handlers, batch_size=512, queue_handler=None):
+        self.queue = log_queue
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.queue_handler = queue_handler
+        self.stats = {"records": 0, "batches": 0}
+        self._reported_drops = 0
+        self._stopping = False
+        self._thread = None
+
+    def _next_batch(self):
+        """Block for one record, then take whatever else is already queued, up to batch_size"""
+        batch = []
+        record = self.queue.get()
+        while record is not None:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                return batch
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                return batch
+        self._stopping = True  # None is the stop marker put by stop()
+        return batch
+
+    def _drop_notice(self):
+        dropped = self.queue_handler.dropped if self.queue_handler is not None else 0
+        if dropped <= self._reported_drops:
+            return None
+        notice = logging.makeLogRecord(
+            {
+                "name": __name__,
+                "levelno": logging.WARNING,
+                "levelname": "WARNING",
+                "msg": f"Log queue full: dropped {dropped - self._reported_drops} records",
+            }
+        )
+        self._reported_drops = dropped
+        return notice
+
+    def handle_batch(self, batch):
+        notice = self._drop_notice()
+        if notice is not None:
+            batch.append(notice)
+        for handler in self.handlers:
+            records = [
+                record for record in batch if record.levelno >= handler.level and handler.filter(record)
+            ]
+            if not records:
+                continue
+            if hasattr(handler, "emit_batch"):
+                handler.emit_batch(records)
+            else:
+                for record in records:
+                    handler.handle(record)
+        self.stats["records"] += len(batch)
+        self.stats["batches"] += 1
+
+    def _run(self):
+        while not self._stopping:
+            batch = self._next_batch()
+            if batch:
+                self.handle_batch(batch)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="log-listener", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Write everything still queued, then stop the thread"""
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+
+class LogPipeline:
+    def __init__(self, queue_handler, listener, handlers):
+        self.queue_handler = queue_handler
+        self.listener = listener
+        self.handlers = handlers
+
+    @property
+    def dropped(self):
+        return self.queue_handler.dropped
+
+    def stop(self):
+        """Flush and close the pipeline, and take its handler off the root logger"""
+        logging.getLogger().removeHandler(self.queue_handler)
+        self.listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def build_pipeline(handlers, level=logging.INFO, queue_size=100_000, batch_size=512, root=None):
+    """Route `root` (the root logger by default) through a queue to `handlers`"""
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(JobFilter())
+    listener = BatchingQueueListener(log_queue, handlers, batch_size, queue_handler).start()
+    root = root or logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    return LogPipeline(queue_handler, listener, handlers)
+
+
+def setup_logging(
+    log_file,
+    level=logging.INFO,
+    json_format=None,
+    console=True,
+    max_bytes=10 * 1024 * 1024,
+    rotate_seconds=None,
+    backup_count=5,
+    queue_size=100_000,
+    batch_size=512,
+):
+    """Send all logging to `log_file` (and the terminal) through the asynchronous pipeline"""
+    global _pipeline
+    with _pipeline_lock:
+        # Like logging.basicConfig, leave an already configured root logger alone
+        if _pipeline is not None or logging.getLogger().handlers:
+            return _pipeline
+        if json_format is None:
+            json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+        text = TextFormatter()
+        handlers = [RotatingBatchFileHandler(log_file, max_bytes, rotate_seconds, backup_count)]
+        handlers[0].setFormatter(JsonFormatter() if json_format else text)
+        if console:
+            # The terminal stays human-readable when the file is JSON
+            handlers.append(BatchStreamHandler(sys.stderr))
+            handlers[-1].setFormatter(text)
+        _pipeline = build_pipeline(handlers, level, queue_size, batch_size)
+        atexit.register(shutdown)
+        return _pipeline
+
+
+def shutdown():
+    """Flush and stop the pipeline installed by setup_logging()"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+            _pipeline = None
@@ -0,0 +1,238 @@
+# Mention Processor
+# Incremental mention handling for engage_with_followers().
+#
+# How it works:
+# 1. **since_id cursor**: The id of the newest mention seen is kept in the history store's state
+#    table, so each cycle only asks the API for mentions newer than it.
+# 2. **Pagination**: Pages are walked backwards with max_id until the cursor is reached, so a
+#    busy period no longer loses everything beyond the newest few mentions.
+# 3. **Seen set**: Replied mention ids go into a Bloom filter, persisted compressed alongside the
+#    cursor, so overlapping pages or a reset cursor do not cause a second reply. A false
+#    positive, at `error_rate`, only skips one mention.
+# 4. **Rate-limited sender**: Replies go out on a small thread pool that draws from a token
+#    bucket. Failed replies are kept and retried on the next cycle.
+# 5. **Streamed mentions**: reply_to_event() answers one mention as it arrives from the
+#    filtered stream (see event_stream.py), using the same seen set. It leaves the cursor alone,
+#    so mentions missed while the stream was down are still picked up by the next process().
+#    Both paths reserve a mention's id before replying, so it is never answered twice, and a
+#    streamed mention without its author is left to process().
+#    The seen set is saved at most every `save_interval` seconds rather than after every reply.
+
+import base64
+import hashlib
+import logging
+import math
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# POST statuses/update allows 300 requests per 3 hours per user
+REPLY_LIMIT = (300, 3 * 60 * 60)
+
+
+class BloomFilter:
+    def __init__(self, capacity=100_000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(str(item).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        # Double hashing: k positions from two independent hashes
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def to_state(self):
+        """Return a JSON-serializable, compressed copy of the filter"""
+        return {
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "count": self.count,
+            # Level 1 compresses the sparse bitmap nearly as well as the default, five times faster
+            "bits": base64.b64encode(zlib.compress(bytes(self.bits), 1)).decode(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        bloom = cls(state["capacity"], state["error_rate"])
+        bloom.bits = bytearray(zlib.decompress(base64.b64decode(state["bits"])))
+        bloom.count = state["count"]
+        return bloom
+
+
+class MentionProcessor:
+    def __init__(
+        self,
+        api,
+        store,
+        responses,
+        state_key="mentions",
+        page_size=200,
+        max_pages=20,
+        workers=4,
+        limiter=None,
+        capacity=100_000,
+        save_interval=5.0,
+        clock=time.monotonic,
+        log=logger,
+    ):
+        self.api = api
+        self.store = store
+        self.responses = list(responses)
+        self.state_key = state_key
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.workers = workers
+        self.limiter = limiter or TokenBucket.per_window(*REPLY_LIMIT, clock=clock)
+        self.capacity = capacity
+        self.save_interval = save_interval
+        self.clock = clock
+        self.log = log
+        self.since_id = None
+        self.pending = []
+        self.seen = BloomFilter(capacity)
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._saved_at = 0.0
+        self._unsaved = False
+
+    def load(self):
+        state = self.store.get_state(self.state_key, {})
+        self.since_id = state.get("since_id")
+        self.pending = state.get("pending", [])
+        if "seen" in state:
+            self.seen = BloomFilter.from_state(state["seen"])
+        self._loaded = True
+
+    def save(self):
+        if self.seen.count > self.seen.capacity:
+            # Past capacity the false positive rate climbs; ids older than the cursor are never
+            # fetched again, so starting a fresh filter is safe
+            self.seen = BloomFilter(self.capacity)
+        self._saved_at = self.clock()
+        self._unsaved = False
+        self.store.set_state(
+            self.state_key,
+            {"since_id": self.since_id, "pending": self.pending, "seen": self.seen.to_state()},
+        )
+
+    def fetch_new(self):
+        """Return mentions newer than the cursor, oldest first, walking pages with max_id"""
+        mentions = []
+        max_id = None
+        for _ in range(self.max_pages):
+            page = self.api.mentions_timeline(count=self.page_size, since_id=self.since_id, max_id=max_id)
+            if not page:
+                break
+            mentions.extend(page)
+            max_id = min(mention.id for mention in page) - 1
+            if len(page) < self.page_size:
+                break
+        else:
+            self.log.warning(f"More than {self.max_pages} pages of new mentions; older ones are skipped")
+        mentions.sort(key=lambda mention: mention.id)
+        return mentions
+
+    def _reply(self, item):
+        self.limiter.acquire()
+        response = random.choice(self.responses)
+        self.api.update_status(f"@{item['screen_name']} {response}", in_reply_to_status_id=item["id"])
+        metrics.REPLIES.labels("x").inc()
+        return item
+
+    def reply_to_event(self, event):
+        """Reply to one streamed mention unless it was already answered; return True if replied"""
+        if not event.get("screen_name"):
+            # The stream did not expand the author; the next process() fetches the mention with it
+            self.log.debug(f"Mention {event['id']} has no author yet, leaving it to the next cycle")
+            return False
+        with self._lock:
+            if not self._loaded:
+                self.load()
+            if event["id"] in self.seen or event["id"] in self._in_flight:
+                return False
+            self._in_flight.add(event["id"])
+        try:
+            self._reply(event)
+            with self._lock:
+                self.seen.add(event["id"])
+                self._unsaved = True
+                if self.clock() - self._saved_at >= self.save_interval:
+                    self.save()
+            self.log.info(f"Replied to @{event['screen_name']}")
+            return True
+        finally:
+            with self._lock:
+                self._in_flight.discard(event["id"])
+
+    def process(self):
+        """Reply to every new mention once; return counts for the cycle"""
+        with self._lock:
+            if not self._loaded:
+                self.load()
+        mentions = self.fetch_new()
+        candidates = list(self.pending)
+        candidates.extend({"id": mention.id, "screen_name": mention.user.screen_name} for mention in mentions)
+        # Reserve each id under the lock, so a streamed copy of the same mention is not answered too
+        todo = []
+        deferred = []  # being answered from the stream; checked again next cycle in case that fails
+        with self._lock:
+            for item in candidates:
+                if item["id"] in self.seen:
+                    continue
+                if item["id"] in self._in_flight:
+                    deferred.append(item)
+                    continue
+                self._in_flight.add(item["id"])
+                todo.append(item)
+        skipped = len(candidates) - len(todo)
+
+        replied = []
+        failed = []
+        futures = []
+        try:
+            if todo:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    futures = [(item, pool.submit(self._reply, item)) for item in todo]
+            for item, future in futures:
+                try:
+                    future.result()
+                    with self._lock:
+                        self.seen.add(item["id"])
+                    replied.append(item)
+                    self.log.info(f"Replied to @{item['screen_name']}")
+                except Exception as e:
+                    self.log.error(f"Error replying to mention {item['id']}: {str(e)}")
+                    failed.append(item)
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(item["id"] for item in todo)
+
+        with self._lock:
+            if mentions:
+                self.since_id = mentions[-1].id
+            self.pending = failed + deferred
+            # Serializing the filter costs milliseconds; skip it for cycles that changed nothing
+            if mentions or todo or self._unsaved:
+                self.save()
+        return {"fetched": len(mentions), "replied": len(replied), "failed": len(failed), "skipped": skipped}
@@ -0,0 +1,419 @@
+# Metrics
+# Counters, gauges and histograms for the agents and file scripts, served in the Prometheus text
+# format on a local HTTP endpoint, plus an optional sampling profiler.
+#
+# How it works:
+# 1. **Registry**: Modules declare their metrics once at import time (counter(), gauge(),
+#    histogram()). Declaring a name twice returns the same metric, so modules can share one.
+#    labels(...) returns a cached child per label combination.
+# 2. **Off by default**: Every update first checks registry.enabled and returns when it is
+#    False, so instrumented hot paths cost one cached lookup and a branch until enable() or
+#    start_server() is called.
+# 3. **Histograms**: Observations go into fixed buckets with a running sum and count, exported
+#    as cumulative `_bucket{le=...}` series like the Prometheus client. Rates such as posts per
+#    minute come from counters at query time: rate(agent_posts_total[5m]) * 60.
+# 4. **Endpoint**: start_server() serves /metrics on 127.0.0.1 from a daemon thread. With
+#    METRICS_PORT set, start_from_env() does the same for the agents' long-running modes.
+# 5. **Sampling profiler**: SamplingProfiler wakes every `interval` seconds, records the stack
+#    of every other thread and serves the counts at /profile as folded stacks
+#    (flamegraph.pl / speedscope input). Set METRICS_PROFILE_INTERVAL to turn it on.
+
+import bisect
+import logging
+import math
+import os
+import sys
+import threading
+from collections import Counter as _Counter
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a cache hit (1ms) up to a slow job (5 minutes)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _CounterChild:
+    __slots__ = ("_registry", "_lock", "value")
+
+    def __init__(self, registry):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name):
+        return [(name, (), self.value)]
+
+
+class _GaugeChild:
+    __slots__ = ("_registry", "_lock", "value", "function")
+
+    def __init__(self, registry):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        if not self._registry.enabled:
+            return
+        self.value = value
+
+    def inc(self, amount=1):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Read the value from function() at scrape time instead (e.g. a queue's qsize)"""
+        self.function = function
+
+    def samples(self, name):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception as e:
+                logger.error(f"Error reading gauge {name}: {str(e)}")
+        return [(name, (), value)]
+
+
+class _HistogramChild:
+    __slots__ = ("_registry", "_lock", "bounds", "counts", "sum", "count")
+
+    def __init__(self, registry, bounds):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        if not self._registry.enabled:
+            return
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        samples = []
+        cumulative = 0
+        for bound, bucket in zip(self.bounds + (math.inf,), counts):
+            cumulative += bucket
+            samples.append((f"{name}_bucket", (("le", _format_value(bound)),), cumulative))
+        samples.append((f"{name}_sum", (), total))
+        samples.append((f"{name}_count", (), count))
+        return samples
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation="", labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children = {}
+        self._lock = threading.Lock()
+        # An unlabelled metric is its own single child
+        self._default = None if self.labelnames else self.labels()
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return _CounterChild(self.registry)
+        if self.kind == "gauge":
+            return _GaugeChild(self.registry)
+        return _HistogramChild(self.registry, self.buckets)
+
+    def labels(self, *values):
+        """Return the child for one combination of label values"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(value) for value in values), self._new_child())
+                self._children[values] = child
+        return child
+
+    # Unlabelled shortcuts
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            # A child is cached under its raw label values and their str() form; emit it once
+            children = {
+                id(child): (key, child)
+                for key, child in self._children.items()
+                if all(isinstance(value, str) for value in key)
+            }
+        for key, child in sorted(children.values(), key=lambda item: item[0]):
+            for sample, extra, value in child.samples(self.name):
+                lines.append(f"{sample}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+
+class Registry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _declare(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already declared as a different {metric.kind}")
+            return metric
+
+    def counter(self, name, documentation="", labelnames=()):
+        return self._declare(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation="", labelnames=()):
+        return self._declare(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation="", labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._declare(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+
+# Shared by both agents; the platform label tells X and Telegram apart
+POSTS = counter("agent_posts_total", "Posts published", ("platform",))
+REPLIES = counter("agent_replies_total", "Replies sent to mentions and messages", ("platform",))
+API_CALLS = counter("agent_api_calls_total", "API requests by endpoint and outcome", ("platform", "endpoint", "outcome"))
+API_LATENCY = histogram("agent_api_call_seconds", "API request latency", ("platform", "endpoint"))
+
+
+def enable():
+    registry.enabled = True
+
+
+def disable():
+    registry.enabled = False
+
+
+def job_kind(name):
+    """The per-account part of a job name ("alice.create_post" -> "create_post"), as a label"""
+    return name.split(".", 1)[-1]
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = _Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _stack(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def sample(self):
+        """Record the current stack of every thread except the profiler's own"""
+        own = threading.get_ident()
+        stacks = [self._stack(frame) for ident, frame in sys._current_frames().items() if ident != own]
+        with self._lock:
+            self.stacks.update(stacks)
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def folded(self):
+        """Return "frame;frame;frame count" lines, hottest first"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, n=20):
+        """Return the n functions seen on top of a stack most often, with their share of samples"""
+        with self._lock:
+            leaves = _Counter()
+            for stack, count in self.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaves.values())
+        return [(name, count / total) for name, count in leaves.most_common(n)] if total else []
+
+
+def _handler_class():
+    """Build the request handler (http.server is only imported once a server is started)"""
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            profiler = self.server.profiler
+            if path == "/metrics":
+                body = self.server.registry.render().encode()
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/profile" and profiler is not None:
+                body = profiler.folded().encode()
+                content_type = "text/plain; charset=utf-8"
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return _MetricsHandler
+
+
+class MetricsServer:
+    def __init__(self, port=9100, host="127.0.0.1", registry=registry, profiler=None):
+        from http.server import ThreadingHTTPServer
+
+        self.server = ThreadingHTTPServer((host, port), _handler_class())
+        self.server.daemon_threads = True
+        self.server.registry = registry
+        self.server.profiler = profiler
+        self.profiler = profiler
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.profiler is not None:
+            self.profiler.stop()
+
+
+_server = None
+
+
+def start_server(port=9100, host="127.0.0.1", profile_interval=None):
+    """Enable metrics and serve them at http://host:port/metrics (and /profile when profiling)"""
+    global _server
+    if _server is None:
+        enable()
+        profiler = SamplingProfiler(profile_interval).start() if profile_interval else None
+        _server = MetricsServer(port, host, profiler=profiler).start()
+        logger.info(f"Serving metrics at {_server.url}")
+    return _server
+
+
+def start_from_env():
+    """Start the endpoint if METRICS_PORT is set; return the server or None"""
+    port = os.getenv("METRICS_PORT")
+    if not port:
+        return None
+    interval = os.getenv("METRICS_PROFILE_INTERVAL")
+    try:
+        return start_server(int(port), os.getenv("METRICS_HOST", "127.0.0.1"), float(interval) if interval else None)
+    except Exception as e:
+        logger.error(f"Error starting the metrics endpoint: {str(e)}")
+        return None
@@ -0,0 +1,113 @@
+# Bulk Metrics Fetcher
+# Refreshes likes/retweets/replies for many posts with as few API round trips as possible.
+#
+# analyze_performance() used to call api.get_status() once per post. This fetcher instead:
+# 1. **Batches**: Groups post ids into the largest lookup the platform allows
+#    (v1.1 statuses/lookup or v2 GET /2/tweets, both 100 ids per request).
+# 2. **Runs batches concurrently**: A small thread pool issues lookups in parallel, while a
+#    token bucket keeps the request rate inside the endpoint's 15-minute budget.
+# 3. **Merges in one pass**: Fetched metrics are written back to the posts and persisted
+#    with a single store transaction.
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Both lookup endpoints accept at most 100 ids and allow 900 requests per 15 minutes (user auth)
+LOOKUP_BATCH_SIZE = 100
+LOOKUP_REQUESTS_PER_WINDOW = 900
+LOOKUP_WINDOW_SECONDS = 15 * 60
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class BulkMetricsFetcher:
+    def __init__(self, api=None, client=None, batch_size=LOOKUP_BATCH_SIZE, max_workers=4, limiter=None):
+        if api is None and client is None:
+            raise ValueError("BulkMetricsFetcher needs a tweepy.API or tweepy.Client")
+        self.api = api
+        self.client = client
+        self.batch_size = min(batch_size, LOOKUP_BATCH_SIZE)
+        self.max_workers = max_workers
+        self.limiter = limiter or TokenBucket.per_window(
+            LOOKUP_REQUESTS_PER_WINDOW, LOOKUP_WINDOW_SECONDS
+        )
+
+    def _lookup_v1(self, ids):
+        """Fetch one batch through v1.1 statuses/lookup"""
+        metrics = {}
+        for status in self.api.lookup_statuses(ids, trim_user=True):
+            metrics[str(status.id)] = {
+                "likes": status.favorite_count,
+                "retweets": status.retweet_count,
+            }
+        return metrics
+
+    def _lookup_v2(self, ids):
+        """Fetch one batch through v2 GET /2/tweets with public_metrics"""
+        metrics = {}
+        response = self.client.get_tweets(ids=ids, tweet_fields=["public_metrics"])
+        for tweet in response.data or []:
+            public = tweet.public_metrics
+            metrics[str(tweet.id)] = {
+                "likes": public["like_count"],
+                "retweets": public["retweet_count"],
+                "replies": public["reply_count"],
+            }
+        return metrics
+
+    def _fetch_batch(self, ids):
+        self.limiter.acquire()
+        try:
+            if self.client is not None:
+                return self._lookup_v2(ids)
+            return self._lookup_v1(ids)
+        except Exception as e:
+            logger.error(f"Error fetching metrics for {len(ids)} posts: {str(e)}")
+            return {}
+
+    def fetch(self, post_ids):
+        """Return {post_id: metrics} for every id the platform still knows about"""
+        ids = list(dict.fromkeys(str(post_id) for post_id in post_ids))
+        batches = list(_chunks(ids, self.batch_size))
+        metrics = {}
+        if not batches:
+            return metrics
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+            for batch_metrics in pool.map(self._fetch_batch, batches):
+                metrics.update(batch_metrics)
+        return metrics
+
+    def refresh(self, posts, store=None, on_change=None):
+        """Update posts in place with fresh metrics; persist and return the ones that changed
+
+        `on_change(post, previous)` is called for every changed post with its old metrics,
+        so incremental consumers (analytics, engagement index) can apply deltas.
+        """
+        metrics = self.fetch(post["id"] for post in posts)
+        changed = []
+        for post in posts:
+            fresh = metrics.get(str(post["id"]))
+            if not fresh:
+                continue
+            engagement = fresh["likes"] + fresh["retweets"]
+            if all(post.get(k) == v for k, v in fresh.items()) and post.get("engagement") == engagement:
+                continue
+            previous = {k: post.get(k, 0) for k in fresh}
+            previous["engagement"] = post.get("engagement", 0)
+            post.update(fresh)
+            post["engagement"] = engagement
+            changed.append(post)
+            if on_change is not None:
+                on_change(post, previous)
+
+        if store is not None:
+            store.update_posts(changed)
+        logger.info(f"Refreshed metrics: {len(metrics)} fetched, {len(changed)} changed")
+        return changed
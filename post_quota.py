@@ -0,0 +1,149 @@
+# Post Quota
+# Constant-time posting limits for the agents.
+#
+# create_post() used to rebuild the list of today's posts from the whole history on every
+# scheduled slot just to compare it against MAX_POSTS_PER_DAY. PostQuota keeps the answer
+# up to date instead:
+# 1. **Daily counters**: One counter per calendar day, loaded lazily from the store's date index.
+# 2. **Sliding windows**: Rolling limits such as "17 posts per 24h" or "2 posts per 15 minutes",
+#    matching the platform's real rate windows rather than calendar days.
+# 3. **Per-account**: QuotaRegistry keeps one PostQuota per account in a single process.
+#
+# Each sliding window only remembers the timestamps of its last `limit` posts, so checking
+# and recording are O(1) regardless of how much history exists.
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from history_store import post_timestamp
+
+
+class SlidingWindow:
+    def __init__(self, seconds, limit):
+        self.seconds = seconds
+        self.limit = limit
+        self.events = deque(maxlen=limit)
+
+    def allows(self, now):
+        """True if one more event fits in the window ending at `now`"""
+        return len(self.events) < self.limit or self.events[0] <= now - self.seconds
+
+    def retry_after(self, now):
+        """Seconds until the window has room again (0 if it already has)"""
+        if self.allows(now):
+            return 0.0
+        return self.events[0] + self.seconds - now
+
+    def remaining(self, now):
+        """Number of events that would still fit right now"""
+        used = sum(1 for ts in self.events if ts > now - self.seconds)
+        return self.limit - used
+
+    def record(self, timestamp):
+        self.events.append(timestamp)
+
+
+class PostQuota:
+    def __init__(self, store=None, daily_limit=5, windows=(), account="default", clock=time.time):
+        self.store = store
+        self.daily_limit = daily_limit
+        self.window_specs = list(windows)
+        self.account = account
+        self.clock = clock
+        self._daily_counts = {}
+        self._windows = None
+        self._lock = threading.Lock()
+
+    def _load_windows(self, now):
+        """Rebuild the sliding windows from recent history the first time they are needed"""
+        self._windows = [SlidingWindow(seconds, limit) for seconds, limit in self.window_specs]
+        if self.store is None or not self._windows:
+            return
+        horizon = max(window.seconds for window in self._windows)
+        for post in self.store.posts_since(now - horizon):
+            ts = post_timestamp(post)
+            for window in self._windows:
+                window.record(ts)
+
+    def _daily_count(self, date):
+        if date not in self._daily_counts:
+            # Keep only today's and yesterday's counters around
+            if len(self._daily_counts) > 1:
+                for old in sorted(self._daily_counts)[:-1]:
+                    del self._daily_counts[old]
+            self._daily_counts[date] = self.store.count_on(date) if self.store else 0
+        return self._daily_counts[date]
+
+    def check(self, now=None):
+        """Return (allowed, reason, retry_after_seconds) for posting at `now`"""
+        now = self.clock() if now is None else now
+        date = str(datetime.fromtimestamp(now).date())
+        with self._lock:
+            if self._windows is None:
+                self._load_windows(now)
+
+            if self.daily_limit is not None and self._daily_count(date) >= self.daily_limit:
+                return False, "Daily posting limit reached", None
+
+            for window in self._windows:
+                if not window.allows(now):
+                    return (
+                        False,
+                        f"Rate window limit reached ({window.limit} per {window.seconds}s)",
+                        window.retry_after(now),
+                    )
+        return True, None, 0.0
+
+    def allow(self, now=None):
+        """True if a post may go out at `now`"""
+        return self.check(now)[0]
+
+    def record(self, post=None, now=None):
+        """Count a post that was just appended to the history"""
+        if post is not None:
+            now = post_timestamp(post)
+        now = self.clock() if now is None else now
+        date = str(datetime.fromtimestamp(now).date())
+        with self._lock:
+            if self._windows is None:
+                # The post is already in the store, so the rebuild includes it
+                self._load_windows(now)
+            else:
+                for window in self._windows:
+                    window.record(now)
+            if date in self._daily_counts:
+                self._daily_counts[date] += 1
+
+    def remaining(self, now=None):
+        """Return the number of posts still allowed today and in each window"""
+        now = self.clock() if now is None else now
+        date = str(datetime.fromtimestamp(now).date())
+        with self._lock:
+            if self._windows is None:
+                self._load_windows(now)
+            report = {}
+            if self.daily_limit is not None:
+                report["daily"] = self.daily_limit - self._daily_count(date)
+            for window in self._windows:
+                report[f"{window.seconds}s"] = window.remaining(now)
+        return report
+
+
+class QuotaRegistry:
+    def __init__(self, daily_limit=5, windows=(), clock=time.time):
+        self.daily_limit = daily_limit
+        self.windows = list(windows)
+        self.clock = clock
+        self._quotas = {}
+        self._lock = threading.Lock()
+
+    def get(self, account, store=None):
+        """Return the quota for an account, creating it on first use"""
+        with self._lock:
+            if account not in self._quotas:
+                self._quotas[account] = PostQuota(
+                    store, self.daily_limit, self.windows, account, self.clock
+                )
+            return self._quotas[account]
@@ -0,0 +1,56 @@
+# Rate Limiter
+# Thread-safe token bucket shared by the agents' API callers.
+#
+# A bucket holds up to `capacity` tokens and refills at `rate` tokens per second.
+# Each call takes one (or more) tokens; when the bucket is empty, acquire() sleeps
+# just long enough for the next token instead of failing.
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_window(cls, requests, window_seconds, **kwargs):
+        """Build a bucket for a '`requests` per `window_seconds`' API limit"""
+        return cls(requests / window_seconds, capacity=requests, **kwargs)
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available without waiting; return the wait needed otherwise"""
+        with self._lock:
+            self._refill(self.clock())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Take tokens, sleeping until they are available; return the time spent waiting"""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            self.sleep(wait)
+            waited += wait
+
+    def available(self):
+        """Return the number of tokens currently in the bucket"""
+        with self._lock:
+            self._refill(self.clock())
+            return self.tokens
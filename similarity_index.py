@@ -0,0 +1,140 @@
+# Similarity Index
+# Catches near-duplicate posts before they are sent, since platforms throttle or reject them.
+#
+# How it works:
+# 1. **SimHash**: Each post is reduced to a 64-bit fingerprint built from its words and word
+#    pairs. Similar texts get fingerprints that differ in only a few bits (Hamming distance).
+# 2. **Banded buckets**: The fingerprint is split into `bands` bands, and a lookup only compares
+#    against posts sharing at least one band value instead of scanning the history. Fingerprints
+#    within bands - 1 bits always share a band; most within max_distance do too. One reworded
+#    word in a short post typically moves 3-14 bits, while unrelated posts sit 24+ bits apart.
+# 3. **Bounded, TTL-evicting**: Entries are kept in insertion (time) order and dropped once
+#    older than the TTL or past max_entries, so memory stays flat however long the agent runs.
+
+import functools
+import hashlib
+import re
+import time
+from array import array
+from collections import OrderedDict
+
+from history_store import post_timestamp
+
+WORD = re.compile(r"\w+")
+MAX_FEATURES = 65535  # a 16-bit lane must not overflow
+
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:  # Python < 3.10
+    def popcount(value):
+        return bin(value).count("1")
+
+
+# BYTE_LANES[b] holds the 8 bits of byte b, each in its own 16-bit lane
+BYTE_LANES = [
+    int.from_bytes(array("H", [(byte >> bit) & 1 for bit in range(8)]).tobytes(), "little") for byte in range(256)
+]
+
+
+@functools.lru_cache(maxsize=65536)
+def _feature_lanes(feature):
+    """A feature's 64-bit hash spread into 16-bit lanes, one per bit, packed in one integer"""
+    digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+    lanes = 0
+    for position, byte in enumerate(digest):
+        lanes |= BYTE_LANES[byte] << (128 * position)
+    return lanes
+
+
+def simhash(text):
+    """Return the 64-bit SimHash of a text's words and adjacent word pairs"""
+    words = WORD.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+    # Adding the packed lanes counts, for every bit position at once, the features that set it
+    counts = array("H", sum(map(_feature_lanes, features[:MAX_FEATURES])).to_bytes(128, "little"))
+    half = min(len(features), MAX_FEATURES) / 2
+    fingerprint = 0
+    for bit, count in enumerate(counts):
+        if count > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SimilarityIndex:
+    def __init__(
+        self, max_distance=8, bands=6, ttl_seconds=7 * 24 * 60 * 60, max_entries=100_000, clock=time.time
+    ):
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.bands = bands
+        self._band_bits = 64 // self.bands
+        self._band_mask = (1 << self._band_bits) - 1
+        self._entries = OrderedDict()  # key -> (fingerprint, timestamp), oldest first
+        self._buckets = [{} for _ in range(self.bands)]  # band value -> {key: fingerprint}
+        self._next_key = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_values(self, fingerprint):
+        return [(fingerprint >> (band * self._band_bits)) & self._band_mask for band in range(self.bands)]
+
+    def _remove(self, key):
+        fingerprint, _ = self._entries.pop(key)
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            members = bucket.get(value)
+            if members is not None:
+                members.pop(key, None)
+                if not members:
+                    del bucket[value]
+
+    def evict(self, now=None):
+        """Drop entries older than the TTL and the oldest ones beyond max_entries"""
+        cutoff = (now if now is not None else self.clock()) - self.ttl_seconds
+        while self._entries:
+            key, (_, timestamp) = next(iter(self._entries.items()))
+            if timestamp >= cutoff and len(self._entries) <= self.max_entries:
+                return
+            self._remove(key)
+
+    def add(self, text, timestamp=None, key=None):
+        """Index a posted text"""
+        if key is None:
+            key = self._next_key
+            self._next_key += 1
+        if key in self._entries:
+            self._remove(key)
+        fingerprint = simhash(text)
+        self._entries[key] = (fingerprint, timestamp if timestamp is not None else self.clock())
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            bucket.setdefault(value, {})[key] = fingerprint
+        self.evict()
+        return key
+
+    def find(self, text, now=None):
+        """Return (key, distance) of the closest recent post within max_distance, or None"""
+        self.evict(now)
+        fingerprint = simhash(text)
+        best = None
+        for bucket, value in zip(self._buckets, self._band_values(fingerprint)):
+            members = bucket.get(value)
+            if not members:
+                continue
+            for key, other in members.items():
+                distance = popcount(fingerprint ^ other)
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (key, distance)
+        return best
+
+    def is_duplicate(self, text, now=None):
+        return self.find(text, now) is not None
+
+    def load(self, store, now=None):
+        """Index the posts in a HistoryStore that are still inside the TTL"""
+        now = now if now is not None else self.clock()
+        for post in store.posts_since(now - self.ttl_seconds):
+            self.add(post.get("content", ""), post_timestamp(post), key=post.get("id"))
@@ -0,0 +1,350 @@
+# Simulation
+# Replays a multi-day campaign for many accounts on a virtual clock, in seconds of wall time.
+#
+# run_agent(days=30) only runs in real time, so a month of scheduling, quotas and analytics
+# could not be load-tested before deploying. The simulation instead:
+# 1. **Virtual clock**: One clock is shared by the AgentRuntime, its scheduler and every agent
+#    (quotas, rate windows, duplicate checks and analytics all read it). It jumps straight to
+#    the next due job instead of sleeping.
+# 2. **Real code paths**: The runtime schedules the usual jobs (create_post, engage,
+#    analyze, adapt, compact) and the simulation runs the jobs due at each instant, one by one
+#    (deterministic for a seed) or on the runtime's thread pool with --workers. They use real
+#    history stores on disk, against one FakeTwitterAPI per account.
+# 3. **Synthetic audience**: Posts collect likes and retweets that saturate over a few hours,
+#    with more appeal for one content pool, so adapt_strategy has a signal to follow. Mentions
+#    arrive as a Poisson process.
+# 4. **Report**: Wall time and job latency per job kind, warnings and errors logged, storage
+#    size on disk, API calls, and the analytics and content weights the accounts ended with.
+#
+# Usage: python simulation.py [--accounts 200] [--days 30] [--json report.json]
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import statistics
+import string
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+from agent_runtime import AgentRuntime
+from content_engine import ContentEngine, TemplateList
+from fake_apis import FakeTwitterAPI
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+DIGITS = re.compile(r"\d+")
+
+
+class VirtualClock:
+    def __init__(self, start):
+        self.now = float(start)
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def advance_to(self, timestamp):
+        with self._lock:
+            self.now = max(self.now, float(timestamp))
+
+    def sleep(self, seconds):
+        """Stand-in for time.sleep: a job waiting on a rate limit moves the clock forward"""
+        with self._lock:
+            self.now += max(seconds, 0.0)
+
+
+class SyntheticAudience:
+    def __init__(self, api, classify, rng, appeal=None, half_life_hours=4.0, mentions_per_day=4.0, horizon_days=3):
+        self.api = api
+        self.classify = classify
+        self.rng = rng
+        self.appeal = appeal or {"tech": 14.0, "daily": 8.0}
+        self.half_life = half_life_hours * 3600
+        self.mentions_per_day = mentions_per_day
+        self.horizon = horizon_days * DAY
+        self.active = deque()  # (created, status, final likes, final retweets), oldest first
+        self.updated = None
+        self.mentions = 0
+        self._lock = threading.Lock()
+        api.on_status = self.on_status
+
+    def on_status(self, status):
+        """Give a new post its final engagement, reached gradually as it ages"""
+        if status.in_reply_to_status_id is not None:
+            return
+        mean = self.appeal.get(self.classify(status.text), 5.0)
+        with self._lock:
+            likes = max(0, round(self.rng.gauss(mean, mean / 3)))
+            retweets = max(0, round(likes * self.rng.uniform(0.05, 0.3)))
+            self.active.append((None, status, likes, retweets))
+
+    def advance(self, now):
+        with self._lock:
+            elapsed = 0.0 if self.updated is None else now - self.updated
+            self.updated = now
+            for i, (created, status, likes, retweets) in enumerate(self.active):
+                if created is None:
+                    # Posted during the previous batch of jobs; it starts ageing now
+                    self.active[i] = (now, status, likes, retweets)
+                    continue
+                share = 1 - 0.5 ** ((now - created) / self.half_life)
+                status.favorite_count = round(likes * share)
+                status.retweet_count = round(retweets * share)
+            while self.active and self.active[0][0] is not None and now - self.active[0][0] > self.horizon:
+                self.active.popleft()
+            arrivals = self._poisson(self.mentions_per_day * elapsed / DAY)
+        for _ in range(arrivals):
+            self.api.add_mention(f"fan{self.rng.randrange(10**6)}")
+        self.mentions += arrivals
+
+    def _poisson(self, mean):
+        # Knuth's method; means here are small (a few mentions between jobs)
+        threshold = math.exp(-mean)
+        count, product = 0, self.rng.random()
+        while product > threshold:
+            count += 1
+            product *= self.rng.random()
+        return count
+
+
+class LogCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.counts = Counter()
+
+    def emit(self, record):
+        # Strip the "[account] " prefix and numbers so the same message from many accounts and
+        # for many ids counts together
+        message = DIGITS.sub("N", record.getMessage().split("] ", 1)[-1])
+        key = f"{record.levelname}: {message[:100]}"
+        self.counts[key] += 1
+
+
+def synthetic_pool(count, rng, words=10):
+    return [
+        " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(words))
+        + " $hashtag"
+        for _ in range(count)
+    ]
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class Simulation:
+    def __init__(
+        self,
+        accounts=200,
+        days=30,
+        start=None,
+        data_dir=None,
+        workers=0,
+        mentions_per_day=4.0,
+        templates=500,
+        seed=0,
+    ):
+        self.accounts = accounts
+        self.days = days
+        # Start just after midnight so each simulated day runs every daily job once
+        start = start or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(minutes=1)
+        self.start = start.timestamp()
+        self.data_dir = data_dir
+        self.workers = workers
+        self.mentions_per_day = mentions_per_day
+        self.templates = templates
+        self.seed = seed
+        self.clock = VirtualClock(self.start)
+        self.runtime = None
+        self.audiences = {}
+        self.job_times = {}
+        self.job_counts = Counter()
+        self.batch_sizes = []
+
+    def setup(self):
+        rng = random.Random(self.seed)
+        self.runtime = AgentRuntime(data_dir=self.data_dir, max_workers=max(self.workers, 1), clock=self.clock)
+        for i in range(self.accounts):
+            account = f"sim{i:04d}"
+            api = FakeTwitterAPI(screen_name=account)
+            # templates=0 keeps the agents' built-in pools (7 daily messages and 5 tech tips)
+            engine = None
+            if self.templates:
+                engine = ContentEngine(
+                    {
+                        "daily": TemplateList(synthetic_pool(self.templates, rng)),
+                        "tech": TemplateList(synthetic_pool(self.templates, rng)),
+                    },
+                    topics=["AI", "Python", "Automation", "Data"],
+                    rng=random.Random(rng.random()),
+                )
+            agent = self.runtime.add_agent(account, api=api, content_engine=engine)
+            # Waiting for a rate limit in real time would never end: the clock only moves between jobs
+            agent.api.sleep = self.clock.sleep
+            agent.mentions.limiter.sleep = self.clock.sleep
+            self.audiences[account] = SyntheticAudience(
+                api, agent.content_type, random.Random(rng.random()), mentions_per_day=self.mentions_per_day
+            )
+        self.runtime.start(verify=False)
+
+    def _run_job(self, job):
+        start = time.perf_counter()
+        job.func()
+        elapsed = time.perf_counter() - start
+        kind = job.name.split(".", 1)[-1]
+        self.job_times.setdefault(kind, []).append(elapsed)
+        self.job_counts[kind] += 1
+
+    def run(self):
+        """Run the campaign; return the report"""
+        if self.runtime is None:
+            self.setup()
+        scheduler = self.runtime.scheduler
+        end = self.start + self.days * DAY
+        counter = LogCounter()
+        root = logging.getLogger()
+        saved_handlers, saved_level = root.handlers[:], root.level
+        root.handlers = [counter]
+        root.setLevel(logging.WARNING)
+        wall_start = time.perf_counter()
+        try:
+            while True:
+                due_time = scheduler.next_run()
+                if due_time is None or due_time > end:
+                    break
+                self.clock.advance_to(due_time)
+                for audience in self.audiences.values():
+                    audience.advance(due_time)
+                due = scheduler.pop_due(due_time)
+                self.batch_sizes.append(len(due))
+                if self.workers == 0:
+                    for _, job in due:
+                        self._run_job(job)
+                    continue
+                # Jobs due at the same instant run concurrently, as with the asyncio loop
+                futures = [scheduler.executor.submit(self._run_job, job) for _, job in due]
+                for future in futures:
+                    future.result()
+        finally:
+            root.handlers, root.level = saved_handlers, saved_level
+        wall = time.perf_counter() - wall_start
+        return self.report(wall, counter)
+
+    def report(self, wall, counter):
+        agents = list(self.runtime.agents.values())
+        posts = [agent.store.count() for agent in agents]
+        analytics = [agent.aggregator.report() for agent in agents]
+        api_calls = Counter()
+        for agent in agents:
+            api_calls.update(agent.api.calls)
+        tech_weights = [agent.content_weights["tech"] for agent in agents]
+        slots = self.job_counts["create_post"]
+        size = directory_size(self.data_dir)
+        return {
+            "accounts": len(agents),
+            "simulated_days": self.days,
+            "wall_seconds": round(wall, 2),
+            "simulated_days_per_second": round(self.days / wall, 2) if wall else None,
+            "scheduler": {
+                "jobs_run": sum(self.job_counts.values()),
+                "jobs_per_simulated_day": round(sum(self.job_counts.values()) / self.days, 1),
+                "batches": len(self.batch_sizes),
+                "largest_batch": max(self.batch_sizes, default=0),
+                "jobs": {
+                    kind: {
+                        "count": len(times),
+                        "total_seconds": round(sum(times), 3),
+                        "p50_ms": round(percentile(times, 0.5) * 1000, 3),
+                        "p99_ms": round(percentile(times, 0.99) * 1000, 3),
+                    }
+                    for kind, times in sorted(self.job_times.items())
+                },
+            },
+            "posting": {
+                "slots": slots,
+                "posts": sum(posts),
+                "posted_share": round(sum(posts) / slots, 3) if slots else None,
+            },
+            "engagement": {
+                "mentions_received": sum(audience.mentions for audience in self.audiences.values()),
+                "replies_sent": api_calls["update_status"] - sum(posts),
+                "api_calls": dict(api_calls),
+            },
+            "storage": {
+                "bytes_on_disk": size,
+                "bytes_per_post": round(size / sum(posts)) if sum(posts) else None,
+            },
+            "analytics": {
+                "average_engagement": round(statistics.mean(r["average_engagement"] for r in analytics), 2)
+                if analytics
+                else None,
+                "tech_weight_initial": 0.3,
+                "tech_weight_final_mean": round(statistics.mean(tech_weights), 3) if tech_weights else None,
+            },
+            "log_messages": dict(counter.counts.most_common(10)),
+        }
+
+    def close(self):
+        if self.runtime is not None:
+            self.runtime.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a posting campaign on a virtual clock")
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument(
+        "--workers", type=int, default=0, help="threads running jobs due at the same time; 0 runs them one by one"
+    )
+    parser.add_argument("--mentions-per-day", type=float, default=4.0)
+    parser.add_argument("--templates", type=int, default=500, help="synthetic templates per pool; 0 for the built-in pools")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="keep the history stores here instead of a temporary directory")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        simulation = Simulation(
+            accounts=args.accounts,
+            days=args.days,
+            data_dir=data_dir,
+            workers=args.workers,
+            mentions_per_day=args.mentions_per_day,
+            templates=args.templates,
+            seed=args.seed,
+        )
+        try:
+            setup_start = time.perf_counter()
+            simulation.setup()
+            print(f"Set up {args.accounts} accounts in {time.perf_counter() - setup_start:.2f}s")
+            report = simulation.run()
+        finally:
+            simulation.close()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
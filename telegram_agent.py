@@ -1,30 +1,70 @@
 # Telegram Social Media Agent
 # This agent posts to Telegram channels/groups using the free Telegram Bot API
+# Set METRICS_PORT to serve Prometheus metrics while it posts or listens (see metrics.py)
+# Set LOG_FORMAT=json for structured log lines with account, job and latency fields (see log_pipeline.py)
+# Importing the module has no side effects; telebot and the pooled clients load on first send.
+# Usage: python telegram_agent.py [post TEXT | daily | schedule | listen [--duration N] | stats]
 
+import argparse
 import os
 import json
 import logging
-import schedule
+import random
 import time
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-import telebot  # Telegram API
+import metrics
+from content_engine import ContentEngine, TemplateList
 
-# Load environment variables
-load_dotenv()
-
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("telegram_agent.log"), logging.StreamHandler()],
-)
 logger = logging.getLogger(__name__)
 
+_env_loaded = False
+
+
+def load_env():
+    """Load environment variables from .env, once"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
+# Day-specific messages, Monday first
+messages = [
+    "Monday Motivation: Start your week with a positive mindset! 🚀",
+    "Tuesday Tips: Consistency is key to success! 💡",
+    "Wednesday Wisdom: Keep pushing forward! 💪",
+    "Thursday Thoughts: Reflect and set new goals! 🎯",
+    "Friday Fun: Almost weekend time! 🎉",
+    "Saturday Vibes: Time to relax and recharge! 😌",
+    "Sunday Reflections: Prepare for the week ahead! 📝",
+]
+
+# Replies to messages received while listening
+replies = [
+    "Thanks for your message! 🙏",
+    "Great to hear from you! 😊",
+    "Appreciate you reaching out! 🤝",
+]
+
 class TelegramAgent:
-    def __init__(self):
+    def __init__(self, clients=None, content_engine=None):
+        load_env()
         self.post_history = []
+        self._clients = clients
+        self.content = content_engine or ContentEngine({"daily": TemplateList(messages, by_day=True)})
+        self.bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+        self.chat_id = os.getenv("TELEGRAM_CHAT_ID")
         self.load_data()
+    
+    @property
+    def clients(self):
+        """Pooled Telegram API clients, created on first use"""
+        if self._clients is None:
+            from telegram_clients import default_manager
+            
+            self._clients = default_manager()
+        return self._clients
         
     def load_data(self):
         """Load existing post history"""
@@ -45,31 +85,21 @@ class TelegramAgent:
     
     def generate_content(self):
         """Generate day-specific content"""
-        messages = [
-            "Monday Motivation: Start your week with a positive mindset! 🚀",
-            "Tuesday Tips: Consistency is key to success! 💡",
-            "Wednesday Wisdom: Keep pushing forward! 💪",
-            "Thursday Thoughts: Reflect and set new goals! 🎯",
-            "Friday Fun: Almost weekend time! 🎉",
-            "Saturday Vibes: Time to relax and recharge! 😌",
-            "Sunday Reflections: Prepare for the week ahead! 📝",
-        ]
-        
-        current_day = datetime.now().weekday()
-        return messages[current_day]
-    
-    def post_to_telegram(self, content):
+        content, _ = self.content.generate({"daily": 1})
+        return content
+    
+    def post_to_telegram(self, content, chat_id=None):
         """Post to Telegram channel (Free)"""
         try:
-            bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-            chat_id = os.getenv("TELEGRAM_CHAT_ID")
+            chat_id = chat_id or self.chat_id
             
-            if not bot_token or not chat_id:
+            if not self.bot_token or not chat_id:
                 logger.error("Telegram credentials not found in .env file")
                 return False
             
-            bot = telebot.TeleBot(bot_token)
-            bot.send_message(chat_id, content)
+            # Reuses the cached bot and its keep-alive connection
+            self.clients.send(self.bot_token, chat_id, content)
+            metrics.POSTS.labels("telegram").inc()
             
             logger.info(f"Posted to Telegram: {content[:50]}...")
             return True
@@ -78,6 +108,30 @@ class TelegramAgent:
             logger.error(f"Telegram posting failed: {str(e)}")
             return False
     
+    def post_to_chats(self, content, chat_ids):
+        """Post the same content to several chats over the pooled connections"""
+        if not self.bot_token:
+            logger.error("Telegram credentials not found in .env file")
+            return {chat_id: False for chat_id in chat_ids}
+        
+        results = self.clients.send_many(self.bot_token, chat_ids, content)
+        metrics.POSTS.labels("telegram").inc(sum(results.values()))
+        logger.info(f"Posted to {sum(results.values())}/{len(results)} Telegram chats")
+        return results
+    
+    def broadcast_content(self, content, chat_ids, checkpoint_path=None, workers=8):
+        """Fan content out to many chats through the rate-aware broadcast queue"""
+        if not self.bot_token:
+            logger.error("Telegram credentials not found in .env file")
+            return None
+        
+        from telegram_broadcast import TelegramBroadcaster
+        
+        broadcaster = TelegramBroadcaster(
+            self.clients, self.bot_token, workers=workers, checkpoint_path=checkpoint_path
+        )
+        return broadcaster.broadcast(content, chat_ids)
+    
     def post_daily_content(self):
         """Post day-specific content to Telegram"""
         content = self.generate_content()
@@ -102,6 +156,34 @@ class TelegramAgent:
         
         return success
     
+    def handle_event(self, event):
+        """Reply to a message delivered by the event stream"""
+        if event.get("platform") == "telegram" and event.get("chat_id") is not None:
+            self.clients.send(self.bot_token, event["chat_id"], random.choice(replies))
+            metrics.REPLIES.labels("telegram").inc()
+    
+    def listen(self, duration=None, webhook=None, base_url=None, workers=4):
+        """Reply to incoming messages as they arrive, via getUpdates long polling or a webhook"""
+        if not self.bot_token:
+            logger.error("Telegram credentials not found in .env file")
+            return None
+        
+        from event_stream import TELEGRAM_API_URL, EventStream, TelegramWebhook, TelegramLongPoller
+        
+        stream = EventStream(self.handle_event, workers=workers)
+        if webhook is not None:
+            # Register webhook.url with setWebhook; Telegram then pushes updates to it
+            stream.add_source(webhook if isinstance(webhook, TelegramWebhook) else TelegramWebhook(**webhook))
+        else:
+            base_url = base_url or os.getenv("TELEGRAM_API_URL", TELEGRAM_API_URL)
+            stream.add_source(TelegramLongPoller(self.bot_token, base_url=base_url))
+        
+        metrics.start_from_env()
+        logger.info("Listening for Telegram messages...")
+        summary = stream.run(until=time.time() + duration if duration else None)
+        logger.info(f"Stopped listening: {summary}")
+        return summary
+    
     def get_post_stats(self):
         """Get statistics about posts"""
         if not self.post_history:
@@ -117,10 +199,34 @@ class TelegramAgent:
             "success_rate": round(success_rate, 2)
         }
 
-# Interactive menu
-def main():
-    agent = TelegramAgent()
+def run_schedule(agent):
+    """Post daily content at 9:00 and 18:00 until interrupted"""
+    import schedule
     
+    metrics.start_from_env()
+    schedule.every().day.at("09:00").do(agent.post_daily_content)
+    schedule.every().day.at("18:00").do(agent.post_daily_content)
+    
+    print("Automated posting scheduled for 9:00 AM and 6:00 PM daily")
+    print("Press Ctrl+C to stop")
+    
+    try:
+        while True:
+            schedule.run_pending()
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("\n👋 Automated posting stopped!")
+
+def print_stats(agent):
+    """Print post statistics"""
+    stats = agent.get_post_stats()
+    print(f"\n📈 Post Statistics:")
+    print(f"Total posts: {stats['total_posts']}")
+    print(f"Successful posts: {stats['successful_posts']}")
+    print(f"Success rate: {stats['success_rate']}%")
+
+# Interactive menu
+def menu(agent):
     print("🤖 Telegram Social Media Agent")
     print("=" * 40)
     
@@ -150,18 +256,7 @@ def main():
         
         elif choice == "3":
             print("🚀 Starting automated posting...")
-            schedule.every().day.at("09:00").do(agent.post_daily_content)
-            schedule.every().day.at("18:00").do(agent.post_daily_content)
-            
-            print("Automated posting scheduled for 9:00 AM and 6:00 PM daily")
-            print("Press Ctrl+C to stop")
-            
-            try:
-                while True:
-                    schedule.run_pending()
-                    time.sleep(60)
-            except KeyboardInterrupt:
-                print("\n👋 Automated posting stopped!")
+            run_schedule(agent)
         
         elif choice == "4":
             if agent.post_history:
@@ -173,11 +268,7 @@ def main():
                 print("No post history available")
         
         elif choice == "5":
-            stats = agent.get_post_stats()
-            print(f"\n📈 Post Statistics:")
-            print(f"Total posts: {stats['total_posts']}")
-            print(f"Successful posts: {stats['successful_posts']}")
-            print(f"Success rate: {stats['success_rate']}%")
+            print_stats(agent)
         
         elif choice == "6":
             print("👋 Goodbye!")
@@ -186,5 +277,42 @@ def main():
         else:
             print("❌ Invalid choice. Please try again.")
 
+def main(argv=None):
+    """Command line entry point: the interactive menu, or one command"""
+    parser = argparse.ArgumentParser(description="Telegram Social Media Agent")
+    commands = parser.add_subparsers(dest="command")
+    post = commands.add_parser("post", help="post a message")
+    post.add_argument("content")
+    commands.add_parser("daily", help="post today's content")
+    commands.add_parser("schedule", help="post daily content at 9:00 and 18:00")
+    listen = commands.add_parser("listen", help="reply to incoming messages")
+    listen.add_argument("--duration", type=float, help="seconds to listen; until Ctrl+C by default")
+    commands.add_parser("stats", help="show post statistics")
+    args = parser.parse_args(argv)
+    
+    # Load environment variables and set up logging through the asynchronous pipeline (see log_pipeline.py)
+    load_env()
+    from log_pipeline import setup_logging
+    
+    setup_logging("telegram_agent.log")
+    agent = TelegramAgent()
+    
+    if args.command is None:
+        menu(agent)
+    elif args.command == "post":
+        return 0 if agent.post_to_telegram(args.content) else 1
+    elif args.command == "daily":
+        return 0 if agent.post_daily_content() else 1
+    elif args.command == "schedule":
+        run_schedule(agent)
+    elif args.command == "listen":
+        try:
+            agent.listen(duration=args.duration)
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "stats":
+        print_stats(agent)
+    return 0
+
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,216 @@
+# Telegram Broadcast
+# Fans one message out to thousands of chats while staying inside Telegram's rate limits.
+#
+# How it works:
+# 1. **Bounded queue**: A producer feeds chat ids into a fixed-size queue, so memory stays flat
+#    no matter how many chats are targeted.
+# 2. **Worker pool**: Several threads send in parallel over the pooled bot connection.
+# 3. **Token buckets**: One global bucket (~30 messages/s per bot) and one bucket per chat
+#    (1 message/s for private chats, 20 per minute for groups) pace the workers.
+# 4. **429 handling**: A "Too Many Requests" reply pauses every worker for its retry_after and
+#    puts the chat back in the queue.
+# 5. **Checkpoints**: Delivered chat ids are appended to a checkpoint file, so an interrupted
+#    broadcast resumes where it stopped instead of messaging everyone twice.
+# 6. **Metrics**: The work queue's depth and every delivery are exported (see metrics.py).
+
+import logging
+import os
+import queue
+import statistics
+import threading
+import time
+
+from telebot.apihelper import ApiTelegramException
+
+import metrics
+from rate_limiter import TokenBucket
+from telegram_clients import send_message
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_MESSAGES_PER_SECOND = 30
+PRIVATE_CHAT_MESSAGES_PER_SECOND = 1
+GROUP_MESSAGES_PER_MINUTE = 20
+
+QUEUE_DEPTH = metrics.gauge("broadcast_queue_depth", "Chats waiting in the running broadcast's work queue")
+
+
+class BroadcastCheckpoint:
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def __contains__(self, chat_id):
+        return str(chat_id) in self.done
+
+    def mark(self, chat_id):
+        """Record a delivered chat id"""
+        with self._lock:
+            self.done.add(str(chat_id))
+            self._file.write(f"{chat_id}\n")
+
+    def close(self):
+        self._file.close()
+
+
+class TelegramBroadcaster:
+    def __init__(
+        self,
+        clients,
+        token,
+        workers=8,
+        queue_size=1000,
+        global_rate=GLOBAL_MESSAGES_PER_SECOND,
+        checkpoint_path=None,
+        max_retries=5,
+    ):
+        self.clients = clients
+        self.token = token
+        self.workers = workers
+        self.queue_size = queue_size
+        self.global_limiter = TokenBucket(global_rate, capacity=global_rate)
+        self.checkpoint_path = checkpoint_path
+        self.max_retries = max_retries
+        self._chat_limiters = {}
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def _chat_limiter(self, chat_id):
+        with self._lock:
+            limiter = self._chat_limiters.get(chat_id)
+            if limiter is None:
+                if str(chat_id).startswith("-"):  # groups and channels have negative ids
+                    limiter = TokenBucket.per_window(GROUP_MESSAGES_PER_MINUTE, 60)
+                else:
+                    limiter = TokenBucket(PRIVATE_CHAT_MESSAGES_PER_SECOND, capacity=1)
+                self._chat_limiters[chat_id] = limiter
+            return limiter
+
+    def _wait_for_pause(self):
+        while True:
+            with self._lock:
+                remaining = self._pause_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def _next_item(self, run):
+        """Take a retry first, then fresh work; None once the broadcast is finished"""
+        while True:
+            try:
+                return run["retries"].get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                return run["work"].get(timeout=0.05)
+            except queue.Empty:
+                if run["finished"].is_set():
+                    return None
+
+    def _complete(self, run):
+        with self._lock:
+            run["pending"] -= 1
+            if run["pending"] == 0 and run["produced"]:
+                run["finished"].set()
+
+    def _worker(self, run, content, kwargs):
+        bot = self.clients.get(self.token)
+        stats = run["stats"]
+        checkpoint = run["checkpoint"]
+        while True:
+            item = self._next_item(run)
+            if item is None:
+                return
+            chat_id, attempt = item
+            try:
+                self._wait_for_pause()
+                self._chat_limiter(chat_id).acquire()
+                self.global_limiter.acquire()
+                start = time.perf_counter()
+                send_message(bot, chat_id, content, **kwargs)
+                latency = time.perf_counter() - start
+                metrics.POSTS.labels("telegram").inc()
+                with self._lock:
+                    stats["sent"] += 1
+                    stats["latencies"].append(latency)
+                if checkpoint is not None:
+                    checkpoint.mark(chat_id)
+            except ApiTelegramException as e:
+                if e.error_code == 429 and attempt < self.max_retries:
+                    retry_after = (e.result_json or {}).get("parameters", {}).get("retry_after", 1)
+                    logger.warning(f"Telegram rate limit hit, pausing {retry_after}s")
+                    self._pause(retry_after)
+                    with self._lock:
+                        stats["retried"] += 1
+                    run["retries"].put((chat_id, attempt + 1))
+                    continue
+                logger.error(f"Broadcast to {chat_id} failed: {str(e)}")
+                with self._lock:
+                    stats["failed"] += 1
+            except Exception as e:
+                logger.error(f"Broadcast to {chat_id} failed: {str(e)}")
+                with self._lock:
+                    stats["failed"] += 1
+            self._complete(run)
+
+    def broadcast(self, content, chat_ids, **kwargs):
+        """Send `content` to every chat id; return delivery and latency statistics"""
+        run = {
+            "work": queue.Queue(maxsize=self.queue_size),
+            "retries": queue.Queue(),
+            "pending": 0,
+            "produced": False,
+            "finished": threading.Event(),
+            "checkpoint": BroadcastCheckpoint(self.checkpoint_path) if self.checkpoint_path else None,
+            "stats": {"sent": 0, "failed": 0, "skipped": 0, "retried": 0, "latencies": []},
+        }
+        stats = run["stats"]
+        QUEUE_DEPTH.set_function(run["work"].qsize)
+        threads = [
+            threading.Thread(target=self._worker, args=(run, content, kwargs), daemon=True)
+            for _ in range(self.workers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            for chat_id in chat_ids:
+                if run["checkpoint"] is not None and chat_id in run["checkpoint"]:
+                    stats["skipped"] += 1
+                    continue
+                with self._lock:
+                    run["pending"] += 1
+                run["work"].put((chat_id, 0))  # blocks while the queue is full
+        finally:
+            with self._lock:
+                run["produced"] = True
+                if run["pending"] == 0:
+                    run["finished"].set()
+            for thread in threads:
+                thread.join()
+            if run["checkpoint"] is not None:
+                run["checkpoint"].close()
+            QUEUE_DEPTH.set_function(None)
+
+        elapsed = time.perf_counter() - start
+        latencies = sorted(stats.pop("latencies"))
+        stats["elapsed"] = elapsed
+        stats["throughput"] = stats["sent"] / elapsed if elapsed else 0
+        if latencies:
+            stats["p50_latency"] = statistics.median(latencies)
+            stats["p99_latency"] = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+        logger.info(
+            f"Broadcast finished: {stats['sent']} sent, {stats['failed']} failed, "
+            f"{stats['skipped']} skipped, {stats['throughput']:.1f} msg/s"
+        )
+        return stats
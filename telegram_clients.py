@@ -0,0 +1,100 @@
+# Telegram Client Manager
+# Reuses bot clients and HTTP connections across Telegram posts.
+#
+# post_to_telegram() used to build a new telebot.TeleBot for every message. The manager keeps:
+# 1. **One bot per token**: TeleBot instances are cached, so nothing is rebuilt per message.
+# 2. **One bounded keep-alive pool**: All bots share a requests.Session whose connection pool is
+#    capped at `pool_size`, so repeated posts skip the TCP and TLS handshakes.
+# 3. **Fan-out helpers**: send_many() posts the same text to many chat ids over those connections.
+# 4. **Metrics**: send_message() times every sendMessage call and counts its outcome (metrics.py).
+
+import logging
+import threading
+import time
+
+import requests
+import telebot
+from requests.adapters import HTTPAdapter
+from telebot import apihelper
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def send_message(bot, chat_id, text, **kwargs):
+    """bot.send_message(), timed and counted as a Telegram API call"""
+    start = time.perf_counter()
+    try:
+        message = bot.send_message(chat_id, text, **kwargs)
+    except Exception as e:
+        metrics.API_LATENCY.labels("telegram", "sendMessage").observe(time.perf_counter() - start)
+        metrics.API_CALLS.labels("telegram", "sendMessage", str(getattr(e, "error_code", None) or "error")).inc()
+        raise
+    metrics.API_LATENCY.labels("telegram", "sendMessage").observe(time.perf_counter() - start)
+    metrics.API_CALLS.labels("telegram", "sendMessage", "ok").inc()
+    return message
+
+
+class TelegramClientManager:
+    def __init__(self, pool_size=16):
+        self.pool_size = pool_size
+        self._bots = {}
+        self._lock = threading.Lock()
+        self.session = requests.Session()
+        # pool_block keeps the number of open connections bounded under concurrent sends
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # telebot sends every request through apihelper's session when one is set. It caches a
+        # session per thread on first use, so drop this thread's cached one to pick up ours.
+        apihelper.session = self.session
+        apihelper._get_req_session(reset=True)
+
+    def get(self, token):
+        """Return the cached bot for a token, creating it on first use"""
+        with self._lock:
+            bot = self._bots.get(token)
+            if bot is None:
+                bot = telebot.TeleBot(token, threaded=False)
+                self._bots[token] = bot
+            return bot
+
+    def send(self, token, chat_id, text, **kwargs):
+        """Send one message through the pooled connection"""
+        return send_message(self.get(token), chat_id, text, **kwargs)
+
+    def send_many(self, token, chat_ids, text, **kwargs):
+        """Send the same message to several chats; return {chat_id: True/False}"""
+        bot = self.get(token)
+        results = {}
+        for chat_id in chat_ids:
+            try:
+                send_message(bot, chat_id, text, **kwargs)
+                results[chat_id] = True
+            except Exception as e:
+                logger.error(f"Telegram send to {chat_id} failed: {str(e)}")
+                results[chat_id] = False
+        return results
+
+    def close(self):
+        """Drop the cached bots and close pooled connections"""
+        with self._lock:
+            self._bots.clear()
+        self.session.close()
+        if apihelper.session is self.session:
+            apihelper.session = None
+            apihelper._get_req_session(reset=True)
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def default_manager():
+    """Return the process-wide client manager"""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = TelegramClientManager()
+        return _default_manager
@@ -0,0 +1,54 @@
+import hashlib
+import io
+import os
+import random
+
+from backup_store import Chunker
+
+
+def chunk_digests(chunker, data):
+    chunks = list(chunker.chunks(io.BytesIO(data)))
+    assert b"".join(chunks) == data
+    return [(hashlib.sha256(chunk).digest(), len(chunk)) for chunk in chunks]
+
+
+def reused_fraction(data, edited):
+    chunker = Chunker()
+    before = {digest for digest, _ in chunk_digests(chunker, data)}
+    after = chunk_digests(chunker, edited)
+    return sum(size for digest, size in after if digest in before) / len(edited)
+
+
+def numeric_csv(rows, seed=0):
+    rng = random.Random(seed)
+    return b"".join(b"%d,%d,%.4f\n" % (i, rng.randrange(10**6), rng.random()) for i in range(rows))
+
+
+def test_insertion_into_binary_data_keeps_most_chunks():
+    data = random.Random(1).randbytes(4 * 1024 * 1024)
+    edited = data[:1000] + b"\x00\x01" + data[1000:]
+    assert reused_fraction(data, edited) > 0.9
+
+
+def test_insertion_into_numeric_csv_keeps_most_chunks():
+    data = numeric_csv(150_000)
+    edited = data[:1000] + b"42" + data[1000:]
+    assert reused_fraction(data, edited) > 0.9
+
+
+def test_cuts_do_not_depend_on_read_size():
+    data = numeric_csv(50_000, seed=2)
+    chunker = Chunker()
+
+    class SmallReads(io.BytesIO):
+        def read(self, size=-1):
+            return super().read(min(size, 10_000) if size and size > 0 else size)
+
+    assert list(chunker.chunks(SmallReads(data))) == list(chunker.chunks(io.BytesIO(data)))
+
+
+def test_chunk_sizes_stay_within_bounds():
+    data = os.urandom(2 * 1024 * 1024)
+    sizes = [size for _, size in chunk_digests(Chunker(), data)]
+    assert all(size <= Chunker().max_size for size in sizes)
+    assert all(size >= Chunker().min_size for size in sizes[:-1])
@@ -0,0 +1,64 @@
+import os
+
+from automate_file_management import FileOrganizer
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read_all(root):
+    contents = []
+    for folder, _, files in os.walk(root):
+        for name in files:
+            with open(os.path.join(folder, name), "rb") as f:
+                contents.append(f.read())
+    return sorted(contents)
+
+
+def test_colliding_names_in_two_subfolders_are_not_overwritten(tmp_path):
+    root = str(tmp_path)
+    for i in range(20):
+        write(os.path.join(root, f"a{i}", "photo.jpg"), f"photo from a{i}".encode())
+    before = read_all(root)
+
+    stats = FileOrganizer(root, workers=8, recursive=True, verbose=False).organize()
+
+    assert read_all(root) == before
+    assert stats["moved"] == 1
+    with open(os.path.join(root, "images", "photo.jpg"), "rb") as f:
+        assert f.read().startswith(b"photo from a")
+
+
+def test_name_taken_after_the_check_is_not_overwritten(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    first, second = os.path.join(root, "a", "photo.jpg"), os.path.join(root, "b", "photo.jpg")
+    write(first, b"first")
+    write(second, b"second")
+    organizer = FileOrganizer(root, recursive=True, verbose=False)
+    os.makedirs(os.path.join(root, "images"))
+    organizer.target_device = os.stat(root).st_dev
+    # Both workers looked before either moved: any existence check sees a free name
+    monkeypatch.setattr(os.path, "exists", lambda path: False)
+
+    assert organizer.move(first, organizer.target_device) is True
+    assert organizer.move(second, organizer.target_device) is False
+    monkeypatch.undo()
+
+    assert read_all(root) == [b"first", b"second"]
+
+
+def test_existing_target_is_kept(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, "images", "photo.jpg"), b"already organized")
+    write(os.path.join(root, "photo.jpg"), b"new download")
+
+    stats = FileOrganizer(root, verbose=False).organize()
+
+    assert stats["moved"] == 0
+    with open(os.path.join(root, "images", "photo.jpg"), "rb") as f:
+        assert f.read() == b"already organized"
+    with open(os.path.join(root, "photo.jpg"), "rb") as f:
+        assert f.read() == b"new download"